@@ -12,7 +12,10 @@ from app.db.database import Base
 from app.models import *  # noqa: F401, F403 - import all models for autogenerate
 
 config = context.config
-config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+# Each player shard is migrated separately: `alembic -x url=<shard url> upgrade head`
+config.set_main_option(
+    "sqlalchemy.url", context.get_x_argument(as_dictionary=True).get("url", settings.DATABASE_URL)
+)
 
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
@@ -0,0 +1,111 @@
+"""Baseline schema with per-player indexes and cascading foreign keys.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0001_baseline"
+down_revision: str | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "players",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("nickname", sa.String(100), nullable=True),
+        sa.Column("current_level_id", sa.String(50), nullable=False),
+        sa.Column("max_unlocked_level", sa.String(50), nullable=False),
+        sa.Column("affinity_score", sa.Integer(), nullable=False),
+        sa.Column("memory_facts", sa.JSON(), nullable=False),
+        sa.Column("bio", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+
+    op.create_table(
+        "levels",
+        sa.Column("id", sa.String(50), primary_key=True),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("order", sa.Integer(), nullable=False),
+    )
+
+    op.create_table(
+        "level_choices",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "player_id",
+            sa.Integer(),
+            sa.ForeignKey("players.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("level_id", sa.String(50), nullable=False),
+        sa.Column("node_id", sa.String(100), nullable=False),
+        sa.Column("choice_id", sa.String(100), nullable=False),
+        sa.Column("affinity_delta", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index(
+        "ix_level_choices_player_level",
+        "level_choices",
+        ["player_id", "level_id", "created_at"],
+    )
+
+    op.create_table(
+        "chat_messages",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "player_id",
+            sa.Integer(),
+            sa.ForeignKey("players.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("role", sa.String(20), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("after_level_id", sa.String(50), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index(
+        "ix_chat_messages_player_created",
+        "chat_messages",
+        ["player_id", "created_at"],
+    )
+
+    op.create_table(
+        "affinity_records",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "player_id",
+            sa.Integer(),
+            sa.ForeignKey("players.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("delta", sa.Integer(), nullable=False),
+        sa.Column("source", sa.String(50), nullable=False),
+        sa.Column("reason", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index(
+        "ix_affinity_records_player_created",
+        "affinity_records",
+        ["player_id", "created_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_affinity_records_player_created", table_name="affinity_records")
+    op.drop_table("affinity_records")
+    op.drop_index("ix_chat_messages_player_created", table_name="chat_messages")
+    op.drop_table("chat_messages")
+    op.drop_index("ix_level_choices_player_level", table_name="level_choices")
+    op.drop_table("level_choices")
+    op.drop_table("levels")
+    op.drop_table("players")
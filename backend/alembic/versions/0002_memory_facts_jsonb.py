@@ -0,0 +1,43 @@
+"""Store players.memory_facts as JSONB with a GIN index.
+
+Revision ID: 0002_memory_facts_jsonb
+Revises: 0001_baseline
+Create Date: 2026-10-19
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0002_memory_facts_jsonb"
+down_revision: str | None = "0001_baseline"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.alter_column(
+        "players",
+        "memory_facts",
+        type_=postgresql.JSONB(),
+        postgresql_using="memory_facts::jsonb",
+    )
+    op.create_index(
+        "ix_players_memory_facts", "players", ["memory_facts"], postgresql_using="gin"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_index("ix_players_memory_facts", table_name="players")
+    op.alter_column(
+        "players",
+        "memory_facts",
+        type_=sa.JSON(),
+        postgresql_using="memory_facts::json",
+    )
@@ -0,0 +1,33 @@
+"""Add players.memory_meta for bounded long-term memory.
+
+Revision ID: 0003_memory_meta
+Revises: 0002_memory_facts_jsonb
+Create Date: 2026-10-19
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0003_memory_meta"
+down_revision: str | None = "0002_memory_facts_jsonb"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "players",
+        sa.Column(
+            "memory_meta",
+            sa.JSON().with_variant(postgresql.JSONB(), "postgresql"),
+            nullable=False,
+            server_default="{}",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("players", "memory_meta")
@@ -0,0 +1,36 @@
+"""Add chat_embedding_index for retrieval over persisted chat history.
+
+Revision ID: 0004_chat_embedding_index
+Revises: 0003_memory_meta
+Create Date: 2026-10-19
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0004_chat_embedding_index"
+down_revision: str | None = "0003_memory_meta"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "chat_embedding_index",
+        sa.Column(
+            "player_id",
+            sa.Integer(),
+            sa.ForeignKey("players.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("dim", sa.Integer(), nullable=False),
+        sa.Column("message_ids", sa.LargeBinary(), nullable=False),
+        sa.Column("vectors", sa.LargeBinary(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("chat_embedding_index")
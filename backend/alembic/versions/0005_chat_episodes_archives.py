@@ -0,0 +1,71 @@
+"""Add chat_episodes and chat_archives for history compaction.
+
+Revision ID: 0005_chat_episodes_archives
+Revises: 0004_chat_embedding_index
+Create Date: 2026-10-19
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0005_chat_episodes_archives"
+down_revision: str | None = "0004_chat_embedding_index"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "chat_episodes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "player_id",
+            sa.Integer(),
+            sa.ForeignKey("players.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("after_level_id", sa.String(50), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("ended_at", sa.DateTime(), nullable=False),
+        sa.Column("first_message_id", sa.Integer(), nullable=False),
+        sa.Column("last_message_id", sa.Integer(), nullable=False),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("summary", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index(
+        "ix_chat_episodes_player_ended", "chat_episodes", ["player_id", "ended_at"]
+    )
+
+    op.create_table(
+        "chat_archives",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "player_id",
+            sa.Integer(),
+            sa.ForeignKey("players.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "episode_id",
+            sa.Integer(),
+            sa.ForeignKey("chat_episodes.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("ended_at", sa.DateTime(), nullable=False),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+    )
+    op.create_index(
+        "ix_chat_archives_player_ended", "chat_archives", ["player_id", "ended_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chat_archives_player_ended", table_name="chat_archives")
+    op.drop_table("chat_archives")
+    op.drop_index("ix_chat_episodes_player_ended", table_name="chat_episodes")
+    op.drop_table("chat_episodes")
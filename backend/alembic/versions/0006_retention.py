@@ -0,0 +1,38 @@
+"""Add job_checkpoints and created_at keyset indexes for retention purges.
+
+Revision ID: 0006_retention
+Revises: 0005_chat_episodes_archives
+Create Date: 2026-10-19
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0006_retention"
+down_revision: str | None = "0005_chat_episodes_archives"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+_PURGED_TABLES = ("chat_messages", "affinity_records", "level_choices")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "job_checkpoints",
+        sa.Column("name", sa.String(100), primary_key=True),
+        sa.Column("cutoff", sa.DateTime(), nullable=False),
+        sa.Column("last_created_at", sa.DateTime(), nullable=True),
+        sa.Column("last_id", sa.Integer(), nullable=False),
+        sa.Column("processed", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+    for table in _PURGED_TABLES:
+        op.create_index(f"ix_{table}_created_id", table, ["created_at", "id"])
+
+
+def downgrade() -> None:
+    for table in _PURGED_TABLES:
+        op.drop_index(f"ix_{table}_created_id", table_name=table)
+    op.drop_table("job_checkpoints")
@@ -0,0 +1,120 @@
+"""Partition chat_messages by month on created_at (Postgres only).
+
+The existing table is renamed, a partitioned table with the same columns is
+created (primary key widened to (id, created_at), as Postgres requires the
+partition key in unique constraints), monthly partitions are created from
+the oldest row through three months ahead, rows are copied over and the
+old table dropped. The id sequence is carried over unchanged.
+
+Revision ID: 0007_partition_chat_messages
+Revises: 0006_retention
+Create Date: 2026-10-19
+"""
+
+from collections.abc import Sequence
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0007_partition_chat_messages"
+down_revision: str | None = "0006_retention"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+_MONTHS_AHEAD = 3
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE chat_messages RENAME TO chat_messages_legacy")
+    op.execute(
+        "ALTER TABLE chat_messages_legacy RENAME CONSTRAINT chat_messages_pkey "
+        "TO chat_messages_legacy_pkey"
+    )
+    op.execute(
+        "ALTER INDEX ix_chat_messages_player_created "
+        "RENAME TO ix_chat_messages_legacy_player_created"
+    )
+    op.execute(
+        "ALTER INDEX ix_chat_messages_created_id RENAME TO ix_chat_messages_legacy_created_id"
+    )
+
+    op.execute("""
+        CREATE TABLE chat_messages (
+            id INTEGER NOT NULL DEFAULT nextval('chat_messages_id_seq'),
+            player_id INTEGER NOT NULL REFERENCES players (id) ON DELETE CASCADE,
+            role VARCHAR(20) NOT NULL,
+            content TEXT NOT NULL,
+            after_level_id VARCHAR(50),
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute(
+        "CREATE INDEX ix_chat_messages_player_created ON chat_messages (player_id, created_at)"
+    )
+    op.execute("CREATE INDEX ix_chat_messages_created_id ON chat_messages (created_at, id)")
+
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM chat_messages_legacy")).scalar()
+    today = date.today()
+    month = date(oldest.year, oldest.month, 1) if oldest else date(today.year, today.month, 1)
+    last = _add_months(date(today.year, today.month, 1), _MONTHS_AHEAD)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE chat_messages_y{month.year:04d}m{month.month:02d} "
+            f"PARTITION OF chat_messages "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+
+    op.execute("""
+        INSERT INTO chat_messages (id, player_id, role, content, after_level_id, created_at)
+        SELECT id, player_id, role, content, after_level_id, created_at
+        FROM chat_messages_legacy
+    """)
+    op.execute("ALTER SEQUENCE chat_messages_id_seq OWNED BY chat_messages.id")
+    op.execute("DROP TABLE chat_messages_legacy")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE chat_messages RENAME TO chat_messages_partitioned")
+    op.execute(
+        "ALTER TABLE chat_messages_partitioned RENAME CONSTRAINT chat_messages_pkey "
+        "TO chat_messages_partitioned_pkey"
+    )
+    op.execute("DROP INDEX ix_chat_messages_player_created")
+    op.execute("DROP INDEX ix_chat_messages_created_id")
+    op.execute("""
+        CREATE TABLE chat_messages (
+            id INTEGER NOT NULL DEFAULT nextval('chat_messages_id_seq') PRIMARY KEY,
+            player_id INTEGER NOT NULL REFERENCES players (id) ON DELETE CASCADE,
+            role VARCHAR(20) NOT NULL,
+            content TEXT NOT NULL,
+            after_level_id VARCHAR(50),
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now()
+        )
+    """)
+    op.execute(
+        "CREATE INDEX ix_chat_messages_player_created ON chat_messages (player_id, created_at)"
+    )
+    op.execute("CREATE INDEX ix_chat_messages_created_id ON chat_messages (created_at, id)")
+    op.execute("""
+        INSERT INTO chat_messages (id, player_id, role, content, after_level_id, created_at)
+        SELECT id, player_id, role, content, after_level_id, created_at
+        FROM chat_messages_partitioned
+    """)
+    op.execute("ALTER SEQUENCE chat_messages_id_seq OWNED BY chat_messages.id")
+    op.execute("DROP TABLE chat_messages_partitioned")
@@ -0,0 +1,33 @@
+"""Add the player_shards directory for horizontal sharding.
+
+Run against every shard (``alembic -x url=<shard url> upgrade head``); the
+table is only read on shard 0 but keeping schemas identical lets any shard
+be promoted or inspected the same way.
+
+Revision ID: 0008_player_shards
+Revises: 0007_partition_chat_messages
+Create Date: 2026-10-19
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0008_player_shards"
+down_revision: str | None = "0007_partition_chat_messages"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "player_shards",
+        sa.Column("player_id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("shard_id", sa.Integer(), nullable=False),
+        sa.Column("moving", sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("player_shards")
@@ -0,0 +1,29 @@
+"""Add players.deleted_at for tombstoned, batch-purged player deletion.
+
+Revision ID: 0009_player_tombstone
+Revises: 0008_player_shards
+Create Date: 2026-10-19
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0009_player_tombstone"
+down_revision: str | None = "0008_player_shards"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("players", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    op.create_index(
+        "ix_players_deleted_at", "players", ["deleted_at"],
+        postgresql_where=sa.text("deleted_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_players_deleted_at", table_name="players")
+    op.drop_column("players", "deleted_at")
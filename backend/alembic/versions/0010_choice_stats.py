@@ -0,0 +1,31 @@
+"""Add choice_stats snapshots of the Redis choice counters.
+
+Revision ID: 0010_choice_stats
+Revises: 0009_player_tombstone
+Create Date: 2026-10-19
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0010_choice_stats"
+down_revision: str | None = "0009_player_tombstone"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "choice_stats",
+        sa.Column("level_id", sa.String(50), primary_key=True),
+        sa.Column("node_id", sa.String(100), primary_key=True),
+        sa.Column("choice_id", sa.String(100), primary_key=True),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("choice_stats")
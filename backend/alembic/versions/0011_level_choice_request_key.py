@@ -0,0 +1,29 @@
+"""Add level_choices.request_key with a per-player unique constraint.
+
+Revision ID: 0011_level_choice_request_key
+Revises: 0010_choice_stats
+Create Date: 2026-10-19
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0011_level_choice_request_key"
+down_revision: str | None = "0010_choice_stats"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # Existing rows stay NULL, which never conflicts
+    op.add_column("level_choices", sa.Column("request_key", sa.String(200), nullable=True))
+    op.create_unique_constraint(
+        "uq_level_choices_player_request", "level_choices", ["player_id", "request_key"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_level_choices_player_request", "level_choices", type_="unique")
+    op.drop_column("level_choices", "request_key")
@@ -0,0 +1,38 @@
+"""Add level_saves: durable copy of paused level state.
+
+Revision ID: 0012_level_saves
+Revises: 0011_level_choice_request_key
+Create Date: 2026-10-19
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0012_level_saves"
+down_revision: str | None = "0011_level_choice_request_key"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "level_saves",
+        sa.Column(
+            "player_id", sa.Integer(),
+            sa.ForeignKey("players.id", ondelete="CASCADE"), primary_key=True,
+        ),
+        sa.Column("level_id", sa.String(50), nullable=False),
+        sa.Column("node_id", sa.String(100), nullable=False),
+        sa.Column(
+            "choices", sa.JSON().with_variant(postgresql.JSONB(), "postgresql"), nullable=False
+        ),
+        sa.Column("saved_at", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("level_saves")
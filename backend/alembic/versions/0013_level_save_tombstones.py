@@ -0,0 +1,27 @@
+"""Allow cleared level_saves rows (NULL level/node) to act as tombstones.
+
+Revision ID: 0013_level_save_tombstones
+Revises: 0012_level_saves
+Create Date: 2026-10-19
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0013_level_save_tombstones"
+down_revision: str | None = "0012_level_saves"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.alter_column("level_saves", "level_id", existing_type=sa.String(50), nullable=True)
+    op.alter_column("level_saves", "node_id", existing_type=sa.String(100), nullable=True)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM level_saves WHERE level_id IS NULL")
+    op.alter_column("level_saves", "node_id", existing_type=sa.String(100), nullable=False)
+    op.alter_column("level_saves", "level_id", existing_type=sa.String(50), nullable=False)
@@ -0,0 +1,68 @@
+"""HTTP conditional request helpers - ETag / Last-Modified validators and 304 responses."""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts: object) -> str:
+    """Strong ETag (quoted) over the string forms of ``parts``."""
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=12)
+    return f'"{digest.hexdigest()}"'
+
+
+def http_date(value: datetime) -> str:
+    """IMF-fixdate for Last-Modified; naive datetimes are taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime | None = None) -> bool:
+    """Whether the client's cached copy is current (If-None-Match, else If-Modified-Since)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # Compare at the header's one-second resolution
+        return parsedate_to_datetime(http_date(last_modified)) <= since
+    return False
+
+
+def cache_headers(
+    etag: str, cache_control: str, last_modified: datetime | None = None
+) -> dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def set_cache_headers(
+    response: Response, etag: str, cache_control: str, last_modified: datetime | None = None
+) -> None:
+    response.headers.update(cache_headers(etag, cache_control, last_modified))
+
+
+def not_modified(
+    etag: str, cache_control: str, last_modified: datetime | None = None
+) -> Response:
+    """Empty 304 carrying the same validators as the full response."""
+    return Response(status_code=304, headers=cache_headers(etag, cache_control, last_modified))
@@ -0,0 +1,28 @@
+"""Rate-limit dependencies for REST routes and the 429 response."""
+
+import redis.asyncio as aioredis
+from fastapi import Depends, Request
+from fastapi.responses import JSONResponse
+
+from app.core.rate_limit import RateLimited, rate_limiter
+from app.db.redis import get_redis
+
+
+def rate_limit(route_class: str):
+    """Route dependency counting the call against the player's ``route_class`` bucket.
+
+    ``player_id`` comes from the route's path or query parameters.
+    """
+
+    async def dependency(player_id: int, redis: aioredis.Redis = Depends(get_redis)) -> None:
+        await rate_limiter.hit(redis, route_class, player_id)
+
+    return Depends(dependency)
+
+
+async def rate_limited_handler(request: Request, exc: RateLimited) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "retry_after": round(exc.retry_after, 1)},
+        headers={"Retry-After": exc.retry_after_header},
+    )
@@ -0,0 +1,95 @@
+"""Admin endpoints - operator-only data tooling, guarded by ADMIN_TOKEN."""
+
+import secrets
+
+import redis.asyncio as aioredis
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.websocket.connections import connection_hub
+from app.config import settings
+from app.core.serialization import dumps_str
+from app.db.database import get_global_db, get_sessionmaker
+from app.db.redis import get_redis
+from app.models.player import Player
+from app.schemas.chat import NodeConnections, NoticeDelivery, ServerNotice
+from app.schemas.level import LevelChoiceStats
+from app.services.choice_stats_service import choice_stats_service
+from app.services.export_service import export_service
+from app.services.level_service import level_service
+from app.services.player_service import player_service
+
+
+async def require_admin(x_admin_token: str = Header(default="")) -> None:
+    if not settings.ADMIN_TOKEN or not secrets.compare_digest(
+        x_admin_token, settings.ADMIN_TOKEN
+    ):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/players/{player_id}/export")
+async def export_player(
+    player_id: int,
+    session_factory: async_sessionmaker[AsyncSession] = Depends(get_sessionmaker),
+):
+    """Stream all of a player's rows as NDJSON (see app.services.export_service).
+
+    The body is produced after the dependencies have been torn down, so the
+    stream opens its own session instead of using a request-scoped one.
+    """
+    async with session_factory() as db:
+        if await player_service.load_columns(db, player_id, Player.id) is None:
+            raise HTTPException(status_code=404, detail="Player not found")
+
+    async def rows():
+        async with session_factory() as db:
+            async for chunk in export_service.export_ndjson(db, [player_id]):
+                yield chunk
+
+    return StreamingResponse(
+        rows(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="player-{player_id}.ndjson"'},
+    )
+
+
+@router.post("/players/{player_id}/notice", response_model=NoticeDelivery)
+async def send_notice(
+    player_id: int, notice: ServerNotice, redis: aioredis.Redis = Depends(get_redis)
+):
+    """Push a {"type": "notice"} frame to the player's chat connection, on whichever node."""
+    frame = dumps_str({"type": "notice", "content": notice.content})
+    return NoticeDelivery(delivered=await connection_hub.send(redis, player_id, frame))
+
+
+@router.get("/connections", response_model=NodeConnections)
+async def list_connections():
+    """Send-buffer metrics of the chat connections held by the node serving this request."""
+    return NodeConnections(
+        node=connection_hub.node_id, connections=connection_hub.connection_stats()
+    )
+
+
+@router.get("/levels/{level_id}/choice-stats", response_model=LevelChoiceStats)
+async def get_choice_stats(
+    level_id: str,
+    redis: aioredis.Redis = Depends(get_redis),
+    db: AsyncSession = Depends(get_global_db),
+):
+    """How often each option was chosen, per node, with the affinity deltas applied.
+
+    Flushed totals from Postgres plus the increments still pending in Redis
+    (just the totals if Redis is unavailable).
+    """
+    try:
+        config = level_service.load_level(level_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Level not found")
+    counts = await choice_stats_service.current_counts(
+        db, redis, level_id, list(config.choices)
+    )
+    return choice_stats_service.build_stats(config, counts)
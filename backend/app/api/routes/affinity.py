@@ -1,22 +1,23 @@
 """Affinity endpoints - query affinity status."""
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.database import get_db
-from app.models.player import Player
+from app.api.rate_limit import rate_limit
+from app.db.database import get_read_db
 from app.schemas.affinity import AffinityStatus
 from app.services.affinity_service import affinity_service
+from app.services.player_service import player_service, AFFINITY_COLUMNS
 
 router = APIRouter()
 
 
-@router.get("/{player_id}", response_model=AffinityStatus)
-async def get_affinity(player_id: int, db: AsyncSession = Depends(get_db)):
+@router.get("/{player_id}", response_model=AffinityStatus, dependencies=[rate_limit("read")])
+async def get_affinity(player_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get current affinity status for a player."""
-    result = await db.execute(select(Player).where(Player.id == player_id))
-    player = result.scalar_one()
+    player = await player_service.load_columns(db, player_id, *AFFINITY_COLUMNS)
+    if player is None:
+        raise HTTPException(status_code=404, detail="Player not found")
     return AffinityStatus(
         score=player.affinity_score,
         level=affinity_service.get_tier(player.affinity_score),
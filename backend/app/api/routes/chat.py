@@ -1,30 +1,186 @@
 """Chat REST endpoints - for non-WebSocket chat operations."""
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import logging
+import uuid
+from collections.abc import AsyncIterator
 
-from app.db.database import get_db
-from app.models.chat_history import ChatMessage
-from app.schemas.chat import ChatHistory
+import redis.asyncio as aioredis
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.rate_limit import rate_limit
+from app.core.rate_limit import rate_limiter
+from app.core.serialization import dumps_str
+from app.db.database import get_read_db, get_sessionmaker
+from app.db.redis import get_redis
+from app.schemas.chat import ChatHistory, ChatMessageIn
+from app.services.chat_service import ChatService
+from app.services.chat_session_service import (
+    ChatTurn,
+    chat_session_service,
+    load_character_prompt,
+)
+from app.services.compaction_service import compaction_service
+from app.services.reply_buffer import ReplyUnavailable, read_reply
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Replies keep generating after their client disconnects; hold the tasks so they aren't GC'd
+_generations: set[asyncio.Task] = set()
+
 
-@router.get("/history/{player_id}", response_model=ChatHistory)
+@router.get("/history/{player_id}", response_model=ChatHistory, dependencies=[rate_limit("read")])
 async def get_chat_history(
-    player_id: int, limit: int = 50, db: AsyncSession = Depends(get_db)
+    player_id: int,
+    limit: int = Query(default=50, ge=1, le=200),
+    before: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Get recent chat history for a player."""
-    result = await db.execute(
-        select(ChatMessage)
-        .where(ChatMessage.player_id == player_id)
-        .order_by(ChatMessage.created_at.desc())
-        .limit(limit)
-    )
-    messages = result.scalars().all()
-    messages.reverse()  # chronological order
+    """Get recent chat history for a player.
+
+    Pages transparently from the hot table into archived episodes; pass the
+    returned ``next_before`` as ``before`` to fetch older messages.
+    """
+    try:
+        messages, next_before = await compaction_service.load_history(
+            db, player_id, limit, before
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid history cursor")
+    return ChatHistory(messages=messages, next_before=next_before)
+
+
+def _sse(event: str, data: dict, event_id: str | None = None) -> str:
+    """One Server-Sent Event; compact JSON never spans lines, so one data line suffices."""
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event}\ndata: {dumps_str(data)}\n\n"
+
+
+def _parse_event_id(last_event_id: str) -> tuple[str, int]:
+    reply_id, _, offset = last_event_id.rpartition(":")
+    if not reply_id or not offset.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    return reply_id, int(offset)
+
+
+async def _generate(
+    redis: aioredis.Redis,
+    session_factory: async_sessionmaker[AsyncSession],
+    player_id: int,
+    user_content: str,
+    turn: ChatTurn,
+    reply_id: str,
+    queue: asyncio.Queue,
+) -> None:
+    """Stream the reply into ``queue`` (None = done, an exception = failed), then persist it.
+
+    Runs as its own task so the reply is finished and saved - and resumable
+    from the reply buffer - even if the client disconnects mid-stream.
+    """
+    full_response = ""
+    try:
+        async for chunk in ChatService(redis).stream_reply(
+            player_id=player_id,
+            user_message=user_content,
+            character_prompt=load_character_prompt("yade"),
+            affinity_score=turn.affinity_score,
+            memory_facts=turn.memory_facts,
+            recalled_exchanges=turn.recalled_exchanges,
+            reply_id=reply_id,
+        ):
+            full_response += chunk
+            queue.put_nowait(chunk)
+    except Exception as e:
+        logger.warning("Chat reply for player %s failed", player_id, exc_info=True)
+        queue.put_nowait(e)
+        return
+    queue.put_nowait(None)
 
-    return ChatHistory(
-        messages=[{"role": m.role, "content": m.content} for m in messages]
+    try:
+        await chat_session_service.persist_exchange(
+            session_factory, player_id, user_content, full_response
+        )
+    except Exception:
+        logger.exception("Could not persist chat exchange of player %s", player_id)
+    # Post-session evaluation runs once the player has been idle for a while
+    await chat_session_service.mark_active(redis, player_id)
+
+
+async def _relay(queue: asyncio.Queue, reply_id: str) -> AsyncIterator[str]:
+    yield _sse("start", {"reply_id": reply_id}, f"{reply_id}:0")
+    index = 0
+    while (item := await queue.get()) is not None:
+        if isinstance(item, Exception):
+            yield _sse("error", {"content": str(item)})
+            return
+        index += 1
+        yield _sse("chunk", {"content": item}, f"{reply_id}:{index}")
+    yield _sse("end", {})
+
+
+async def _replay(
+    redis: aioredis.Redis, player_id: int, reply_id: str, offset: int
+) -> AsyncIterator[str]:
+    index = offset
+    try:
+        async for chunk in read_reply(redis, player_id, reply_id, offset):
+            index += 1
+            yield _sse("chunk", {"content": chunk}, f"{reply_id}:{index}")
+    except ReplyUnavailable as e:
+        yield _sse("error", {"content": str(e)})
+        return
+    yield _sse("end", {})
+
+
+@router.post("/stream/{player_id}")
+async def stream_chat(
+    player_id: int,
+    message: ChatMessageIn | None = None,
+    last_event_id: str | None = Header(default=None),
+    redis: aioredis.Redis = Depends(get_redis),
+    session_factory: async_sessionmaker[AsyncSession] = Depends(get_sessionmaker),
+):
+    """Send a chat message and stream the reply as Server-Sent Events.
+
+    The HTTP counterpart of the chat WebSocket for clients that only need
+    request/response: same context, prompt, reply buffer and persistence.
+    Events: ``start`` {reply_id}, ``chunk`` {content} with id
+    ``<reply_id>:<n>``, then ``end`` (or ``error`` {content}). Resend with
+    ``Last-Event-ID: <reply_id>:<n>`` to resume a dropped reply from chunk n
+    without a new LLM call; the body is ignored then.
+
+    A message counts against the player's chat limit and the global LLM
+    budget, a resume against the read limit (429 with Retry-After when over).
+    """
+    if last_event_id:
+        reply_id, offset = _parse_event_id(last_event_id)
+        await rate_limiter.hit(redis, "read", player_id)
+        return StreamingResponse(
+            _replay(redis, player_id, reply_id, offset),
+            media_type="text/event-stream", headers=SSE_HEADERS,
+        )
+
+    user_content = message.content.strip() if message else ""
+    if not user_content:
+        raise HTTPException(status_code=400, detail="Message content is empty")
+    await rate_limiter.hit_chat(redis, player_id)
+    turn = await chat_session_service.load_turn(session_factory, player_id, user_content)
+    if turn is None:
+        raise HTTPException(status_code=404, detail="Player not found")
+
+    reply_id = uuid.uuid4().hex
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(
+        _generate(redis, session_factory, player_id, user_content, turn, reply_id, queue)
+    )
+    _generations.add(task)
+    task.add_done_callback(_generations.discard)
+    return StreamingResponse(
+        _relay(queue, reply_id), media_type="text/event-stream", headers=SSE_HEADERS
     )
@@ -1,72 +1,174 @@
-"""Level endpoints - list levels, record choices, complete levels, query progress."""
+"""Level endpoints - list levels, record choices, complete levels, query progress, pause/resume."""
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+import redis.asyncio as aioredis
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from sqlalchemy import Row, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import InstrumentedAttribute
 
-from app.db.database import get_db
+from app.db.database import get_player_db, get_read_db
+from app.api.http_cache import is_not_modified, make_etag, not_modified, set_cache_headers
+from app.api.rate_limit import rate_limit
+from app.config import settings
+from app.core.level_engine import LevelEngine
+from app.db.redis import get_redis
 from app.models.player import Player
 from app.models.level import LevelChoice
 from app.schemas.level import (
+    BatchSubmitRequest,
+    BatchSubmitResponse,
+    LevelCatalogEntry,
     LevelSummary,
     MakeChoiceRequest,
     MakeChoiceResponse,
     LevelCompleteRequest,
     LevelCompleteResponse,
     LevelProgressResponse,
+    LevelState,
+    LevelStateSave,
 )
 from app.services.level_service import level_service
 from app.services.affinity_service import affinity_service
+from app.services.choice_batch_service import (
+    choice_batch_service,
+    choice_request_key,
+    natural_request_keys,
+)
+from app.services.choice_stats_service import choice_stats_service
+from app.services.idempotency_service import (
+    BATCH_SCOPE,
+    CHOICE_SCOPE,
+    REPLAYED_HEADER,
+    idempotency_service,
+)
+from app.services.level_save_service import level_save_service
+from app.services.player_service import player_service, PROGRESS_COLUMNS
 
 router = APIRouter()
 
 
-async def _get_player_or_404(player_id: int, db: AsyncSession) -> Player:
-    result = await db.execute(select(Player).where(Player.id == player_id))
-    player = result.scalar_one_or_none()
+async def _get_player_or_404(
+    player_id: int, db: AsyncSession, *columns: InstrumentedAttribute
+) -> Player:
+    player = await player_service.load(db, player_id, *columns)
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
     return player
 
 
-@router.get("/", response_model=list[LevelSummary])
-async def list_levels(player_id: int, db: AsyncSession = Depends(get_db)):
-    """List all levels with unlock status for a player."""
-    player = await _get_player_or_404(player_id, db)
+async def _get_player_columns_or_404(
+    player_id: int, db: AsyncSession, *columns: InstrumentedAttribute
+) -> Row:
+    row = await player_service.load_columns(db, player_id, *columns)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Player not found")
+    return row
+
+
+@router.get("/catalog", response_model=list[LevelCatalogEntry])
+async def get_level_catalog(request: Request, response: Response):
+    """All levels, without player state; cacheable by shared caches (ETag = content hash)."""
+    etag = make_etag(level_service.catalog_version())
+    cache_control = settings.LEVEL_CATALOG_CACHE_CONTROL
+    modified = level_service.catalog_modified()
+    if is_not_modified(request, etag, modified):
+        return not_modified(etag, cache_control, modified)
+    set_cache_headers(response, etag, cache_control, modified)
+    return level_service.list_levels()
 
-    all_levels = level_service.list_levels()
-    unlocked_ids = set(level_service.get_unlocked_levels(player.max_unlocked_level))
 
-    return [
-        LevelSummary(
-            id=lvl["id"],
-            title=lvl["title"],
-            order=lvl["order"],
-            is_unlocked=lvl["id"] in unlocked_ids,
+@router.get("/", response_model=list[LevelSummary], dependencies=[rate_limit("read")])
+async def list_levels(
+    player_id: int, request: Request, response: Response,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """List all levels with unlock status for a player.
+
+    The ETag covers the catalog version and the player's unlock progress.
+    """
+    player = await _get_player_columns_or_404(player_id, db, Player.max_unlocked_level)
+    etag = make_etag(level_service.catalog_version(), player.max_unlocked_level)
+    if is_not_modified(request, etag):
+        return not_modified(etag, settings.PLAYER_CACHE_CONTROL)
+    set_cache_headers(response, etag, settings.PLAYER_CACHE_CONTROL)
+    return level_service.level_summaries(player.max_unlocked_level)
+
+
+async def _replay_recorded_choice(
+    db: AsyncSession, player_id: int, request_key: str, req: MakeChoiceRequest
+) -> MakeChoiceResponse:
+    """Answer a retry that reached the database (the response cache missed)."""
+    existing = await db.scalar(
+        select(LevelChoice).where(
+            LevelChoice.player_id == player_id, LevelChoice.request_key == request_key
         )
-        for lvl in all_levels
-    ]
+    )
+    if existing is None:
+        # The insert failed on something other than the request key (e.g. the
+        # player was deleted meanwhile); let the client retry from scratch
+        raise HTTPException(status_code=409, detail="Concurrent submission, please retry")
+    if (existing.level_id, existing.node_id, existing.choice_id) != (
+        req.level_id, req.node_id, req.choice_id
+    ):
+        raise HTTPException(status_code=409, detail="A different choice was already recorded")
+    player = await _get_player_columns_or_404(player_id, db, Player.affinity_score)
+    return MakeChoiceResponse(
+        affinity_delta=existing.affinity_delta,
+        new_affinity_total=player.affinity_score,
+        affinity_tier=affinity_service.get_tier(player.affinity_score),
+    )
+
+
+@router.post("/choice", response_model=MakeChoiceResponse, dependencies=[rate_limit("choice")])
+async def make_choice(
+    req: MakeChoiceRequest,
+    player_id: int,
+    response: Response,
+    idempotency_key: str | None = Header(default=None, max_length=200),
+    db: AsyncSession = Depends(get_player_db),
+    redis: aioredis.Redis = Depends(get_redis),
+):
+    """Record a player's choice and return affinity change.
 
+    Retries (same ``Idempotency-Key``, or without one the same level and node)
+    return the original result instead of applying the affinity again.
+    """
+    # A cached response is served without touching the database; deleting a
+    # player drops its cache entries
+    request_key = choice_request_key(req.level_id, req.node_id, idempotency_key)
+    request = req.model_dump()
+    cached = await idempotency_service.get(redis, CHOICE_SCOPE, player_id, request_key)
+    if cached is not None:
+        if cached["request"] != request:
+            raise HTTPException(status_code=409, detail="A different choice was already recorded")
+        response.headers[REPLAYED_HEADER] = "true"
+        return MakeChoiceResponse(**cached["response"])
 
-@router.post("/choice", response_model=MakeChoiceResponse)
-async def make_choice(req: MakeChoiceRequest, player_id: int, db: AsyncSession = Depends(get_db)):
-    """Record a player's choice and return affinity change."""
-    player = await _get_player_or_404(player_id, db)
+    await _get_player_or_404(player_id, db, Player.affinity_score)
 
     # Look up the choice config from YAML
     choice_opt = level_service.get_choice_affinity(req.level_id, req.node_id, req.choice_id)
     if choice_opt is None:
         raise HTTPException(status_code=400, detail="Invalid level, node, or choice ID")
 
-    # Record the choice in DB
+    # Record the choice in DB; the unique request key rejects a retry that
+    # slipped past the cache before any affinity is applied
     choice_record = LevelChoice(
         player_id=player_id,
         level_id=req.level_id,
         node_id=req.node_id,
         choice_id=req.choice_id,
         affinity_delta=choice_opt.affinity_delta,
+        request_key=request_key,
     )
     db.add(choice_record)
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        response.headers[REPLAYED_HEADER] = "true"
+        return await _replay_recorded_choice(db, player_id, request_key, req)
 
     # Update affinity score
     new_total = await affinity_service.add_affinity(
@@ -74,43 +176,101 @@ async def make_choice(req: MakeChoiceRequest, player_id: int, db: AsyncSession =
         reason=f"{req.level_id}/{req.node_id}/{req.choice_id}",
     )
 
-    return MakeChoiceResponse(
+    result = MakeChoiceResponse(
         affinity_delta=choice_opt.affinity_delta,
         new_affinity_total=new_total,
         affinity_tier=affinity_service.get_tier(new_total),
     )
+    # Only a committed result may be replayed or counted
+    await db.commit()
+    await choice_stats_service.record(redis, req.level_id, req.node_id, req.choice_id)
+    await idempotency_service.store(
+        redis, CHOICE_SCOPE, player_id, request_key, request, result.model_dump()
+    )
+    return result
+
+
+@router.post("/batch", response_model=BatchSubmitResponse, dependencies=[rate_limit("choice")])
+async def submit_batch(
+    req: BatchSubmitRequest,
+    player_id: int,
+    response: Response,
+    idempotency_key: str | None = Header(default=None, max_length=200),
+    db: AsyncSession = Depends(get_player_db),
+    redis: aioredis.Redis = Depends(get_redis),
+):
+    """Apply queued choices (and level completions) in order, in one transaction.
+
+    Each choice gets its own status; already-recorded choices are reported as
+    replayed and not applied again. Resending a batch with the same
+    ``Idempotency-Key`` returns the original response and applies nothing.
+    """
+    request = req.model_dump()
+    if idempotency_key:
+        cached = await idempotency_service.get(redis, BATCH_SCOPE, player_id, idempotency_key)
+        if cached is not None:
+            if cached["request"] != request:
+                raise HTTPException(
+                    status_code=409, detail="A different batch was already submitted"
+                )
+            response.headers[REPLAYED_HEADER] = "true"
+            return BatchSubmitResponse(**cached["response"])
+
+    player = await _get_player_or_404(player_id, db, *PROGRESS_COLUMNS)
+    try:
+        result, applied = await choice_batch_service.apply(db, player, req)
+        completed = [c.level_id for c in result.completions if c.status == "completed"]
+        if completed:
+            # Nothing left to resume in a finished level
+            await level_save_service.clear(db, redis, player_id)
+        await db.commit()
+    except IntegrityError:
+        # A concurrent submission recorded one of these choices first
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Concurrent submission, please retry")
+    await choice_stats_service.record_many(redis, applied)
+    if completed:
+        await idempotency_service.forget(redis, CHOICE_SCOPE, player_id, [
+            key for level_id in completed
+            for key in natural_request_keys(level_service.load_level(level_id))
+        ])
+    if idempotency_key:
+        await idempotency_service.store(
+            redis, BATCH_SCOPE, player_id, idempotency_key, request, result.model_dump()
+        )
+    return result
 
 
-@router.post("/complete", response_model=LevelCompleteResponse)
+@router.post("/complete", response_model=LevelCompleteResponse, dependencies=[rate_limit("choice")])
 async def complete_level(
-    req: LevelCompleteRequest, player_id: int, db: AsyncSession = Depends(get_db)
+    req: LevelCompleteRequest,
+    player_id: int,
+    db: AsyncSession = Depends(get_player_db),
+    redis: aioredis.Redis = Depends(get_redis),
 ):
     """Mark a level as completed and unlock the next one."""
-    player = await _get_player_or_404(player_id, db)
+    player = await _get_player_or_404(player_id, db, *PROGRESS_COLUMNS)
 
     # Verify the level exists
     try:
-        level_service.load_level(req.level_id)
+        config = level_service.load_level(req.level_id)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Level not found")
 
-    # Determine next level
-    next_level_id = level_service.get_next_level_id(req.level_id)
-    unlocked = False
-
-    if next_level_id:
-        # Only unlock if player hasn't already passed this point
-        all_levels = level_service.list_levels()
-        current_max_order = _level_order(player.max_unlocked_level, all_levels)
-        next_order = _level_order(next_level_id, all_levels)
-        if next_order > current_max_order:
-            player.max_unlocked_level = next_level_id
-            unlocked = True
-
-    # Advance current_level_id
+    # Unlock the next level (if not already past it) and advance current_level_id
+    next_level_id, player.max_unlocked_level, unlocked = level_service.completion_progress(
+        req.level_id, player.max_unlocked_level
+    )
     player.current_level_id = next_level_id or req.level_id
+    # Nothing left to resume in a finished level
+    await level_save_service.clear(db, redis, player_id)
+    # Replaying the level is a new playthrough: its choices are recorded again
+    await choice_batch_service.release_level(db, player_id, config)
 
-    await db.flush()
+    await db.commit()
+    await idempotency_service.forget(
+        redis, CHOICE_SCOPE, player_id, natural_request_keys(config)
+    )
 
     return LevelCompleteResponse(
         next_level_id=next_level_id,
@@ -120,10 +280,10 @@ async def complete_level(
     )
 
 
-@router.get("/progress", response_model=LevelProgressResponse)
-async def get_progress(player_id: int, db: AsyncSession = Depends(get_db)):
+@router.get("/progress", response_model=LevelProgressResponse, dependencies=[rate_limit("read")])
+async def get_progress(player_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get current player progress across all levels."""
-    player = await _get_player_or_404(player_id, db)
+    player = await _get_player_columns_or_404(player_id, db, *PROGRESS_COLUMNS)
 
     unlocked_levels = level_service.get_unlocked_levels(player.max_unlocked_level)
 
@@ -135,8 +295,44 @@ async def get_progress(player_id: int, db: AsyncSession = Depends(get_db)):
     )
 
 
-def _level_order(level_id: str, all_levels: list[dict]) -> int:
-    for lvl in all_levels:
-        if lvl["id"] == level_id:
-            return lvl["order"]
-    return 0
+@router.put("/state", status_code=204, dependencies=[rate_limit("choice")])
+async def save_level_state(
+    req: LevelStateSave,
+    player_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    redis: aioredis.Redis = Depends(get_redis),
+):
+    """Pause: save the player's position in a level (Redis only, persisted in the background)."""
+    await _get_player_columns_or_404(player_id, db, Player.id)
+    try:
+        level_service.load_level(req.level_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Level not found")
+    for node_id, choice_id in req.choices.items():
+        if level_service.get_choice_affinity(req.level_id, node_id, choice_id) is None:
+            raise HTTPException(status_code=400, detail="Invalid level, node, or choice ID")
+    await LevelEngine(redis).save_state(player_id, req.level_id, req.node_id, req.choices)
+
+
+@router.get("/state", response_model=LevelState, dependencies=[rate_limit("read")])
+async def get_level_state(
+    player_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    redis: aioredis.Redis = Depends(get_redis),
+):
+    """Resume: the saved in-progress level state (one Redis read unless it has expired)."""
+    state = await level_save_service.resume(db, redis, player_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="No saved level state")
+    return LevelState(**state)
+
+
+@router.delete("/state", status_code=204, dependencies=[rate_limit("choice")])
+async def clear_level_state(
+    player_id: int,
+    db: AsyncSession = Depends(get_player_db),
+    redis: aioredis.Redis = Depends(get_redis),
+):
+    """Discard the saved in-progress level state."""
+    await _get_player_columns_or_404(player_id, db, Player.id)
+    await level_save_service.clear(db, redis, player_id)
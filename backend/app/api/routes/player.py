@@ -1,21 +1,43 @@
 """Player endpoints - create and manage player state."""
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+from datetime import datetime
 
-from app.db.database import get_db
+import redis.asyncio as aioredis
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+
+from app.api.http_cache import is_not_modified, make_etag, not_modified, set_cache_headers
+from app.api.rate_limit import rate_limit
+from app.config import settings
+from app.db.database import get_new_player_db, get_player_db, get_read_db
+from app.db.redis import get_redis
+from app.models.level import LevelChoice
 from app.models.player import Player
+from app.schemas.affinity import AffinityStatus
+from app.schemas.bootstrap import BootstrapResponse
+from app.schemas.chat import ChatHistory
+from app.schemas.level import LevelProgressResponse, LevelState
 from app.schemas.player import PlayerCreate, PlayerState, PlayerUpdate, PlayerResetResponse
 from app.services.affinity_service import affinity_service
+from app.services.bootstrap_service import bootstrap_service
+from app.services.compaction_service import compaction_service
+from app.services.deletion_service import deletion_service
+from app.services.idempotency_service import CHOICE_SCOPE, SCOPES, idempotency_service
+from app.services.level_save_service import level_save_service
+from app.services.level_service import level_service
+from app.services.player_service import player_service
 
 router = APIRouter()
 
 
-async def _get_player_or_404(player_id: int, db: AsyncSession) -> Player:
-    """Fetch a player by ID or raise 404."""
-    result = await db.execute(select(Player).where(Player.id == player_id))
-    player = result.scalar_one_or_none()
+async def _get_player_or_404(
+    player_id: int, db: AsyncSession, *columns: InstrumentedAttribute
+) -> Player:
+    """Fetch a player by ID or raise 404. Pass ``columns`` to load only those."""
+    player = await player_service.load(db, player_id, *columns)
     if player is None:
         raise HTTPException(status_code=404, detail="Player not found")
     return player
@@ -39,25 +61,102 @@ def _player_to_response(player: Player) -> PlayerState:
 
 
 @router.post("/", response_model=PlayerState, status_code=201)
-async def create_player(data: PlayerCreate, db: AsyncSession = Depends(get_db)):
+async def create_player(data: PlayerCreate, db: AsyncSession = Depends(get_new_player_db)):
     """Create a new player."""
-    player = Player(name=data.name, nickname=data.nickname)
+    player = Player(id=db.info.get("new_player_id"), name=data.name, nickname=data.nickname)
     db.add(player)
     await db.flush()
     await db.refresh(player)
     return _player_to_response(player)
 
 
-@router.get("/{player_id}", response_model=PlayerState)
-async def get_player(player_id: int, db: AsyncSession = Depends(get_db)):
-    """Get current player state."""
+def _player_etag(updated_at: datetime, affinity_score: int) -> str:
+    # The score is part of the validator too: two writes can share an updated_at
+    return make_etag(updated_at.isoformat(), affinity_score)
+
+
+@router.get("/{player_id}", response_model=PlayerState, dependencies=[rate_limit("read")])
+async def get_player(
+    player_id: int, request: Request, response: Response,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get current player state.
+
+    Supports If-None-Match / If-Modified-Since: a revalidation only reads
+    the player's version columns and answers 304 if nothing changed.
+    """
+    cache_control = settings.PLAYER_CACHE_CONTROL
+    if "if-none-match" in request.headers or "if-modified-since" in request.headers:
+        version = await player_service.load_columns(
+            db, player_id, Player.updated_at, Player.affinity_score
+        )
+        if version is None:
+            raise HTTPException(status_code=404, detail="Player not found")
+        etag = _player_etag(version.updated_at, version.affinity_score)
+        if is_not_modified(request, etag, version.updated_at):
+            return not_modified(etag, cache_control, version.updated_at)
+
     player = await _get_player_or_404(player_id, db)
+    set_cache_headers(
+        response, _player_etag(player.updated_at, player.affinity_score), cache_control,
+        player.updated_at,
+    )
     return _player_to_response(player)
 
 
+@router.get(
+    "/{player_id}/bootstrap", response_model=BootstrapResponse, dependencies=[rate_limit("read")]
+)
+async def bootstrap_player(
+    player_id: int,
+    versions: str | None = None,
+    history_limit: int = Query(default=20, ge=0, le=100),
+    db: AsyncSession = Depends(get_read_db),
+    redis: aioredis.Redis = Depends(get_redis),
+):
+    """Everything the client needs at launch: player, levels, progress, affinity,
+    recent chat history and the paused level state.
+
+    Pass the previous response's ``versions`` as ``section:version`` pairs
+    separated by commas; unchanged sections are left out.
+    """
+    async def load_rows() -> tuple[Player, tuple[list[dict], str | None]]:
+        # One session, so the database reads run back to back
+        player = await _get_player_or_404(player_id, db)
+        history = ([], None)
+        if history_limit:
+            history = await compaction_service.load_history(db, player_id, history_limit)
+        return player, history
+
+    (player, (messages, next_before)), (level_state, redis_available) = await asyncio.gather(
+        load_rows(), level_save_service.cached(redis, player_id)
+    )
+    if level_state is None:
+        level_state = await level_save_service.fallback(db, redis, player_id, redis_available)
+
+    all_levels = level_service.list_levels()
+    tier = affinity_service.get_tier(player.affinity_score)
+    sections = {
+        "player": _player_to_response(player),
+        "levels": level_service.level_summaries(player.max_unlocked_level, all_levels),
+        "progress": LevelProgressResponse(
+            current_level=player.current_level_id,
+            unlocked_levels=level_service.get_unlocked_levels(
+                player.max_unlocked_level, all_levels
+            ),
+            total_affinity=player.affinity_score,
+            affinity_tier=tier,
+        ),
+        "affinity": AffinityStatus(score=player.affinity_score, level=tier),
+        "chat_history": ChatHistory(messages=messages, next_before=next_before),
+        "level_state": LevelState(**level_state) if level_state else None,
+    }
+    return bootstrap_service.build(sections, bootstrap_service.parse_versions(versions))
+
+
 @router.patch("/{player_id}", response_model=PlayerState)
 async def update_player(
-    player_id: int, data: PlayerUpdate, db: AsyncSession = Depends(get_db)
+    player_id: int, data: PlayerUpdate, db: AsyncSession = Depends(get_player_db)
 ):
     """Update player profile fields (name, nickname, bio)."""
     player = await _get_player_or_404(player_id, db)
@@ -72,20 +171,42 @@ async def update_player(
 
 
 @router.delete("/{player_id}", status_code=204)
-async def delete_player(player_id: int, db: AsyncSession = Depends(get_db)):
-    """Delete a player and all associated data."""
-    player = await _get_player_or_404(player_id, db)
-    await db.delete(player)
-    await db.flush()
+async def delete_player(
+    player_id: int,
+    db: AsyncSession = Depends(get_player_db),
+    redis: aioredis.Redis = Depends(get_redis),
+):
+    """Delete a player and all associated data.
+
+    The player is tombstoned immediately; rows are removed by the background
+    deletion sweep (app.jobs.deletion).
+    """
+    if not await deletion_service.tombstone(db, player_id):
+        raise HTTPException(status_code=404, detail="Player not found")
+    await db.commit()
+    # Cached responses are served without a player check; don't replay them now
+    for scope in SCOPES:
+        await idempotency_service.forget_player(redis, scope, player_id)
 
 
 @router.post("/{player_id}/reset", response_model=PlayerResetResponse)
-async def reset_player_progress(player_id: int, db: AsyncSession = Depends(get_db)):
+async def reset_player_progress(
+    player_id: int,
+    db: AsyncSession = Depends(get_player_db),
+    redis: aioredis.Redis = Depends(get_redis),
+):
     """Reset player progress to the beginning (keeps player profile)."""
     player = await _get_player_or_404(player_id, db)
     player.reset_progress()
+    # Release the choice request keys so replayed levels record new choices
+    await db.execute(
+        update(LevelChoice).where(LevelChoice.player_id == player_id).values(request_key=None)
+    )
+    await level_save_service.clear(db, redis, player_id)
     await db.flush()
     await db.refresh(player)
+    await db.commit()
+    await idempotency_service.forget_player(redis, CHOICE_SCOPE, player_id)
     return PlayerResetResponse(
         message="Progress reset successfully",
         player=_player_to_response(player),
@@ -1,34 +1,41 @@
 """WebSocket endpoint for streaming free-chat with Yade."""
 
-import json
-from pathlib import Path
+import uuid
 
-import yaml
+import redis.asyncio as aioredis
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.database import get_db, async_session
+from app.api.websocket.connections import connection_hub
+from app.api.websocket.outbox import Outbox
+from app.core.rate_limit import RateLimited, rate_limiter
+from app.core.serialization import END_FRAME, error_frame, loads, start_frame
+from app.db.database import shard_router
+from app.db.sharding import PlayerMovingError
 from app.db.redis import get_redis_client
-from app.models.player import Player
-from app.models.chat_history import ChatMessage
 from app.services.chat_service import ChatService
-from app.services.affinity_service import affinity_service
-from app.services.llm_service import llm_service
-from app.services.memory_service import memory_service
+from app.services.chat_session_service import chat_session_service, load_character_prompt
+from app.services.reply_buffer import ReplyUnavailable, read_reply
 
 router = APIRouter()
 
-CHARACTER_DIR = Path(__file__).parent.parent.parent / "data" / "characters"
 
-
-def _load_character_prompt(character: str = "yade") -> str:
-    path = CHARACTER_DIR / f"{character}.yaml"
-    if path.exists():
-        with open(path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-        return data.get("system_prompt", "")
-    return ""
+async def _resume_reply(
+    outbox: Outbox, redis: aioredis.Redis, player_id: int, data: dict
+) -> None:
+    """Replay a buffered reply from ``offset`` (chunks the client already has)."""
+    offset = data.get("offset", 0)
+    if not isinstance(offset, int) or offset < 0:
+        outbox.send(error_frame("Invalid resume offset"))
+        return
+    try:
+        async for chunk in read_reply(redis, player_id, str(data.get("reply_id", "")), offset):
+            if not outbox.send_chunk(chunk):
+                return
+    except ReplyUnavailable as e:
+        outbox.send(error_frame(str(e)))
+        return
+    outbox.send(END_FRAME)
 
 
 @router.websocket("/ws/chat/{player_id}")
@@ -37,77 +44,102 @@ async def chat_websocket(websocket: WebSocket, player_id: int):
 
     Protocol:
     - Client sends: {"type": "message", "content": "..."}
+    - Server sends: {"type": "start", "reply_id": "..."} (reply begins)
     - Server sends: {"type": "chunk", "content": "..."} (streaming)
     - Server sends: {"type": "end"} (stream complete)
-    - Server sends: {"type": "error", "content": "..."} (on error)
+    - Client sends: {"type": "resume", "reply_id": "...", "offset": n} after a reconnect;
+      the server replays the chunks after the first n (no new LLM call), then "end"
+    - Server sends: {"type": "error", "content": "..."} (on error); when rate limited
+      it also carries "retry_after" (seconds) and the message is dropped
+    - Server may push frames at any time via the connection hub, e.g.
+      {"type": "replaced"} before closing with 4000 when the player connects elsewhere
+    - A client that can't keep up is closed with 4001 (it can resume the reply)
+
+    Frames go through a bounded per-connection Outbox, so a slow client never
+    stalls the LLM stream: queued chunks are coalesced, and the client is
+    dropped once the buffer passes WS_SEND_BUFFER_MAX_BYTES.
     """
     await websocket.accept()
+    try:
+        session_factory = await shard_router.sessionmaker_for(player_id)
+    except PlayerMovingError:
+        # 1013 = try again later
+        await websocket.close(code=1013, reason="Player data is being migrated")
+        return
 
     redis = get_redis_client()
     chat_svc = ChatService(redis)
-    character_prompt = _load_character_prompt("yade")
+    character_prompt = load_character_prompt("yade")
+    outbox = Outbox(websocket).start()
+    conn_id = await connection_hub.register(redis, player_id, websocket, outbox)
 
     try:
         while True:
             raw = await websocket.receive_text()
-            data = json.loads(raw)
+            outbox.touch()
+            data = loads(raw)
+            await connection_hub.refresh(redis, player_id, conn_id)
 
-            if data.get("type") != "message":
+            if data.get("type") not in ("resume", "message"):
                 continue
-
-            user_content = data.get("content", "").strip()
-            if not user_content:
+            try:
+                if data["type"] == "resume":
+                    await rate_limiter.hit(redis, "read", player_id)
+                    await _resume_reply(outbox, redis, player_id, data)
+                    continue
+                user_content = data.get("content", "").strip()
+                if not user_content:
+                    continue
+                await rate_limiter.hit_chat(redis, player_id)
+            except RateLimited as e:
+                outbox.send(error_frame(str(e), retry_after=round(e.retry_after, 1)))
                 continue
 
             # Load player state for affinity-aware responses
-            async with async_session() as db:
-                result = await db.execute(select(Player).where(Player.id == player_id))
-                player = result.scalar_one()
-                affinity_score = player.affinity_score
-                memory_facts = player.memory_facts or {}
-
-            # Stream response
+            turn = await chat_session_service.load_turn(session_factory, player_id, user_content)
+            if turn is None:
+                outbox.send(error_frame("Player not found"))
+                await outbox.aclose()
+                await websocket.close()
+                return
+
+            # Stream response. Chunks are only queued, so a slow client can't
+            # hold up generation; if it drops (or is dropped), keep generating
+            # into the reply buffer so a reconnect can resume instead of asking again
+            reply_id = uuid.uuid4().hex
+            outbox.send(start_frame(reply_id))
             full_response = ""
             async for chunk in chat_svc.stream_reply(
                 player_id=player_id,
                 user_message=user_content,
                 character_prompt=character_prompt,
-                affinity_score=affinity_score,
-                memory_facts=memory_facts,
+                affinity_score=turn.affinity_score,
+                memory_facts=turn.memory_facts,
+                recalled_exchanges=turn.recalled_exchanges,
+                reply_id=reply_id,
             ):
                 full_response += chunk
-                await websocket.send_text(
-                    json.dumps({"type": "chunk", "content": chunk}, ensure_ascii=False)
-                )
-
-            await websocket.send_text(json.dumps({"type": "end"}))
+                outbox.send_chunk(chunk)
+            outbox.send(END_FRAME)
 
             # Persist to DB (async, non-blocking to the user)
-            async with async_session() as db:
-                db.add(ChatMessage(
-                    player_id=player_id, role="user", content=user_content
-                ))
-                db.add(ChatMessage(
-                    player_id=player_id, role="assistant", content=full_response
-                ))
-                await db.commit()
+            await chat_session_service.persist_exchange(
+                session_factory, player_id, user_content, full_response
+            )
+            if outbox.closed:
+                raise WebSocketDisconnect()
 
     except WebSocketDisconnect:
         # On disconnect: evaluate affinity and extract memory from this session
-        context = await chat_svc.get_context(player_id)
-        if len(context) >= 2:  # at least one exchange
-            async with async_session() as db:
-                # Evaluate chat affinity
-                delta = await llm_service.evaluate_chat_affinity(context, character_prompt)
-                if delta != 0:
-                    await affinity_service.add_affinity(
-                        db, player_id, delta, "chat",
-                        reason=f"Chat session ({len(context)} messages)",
-                    )
-                # Extract memory facts
-                await memory_service.extract_and_save(db, player_id, context)
-                await db.commit()
+        try:
+            await chat_session_service.evaluate_session(
+                redis, session_factory, player_id, character_prompt
+            )
+        except RateLimited:
+            # Out of LLM budget: the idle-session job evaluates it later
+            await chat_session_service.defer_evaluation(redis, player_id)
     except Exception as e:
-        await websocket.send_text(
-            json.dumps({"type": "error", "content": str(e)}, ensure_ascii=False)
-        )
+        outbox.send(error_frame(str(e)))
+    finally:
+        await connection_hub.unregister(redis, player_id, conn_id)
+        await outbox.aclose()
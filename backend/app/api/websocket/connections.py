@@ -0,0 +1,247 @@
+"""Chat connection registry - route server-initiated frames to a player's socket on any node.
+
+Each worker process is a node. While a player is connected, Redis maps
+them to ``"<node>|<connection id>"`` (``ws:conn:{player_id}``) and every
+node subscribes to its own channel (``ws:node:{node}``). ``send`` delivers
+to a local socket directly, or publishes to the owning node, which
+forwards the frame to its socket. No sticky sessions are needed.
+
+A player has at most one live connection. When they reconnect (on any
+node) the new connection takes over the registry entry and the old one
+is told ``{"type": "replaced"}`` and closed with code 4000. Entries are
+only removed by the connection that owns them, so a late disconnect of
+the old socket can't unregister the new one.
+
+Connections registered with an Outbox get frames through its bounded send
+buffer, so a slow client can't stall delivery; ``connection_stats``
+reports the buffers of this node's connections.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+import redis.asyncio as aioredis
+from fastapi import WebSocket
+from starlette.websockets import WebSocketState
+
+from app.api.websocket.outbox import Outbox
+from app.config import settings
+from app.core.serialization import dumps, dumps_str, loads
+
+logger = logging.getLogger(__name__)
+
+NODE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+# Close code for a connection superseded by a newer one of the same player
+REPLACED_CLOSE_CODE = 4000
+REPLACED_FRAME = dumps_str({"type": "replaced"})
+
+# Delete / refresh the entry only while it still names this connection
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+_REFRESH_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def connection_key(player_id: int) -> str:
+    return f"ws:conn:{player_id}"
+
+
+# Seconds a replaced client gets to receive the notice; the new connection waits on it
+_REPLACED_FLUSH_TIMEOUT = 1.0
+
+
+def node_channel(node_id: str) -> str:
+    return f"ws:node:{node_id}"
+
+
+class ConnectionHub:
+    """This node's sockets plus the Redis registry and pub/sub routing between nodes."""
+
+    def __init__(self, node_id: str = NODE_ID):
+        self.node_id = node_id
+        # player_id -> (connection id, socket, outbox) for connections held by this node
+        self._local: dict[int, tuple[str, WebSocket, Outbox | None]] = {}
+        self._listener: asyncio.Task | None = None
+
+    def _entry(self, conn_id: str) -> str:
+        return f"{self.node_id}|{conn_id}"
+
+    @property
+    def local_count(self) -> int:
+        return len(self._local)
+
+    def connection_stats(self) -> list[dict]:
+        """Send-buffer metrics of this node's connections."""
+        return [
+            {"player_id": player_id, "conn_id": conn_id, **outbox.stats()}
+            for player_id, (conn_id, _, outbox) in self._local.items()
+            if outbox is not None
+        ]
+
+    async def register(
+        self,
+        redis: aioredis.Redis,
+        player_id: int,
+        websocket: WebSocket,
+        outbox: Outbox | None = None,
+    ) -> str:
+        """Take over the player's registry entry for ``websocket``; returns its connection id.
+
+        Frames for the connection go through ``outbox`` when given.
+        """
+        conn_id = uuid.uuid4().hex
+        previous_local = self._local.get(player_id)
+        self._local[player_id] = (conn_id, websocket, outbox)
+        try:
+            previous = await redis.set(
+                connection_key(player_id), self._entry(conn_id),
+                ex=settings.WS_REGISTRY_TTL, get=True,
+            )
+        except aioredis.RedisError:
+            # Local delivery still works; other nodes just can't reach this socket
+            logger.warning("Could not register connection of player %s", player_id, exc_info=True)
+            previous = None
+
+        if previous_local is not None:
+            await self._close_replaced(previous_local)
+        elif previous:
+            node_id, _, old_conn_id = previous.partition("|")
+            if node_id != self.node_id:
+                await self._publish(redis, node_id, {
+                    "op": "replace", "player_id": player_id, "conn_id": old_conn_id,
+                })
+        return conn_id
+
+    async def refresh(self, redis: aioredis.Redis, player_id: int, conn_id: str) -> None:
+        """Extend the entry's TTL while the connection is active."""
+        try:
+            await redis.eval(
+                _REFRESH_SCRIPT, 1, connection_key(player_id), self._entry(conn_id),
+                settings.WS_REGISTRY_TTL,
+            )
+        except aioredis.RedisError:
+            logger.warning("Could not refresh connection of player %s", player_id, exc_info=True)
+
+    async def unregister(self, redis: aioredis.Redis, player_id: int, conn_id: str) -> None:
+        """Forget the connection, unless a newer one has replaced it."""
+        local = self._local.get(player_id)
+        if local is not None and local[0] == conn_id:
+            del self._local[player_id]
+        try:
+            await redis.eval(_RELEASE_SCRIPT, 1, connection_key(player_id), self._entry(conn_id))
+        except aioredis.RedisError:
+            # The entry expires on its own
+            logger.warning("Could not unregister connection of player %s", player_id,
+                           exc_info=True)
+
+    async def send(self, redis: aioredis.Redis, player_id: int, frame: str) -> bool:
+        """Deliver a text frame to the player's connection wherever it is.
+
+        Returns False if the player isn't connected (or the owning node is gone).
+        """
+        local = self._local.get(player_id)
+        if local is not None:
+            return await self._deliver(local, frame)
+        try:
+            entry = await redis.get(connection_key(player_id))
+        except aioredis.RedisError:
+            logger.warning("Connection registry unavailable", exc_info=True)
+            return False
+        if not entry:
+            return False
+        node_id, _, conn_id = entry.partition("|")
+        return await self._publish(redis, node_id, {
+            "op": "send", "player_id": player_id, "conn_id": conn_id, "frame": frame,
+        })
+
+    async def _publish(self, redis: aioredis.Redis, node_id: str, message: dict) -> bool:
+        try:
+            return await redis.publish(node_channel(node_id), dumps(message)) > 0
+        except aioredis.RedisError:
+            logger.warning("Could not publish to node %s", node_id, exc_info=True)
+            return False
+
+    @staticmethod
+    async def _deliver(local: tuple[str, WebSocket, Outbox | None], frame: str) -> bool:
+        _, websocket, outbox = local
+        if outbox is not None:
+            return outbox.send(frame)
+        return await ConnectionHub._send_now(websocket, frame)
+
+    @staticmethod
+    async def _send_now(websocket: WebSocket, frame: str) -> bool:
+        if websocket.application_state != WebSocketState.CONNECTED:
+            return False
+        try:
+            await websocket.send_text(frame)
+        except (RuntimeError, OSError):
+            return False
+        return True
+
+    async def _close_replaced(self, local: tuple[str, WebSocket, Outbox | None]) -> None:
+        _, websocket, outbox = local
+        if outbox is not None:
+            # Whatever is still queued for it is moot now; the sender task
+            # writes the notice, so it never races a frame already in flight
+            await outbox.close(REPLACED_CLOSE_CODE, "Connected elsewhere", REPLACED_FRAME,
+                               timeout=_REPLACED_FLUSH_TIMEOUT)
+            return
+        if await self._send_now(websocket, REPLACED_FRAME):
+            try:
+                await websocket.close(code=REPLACED_CLOSE_CODE, reason="Connected elsewhere")
+            except RuntimeError:
+                pass
+
+    async def dispatch(self, raw: str | bytes) -> None:
+        """Handle one message from this node's channel."""
+        message = loads(raw)
+        local = self._local.get(message["player_id"])
+        if local is None or local[0] != message["conn_id"]:
+            return  # that connection is gone (or was replaced here)
+        if message["op"] == "send":
+            await self._deliver(local, message["frame"])
+        elif message["op"] == "replace":
+            del self._local[message["player_id"]]
+            await self._close_replaced(local)
+
+    async def listen(self, redis: aioredis.Redis) -> None:
+        """Consume this node's channel forever, resubscribing after Redis errors."""
+        while True:
+            try:
+                async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(node_channel(self.node_id))
+                    async for message in pubsub.listen():
+                        try:
+                            await self.dispatch(message["data"])
+                        except Exception:
+                            logger.exception("Bad message on %s", node_channel(self.node_id))
+            except asyncio.CancelledError:
+                raise
+            except aioredis.RedisError:
+                logger.warning("Connection hub subscriber lost Redis; retrying", exc_info=True)
+                await asyncio.sleep(1)
+
+    def start(self, redis: aioredis.Redis) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self.listen(redis), name="ws:hub")
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+
+connection_hub = ConnectionHub()
@@ -0,0 +1,174 @@
+"""Per-connection send buffer - backpressure and slow-consumer handling.
+
+Handlers never await the socket directly: they queue frames on the
+connection's Outbox and a sender task writes them out. A reply streaming
+to a slow client therefore never blocks the LLM stream:
+
+- While the client is behind, consecutive chunks are coalesced into the
+  queued chunk frame, so the queue grows in bytes, not frames.
+- Past WS_SEND_BUFFER_MAX_BYTES queued bytes (or WS_SEND_BUFFER_MAX_FRAMES
+  frames) the client is too slow: the connection is closed with 4001 and
+  the outbox stops accepting frames.
+
+Dead sockets are reaped by the server's protocol-level ping (uvicorn's
+--ws-ping-interval / --ws-ping-timeout), which every WebSocket client
+answers on its own, even while a long reply is streaming.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.config import settings
+from app.core.serialization import chunk_frame
+
+logger = logging.getLogger(__name__)
+
+SLOW_CONSUMER_CLOSE_CODE = 4001
+
+_CHUNK = "chunk"
+_FRAME = "frame"
+
+
+class Outbox:
+    """Bounded, coalescing send queue for one WebSocket connection."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_frames: int | None = None,
+        max_bytes: int | None = None,
+    ):
+        self.websocket = websocket
+        self.max_frames = max_frames or settings.WS_SEND_BUFFER_MAX_FRAMES
+        self.max_bytes = max_bytes or settings.WS_SEND_BUFFER_MAX_BYTES
+        # [kind, text]: chunk entries hold raw content so more can be appended
+        self._queue: deque[list[str]] = deque()
+        self._queued_bytes = 0
+        self._wakeup = asyncio.Event()
+        self._sender: asyncio.Task | None = None
+        self._closer: asyncio.Task | None = None
+        self.closed = False
+        self.close_code: int | None = None
+        self.last_received = time.monotonic()
+        # Metrics
+        self.sent_frames = 0
+        self.coalesced_chunks = 0
+        self.peak_bytes = 0
+
+    def start(self) -> "Outbox":
+        self._sender = asyncio.create_task(self._send_loop(), name="ws:sender")
+        return self
+
+    def touch(self) -> None:
+        """Record inbound traffic (reported as ``idle_seconds``)."""
+        self.last_received = time.monotonic()
+
+    def send(self, frame: str) -> bool:
+        """Queue a complete frame; False if the connection is closed or just overflowed."""
+        return self._enqueue(_FRAME, frame)
+
+    def send_chunk(self, content: str) -> bool:
+        """Queue a reply chunk, merging it into a chunk frame still waiting to be sent."""
+        if not self.closed and self._queue and self._queue[-1][0] == _CHUNK:
+            self._queue[-1][1] += content
+            self.coalesced_chunks += 1
+            return self._account(len(content))
+        return self._enqueue(_CHUNK, content)
+
+    def _enqueue(self, kind: str, text: str) -> bool:
+        if self.closed:
+            return False
+        self._queue.append([kind, text])
+        self._wakeup.set()
+        return self._account(len(text))
+
+    def _account(self, size: int) -> bool:
+        self._queued_bytes += size
+        self.peak_bytes = max(self.peak_bytes, self._queued_bytes)
+        if self._queued_bytes > self.max_bytes or len(self._queue) > self.max_frames:
+            logger.info("Closing slow WebSocket client (%d bytes queued)", self._queued_bytes)
+            self._abort(SLOW_CONSUMER_CLOSE_CODE, "Client too slow")
+            return False
+        return True
+
+    def _abort(self, code: int, reason: str) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.close_code = code
+        self._queue.clear()
+        self._queued_bytes = 0
+        self._wakeup.set()
+        # Kept so the task isn't garbage-collected mid-close; aclose awaits it
+        self._closer = asyncio.create_task(self._close_socket(code, reason), name="ws:closer")
+
+    async def _close_socket(self, code: int, reason: str) -> None:
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except (RuntimeError, OSError):
+            pass  # already closed
+
+    async def _send_loop(self) -> None:
+        try:
+            while True:
+                if not self._queue:
+                    if self.closed:
+                        return
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                kind, text = self._queue.popleft()
+                self._queued_bytes -= len(text)
+                await self.websocket.send_text(chunk_frame(text) if kind == _CHUNK else text)
+                self.sent_frames += 1
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            self.closed = True
+            self._queue.clear()
+            self._queued_bytes = 0
+
+    async def aclose(self, timeout: float = 5.0) -> None:
+        """Flush what is queued (up to ``timeout``), then stop the sender task."""
+        if not self.closed:
+            self.closed = True
+            self._wakeup.set()
+            if self._sender is not None:
+                await asyncio.wait([self._sender], timeout=timeout)
+        if self._sender is not None:
+            self._sender.cancel()
+            await asyncio.gather(self._sender, return_exceptions=True)
+        if self._closer is not None:
+            await self._closer
+
+    async def close(
+        self, code: int, reason: str, frame: str | None = None, timeout: float = 5.0
+    ) -> None:
+        """Drop what is queued, send ``frame`` last, then close the socket with ``code``.
+
+        The frame goes through the sender task, so it never races a send in flight.
+        """
+        if self.closed:
+            await self.aclose(timeout)
+            return
+        self._queue.clear()
+        self._queued_bytes = 0
+        if frame is not None:
+            self.send(frame)
+        self.close_code = code
+        await self.aclose(timeout)
+        await self._close_socket(code, reason)
+
+    def stats(self) -> dict:
+        return {
+            "queued_frames": len(self._queue),
+            "queued_bytes": self._queued_bytes,
+            "peak_bytes": self.peak_bytes,
+            "sent_frames": self.sent_frames,
+            "coalesced_chunks": self.coalesced_chunks,
+            "idle_seconds": round(time.monotonic() - self.last_received, 1),
+            "closed": self.closed,
+            "close_code": self.close_code,
+        }
@@ -1,14 +1,59 @@
 """Level engine - handles level state transitions and pause/resume logic."""
 
-import json
+import time
 
 import redis.asyncio as aioredis
 
 from app.config import settings
 
+# Players whose state changed since the last write-behind flush to level_saves
+DIRTY_KEY = "level:state:dirty"
+
+_CHOICE_PREFIX = "choice:"
+
+
+def _choice_prefix(level_id: str) -> str:
+    return f"{_CHOICE_PREFIX}{level_id}:"
+
+
+def state_mapping(level_id: str, node_id: str, choices: dict[str, str], saved_at: float) -> dict:
+    """Hash fields for a state: position fields plus one field per choice."""
+    prefix = _choice_prefix(level_id)
+    return {
+        "level_id": level_id,
+        "node_id": node_id,
+        "saved_at": saved_at,
+        **{prefix + node: choice for node, choice in choices.items()},
+    }
+
+
+def parse_state(raw: dict[str, str]) -> dict | None:
+    """Decode a state hash into {"level_id", "node_id", "choices", "saved_at"}.
+
+    Choice fields are namespaced by level, so fields left over from a level
+    the player abandoned are ignored.
+    """
+    if "level_id" not in raw:
+        return None
+    prefix = _choice_prefix(raw["level_id"])
+    return {
+        "level_id": raw["level_id"],
+        "node_id": raw["node_id"],
+        "choices": {
+            field[len(prefix):]: value for field, value in raw.items() if field.startswith(prefix)
+        },
+        "saved_at": float(raw.get("saved_at", 0)),
+    }
+
 
 class LevelEngine:
-    """Manages in-progress level state (pause/resume) via Redis."""
+    """Manages in-progress level state (pause/resume) via Redis.
+
+    The state is a hash per player holding the current level and node plus
+    one field per choice made, so a pause only writes what changed. Writes
+    also mark the player dirty; ``app.jobs.level_saves`` copies dirty states
+    to Postgres, which resume falls back to once the hash has expired.
+    """
 
     def __init__(self, redis: aioredis.Redis):
         self.redis = redis
@@ -16,18 +61,45 @@ class LevelEngine:
     def _state_key(self, player_id: int) -> str:
         return f"level:state:{player_id}"
 
-    async def save_state(self, player_id: int, level_id: str, node_id: str) -> None:
-        """Save paused level state. Expires after TTL."""
-        state = json.dumps({"level_id": level_id, "node_id": node_id})
-        await self.redis.set(self._state_key(player_id), state, ex=settings.CHAT_CONTEXT_TTL)
+    async def save_state(
+        self, player_id: int, level_id: str, node_id: str, choices: dict[str, str] | None = None
+    ) -> None:
+        """Save paused level state, merging in new choices. One round trip; expires after TTL."""
+        key = self._state_key(player_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=state_mapping(level_id, node_id, choices or {}, time.time()))
+            pipe.expire(key, settings.LEVEL_STATE_TTL)
+            pipe.sadd(DIRTY_KEY, player_id)
+            await pipe.execute()
 
     async def load_state(self, player_id: int) -> dict | None:
-        """Load paused level state, or None if expired/doesn't exist."""
-        raw = await self.redis.get(self._state_key(player_id))
-        if raw:
-            return json.loads(raw)
-        return None
+        """Load paused level state, or None if expired/doesn't exist. One round trip."""
+        return parse_state(await self.redis.hgetall(self._state_key(player_id)))
+
+    async def load_states(self, player_ids: list[int]) -> dict[int, dict]:
+        """States of several players in one pipelined round trip; missing ones are left out."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for player_id in player_ids:
+                pipe.hgetall(self._state_key(player_id))
+            raws = await pipe.execute()
+        states = {pid: parse_state(raw) for pid, raw in zip(player_ids, raws)}
+        return {pid: state for pid, state in states.items() if state is not None}
+
+    async def restore_state(self, player_id: int, state: dict) -> None:
+        """Re-cache a state read back from Postgres (not marked dirty: it is already saved)."""
+        key = self._state_key(player_id)
+        mapping = state_mapping(
+            state["level_id"], state["node_id"], state["choices"], state["saved_at"]
+        )
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, settings.LEVEL_STATE_TTL)
+            await pipe.execute()
 
     async def clear_state(self, player_id: int) -> None:
         """Clear saved level state (player exited or completed level)."""
-        await self.redis.delete(self._state_key(player_id))
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._state_key(player_id))
+            pipe.srem(DIRTY_KEY, player_id)
+            await pipe.execute()
@@ -0,0 +1,200 @@
+"""Rate limiting - Redis token buckets shared by every node, with local leases.
+
+Each bucket is a Redis hash (``tokens``, ``ts``) updated by one Lua script,
+so concurrent nodes can't both spend the last token. Buckets exist per
+player and route class (``chat``, ``choice``, ``read``) plus one global
+``llm`` bucket, priced in estimated LLM tokens and charged for chat turns,
+session evaluations and compaction summaries.
+
+Fast path: when a call leaves a bucket more than half full, the script also
+hands the node a small lease of extra tokens (RATE_LIMIT_LEASE_CALLS calls'
+worth, valid RATE_LIMIT_LEASE_TTL seconds). Later calls spend the lease
+without touching Redis. Leased tokens are already deducted from the shared
+bucket, so leases never let a player exceed the limit; an unused lease just
+expires. Callers near their limit get no lease and go to Redis every time.
+
+Limiting fails open: if Redis is down, calls are let through.
+"""
+
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+ROUTE_CLASSES = ("chat", "choice", "read")
+
+# KEYS[1] bucket; ARGV: capacity, refill per second, cost, lease wanted.
+# Returns {allowed, retry_after, lease granted}; floats as strings (Lua -> integer truncates).
+# Time comes from the Redis server, so skewed node clocks can't mint or burn tokens.
+_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local lease = tonumber(ARGV[4])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+local granted = 0
+if tokens >= cost then
+    allowed = 1
+    tokens = tokens - cost
+    granted = math.min(lease, math.floor(tokens - capacity / 2))
+    if granted > 0 then
+        tokens = tokens - granted
+    else
+        granted = 0
+    end
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(retry_after), granted}
+"""
+
+# KEYS[1] bucket; ARGV: capacity, tokens to give back. A missing bucket is already full.
+_REFUND_SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then
+    redis.call('HSET', KEYS[1], 'tokens', math.min(tonumber(ARGV[1]), tokens + tonumber(ARGV[2])))
+end
+return 0
+"""
+
+
+class RateLimited(Exception):
+    """The caller is over a limit; retry after ``retry_after`` seconds."""
+
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded ({scope})")
+        self.scope = scope
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+@dataclass(frozen=True)
+class Bucket:
+    capacity: float  # burst size
+    refill: float  # tokens per second
+
+
+def route_bucket(route_class: str) -> Bucket:
+    """The per-player bucket for a route class, from settings (requests per minute)."""
+    per_minute, burst = {
+        "chat": (settings.RATE_LIMIT_CHAT_PER_MINUTE, settings.RATE_LIMIT_CHAT_BURST),
+        "choice": (settings.RATE_LIMIT_CHOICE_PER_MINUTE, settings.RATE_LIMIT_CHOICE_BURST),
+        "read": (settings.RATE_LIMIT_READ_PER_MINUTE, settings.RATE_LIMIT_READ_BURST),
+    }[route_class]
+    return Bucket(capacity=burst, refill=per_minute / 60)
+
+
+def llm_bucket() -> Bucket:
+    """The global LLM budget, in estimated tokens, shared by all players."""
+    per_minute = settings.LLM_TOKEN_BUDGET_PER_MINUTE
+    return Bucket(capacity=per_minute, refill=per_minute / 60)
+
+
+def bucket_key(scope: str, player_id: int | None = None) -> str:
+    return f"ratelimit:{scope}" if player_id is None else f"ratelimit:{scope}:{player_id}"
+
+
+class RateLimiter:
+    def __init__(self):
+        # bucket key -> (leased tokens left, lease expiry on the monotonic clock)
+        self._leases: dict[str, tuple[float, float]] = {}
+
+    def clear_leases(self) -> None:
+        self._leases.clear()
+
+    def _spend_lease(self, key: str, cost: float) -> bool:
+        lease = self._leases.get(key)
+        if lease is None:
+            return False
+        tokens, expires = lease
+        if expires <= time.monotonic() or tokens < cost:
+            del self._leases[key]
+            return False
+        self._leases[key] = (tokens - cost, expires)
+        return True
+
+    def _store_lease(self, key: str, tokens: float) -> None:
+        now = time.monotonic()
+        if len(self._leases) >= settings.RATE_LIMIT_MAX_LEASES:
+            self._leases = {k: v for k, v in self._leases.items() if v[1] > now}
+            if len(self._leases) >= settings.RATE_LIMIT_MAX_LEASES:
+                return
+        self._leases[key] = (tokens, now + settings.RATE_LIMIT_LEASE_TTL)
+
+    async def acquire(
+        self, redis: aioredis.Redis, key: str, bucket: Bucket, cost: float = 1
+    ) -> None:
+        """Take ``cost`` tokens from the bucket at ``key``; raises RateLimited if short."""
+        if not settings.RATE_LIMIT_ENABLED or self._spend_lease(key, cost):
+            return
+        lease = cost * settings.RATE_LIMIT_LEASE_CALLS
+        try:
+            allowed, retry_after, granted = await redis.eval(
+                _BUCKET_SCRIPT, 1, key, bucket.capacity, bucket.refill, cost, lease
+            )
+        except aioredis.RedisError:
+            logger.warning("Rate limiter unavailable; letting %s through", key, exc_info=True)
+            return
+        if not int(allowed):
+            raise RateLimited(key.split(":")[1], float(retry_after))
+        if int(granted) > 0:
+            self._store_lease(key, int(granted))
+
+    async def refund(
+        self, redis: aioredis.Redis, key: str, bucket: Bucket, cost: float = 1
+    ) -> None:
+        """Give back ``cost`` tokens taken by acquire for work that didn't happen."""
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        lease = self._leases.get(key)
+        if lease is not None and lease[1] > time.monotonic():
+            # Leased tokens are already off the shared bucket; keep the refund local too
+            self._leases[key] = (lease[0] + cost, lease[1])
+            return
+        try:
+            await redis.eval(_REFUND_SCRIPT, 1, key, bucket.capacity, cost)
+        except aioredis.RedisError:
+            logger.warning("Could not refund %s", key, exc_info=True)
+
+    async def hit(self, redis: aioredis.Redis, route_class: str, player_id: int) -> None:
+        """Count one request of ``route_class`` against the player's bucket."""
+        await self.acquire(redis, bucket_key(route_class, player_id), route_bucket(route_class))
+
+    async def spend_llm(self, redis: aioredis.Redis, tokens: float) -> None:
+        """Charge ``tokens`` (an estimate) against the global LLM budget."""
+        await self.acquire(redis, bucket_key("llm"), llm_bucket(), tokens)
+
+    async def hit_chat(self, redis: aioredis.Redis, player_id: int) -> None:
+        """Count one chat turn: the player's chat bucket, then the global LLM budget.
+
+        The player's bucket goes first so a player over their own limit can't
+        drain the shared budget; if the budget turns the turn away, the
+        player's token is refunded.
+        """
+        await self.hit(redis, "chat", player_id)
+        try:
+            await self.spend_llm(redis, settings.LLM_TOKENS_PER_CHAT_ESTIMATE)
+        except RateLimited:
+            await self.refund(redis, bucket_key("chat", player_id), route_bucket("chat"))
+            raise
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,88 @@
+"""JSON serialization - orjson when available, the stdlib otherwise.
+
+Used for WebSocket frames, Redis payloads, NDJSON exports and responses
+that have no response model. Routes with a response model are already
+serialized by Pydantic's Rust encoder (FastAPI's fast path, which only
+applies with the default response class), so don't set a custom
+``default_response_class`` on the app.
+
+``JSON_BACKEND`` selects the implementation: "auto" (orjson if installed),
+"orjson" or "stdlib". Both emit compact UTF-8 JSON and accept datetimes.
+"""
+
+import json
+from collections.abc import Callable
+from datetime import date, datetime
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def _stdlib_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(value: Any) -> bytes:
+    return json.dumps(
+        value, ensure_ascii=False, separators=(",", ":"), default=_stdlib_default
+    ).encode("utf-8")
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _select(name: str) -> tuple[str, Callable[[Any], bytes], Callable[[str | bytes], Any]]:
+    if name == "stdlib" or (name == "auto" and orjson is None):
+        return "stdlib", _stdlib_dumps, json.loads
+    if name in ("auto", "orjson"):
+        if orjson is None:
+            raise RuntimeError("JSON_BACKEND=orjson but orjson is not installed")
+        return "orjson", _orjson_dumps, orjson.loads
+    raise ValueError(f"Unknown JSON_BACKEND: {name!r}")
+
+
+BACKEND, dumps, loads = _select(settings.JSON_BACKEND)
+
+
+def dumps_str(value: Any) -> str:
+    """``dumps`` as text, for APIs that take str (WebSocket text frames, Redis)."""
+    return dumps(value).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the selected backend (for routes without a response model)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# --- Chat WebSocket frames: fixed shapes, only the content is encoded per frame ---
+
+END_FRAME = dumps_str({"type": "end"})
+_START_PREFIX = '{"type":"start","reply_id":'
+_CHUNK_PREFIX = '{"type":"chunk","content":'
+_ERROR_PREFIX = '{"type":"error","content":'
+
+
+def start_frame(reply_id: str) -> str:
+    return _START_PREFIX + dumps_str(reply_id) + "}"
+
+
+def chunk_frame(content: str) -> str:
+    return _CHUNK_PREFIX + dumps_str(content) + "}"
+
+
+def error_frame(content: str, retry_after: float | None = None) -> str:
+    if retry_after is None:
+        return _ERROR_PREFIX + dumps_str(content) + "}"
+    return dumps_str({"type": "error", "content": content, "retry_after": retry_after})
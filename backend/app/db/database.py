@@ -1,25 +1,217 @@
 """SQLAlchemy async engine and session factory."""
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
+import asyncio
+import logging
+import time
+from collections.abc import Iterable
+from contextlib import asynccontextmanager
+from itertools import chain
+
+import redis.asyncio as aioredis
+from fastapi import Depends, HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import DeclarativeBase, Session
 
 from app.config import settings
+from app.db.pool_metrics import InstrumentedQueuePool
+from app.db.redis import get_redis, get_redis_client
+from app.db.sharding import PlayerMovingError, ShardRouter
+
+logger = logging.getLogger(__name__)
+
+# session.info key collecting player IDs touched by the current unit of work
+_WRITTEN_PLAYERS = "written_player_ids"
+
+
+def _engine_options(url: str) -> dict:
+    """Engine keyword arguments; pool and driver tuning only applies to Postgres."""
+    options: dict = {"echo": settings.DB_ECHO}
+    if url.startswith("postgresql"):
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            connect_args={
+                "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+                "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+            },
+        )
+    return options
 
-engine = create_async_engine(settings.DATABASE_URL, echo=settings.DEBUG)
+
+engine = create_async_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
 
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Read replica: falls back to the primary engine when no replica is configured
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = create_async_engine(
+        settings.DATABASE_REPLICA_URL, **_engine_options(settings.DATABASE_REPLICA_URL)
+    )
+else:
+    replica_engine = engine
+
+replica_session = async_sessionmaker(
+    replica_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+# Player shards: shard 0 is the primary above; extra shards follow in order
+shard_router = ShardRouter(
+    [engine] + [
+        create_async_engine(url, **_engine_options(url)) for url in settings.SHARD_DATABASE_URLS
+    ],
+    cache_ttl=settings.SHARD_DIRECTORY_CACHE_TTL,
+    cache_size=settings.SHARD_DIRECTORY_CACHE_SIZE,
+)
+
 
 class Base(DeclarativeBase):
     pass
 
 
-async def get_db() -> AsyncSession:
-    """Dependency that yields an async database session."""
-    async with async_session() as session:
+def _last_write_key(player_id: int) -> str:
+    return f"db:last_write:{player_id}"
+
+
+def note_player_write(session: AsyncSession | Session, player_id: int) -> None:
+    """Record a write to ``player_id`` that the flush tracker can't see (e.g. Core UPDATEs)."""
+    session.info.setdefault(_WRITTEN_PLAYERS, set()).add(player_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_player_writes(session: Session, flush_context) -> None:
+    """Collect the IDs of players whose rows (or child rows) were flushed."""
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if obj.__tablename__ == "players":
+            player_id = obj.id
+        else:
+            player_id = getattr(obj, "player_id", None)
+        if player_id is not None:
+            note_player_write(session, player_id)
+
+
+async def record_player_writes(player_ids: Iterable[int]) -> None:
+    """Mark players as recently written so their reads stick to the primary."""
+    if replica_engine is engine:
+        return
+    try:
+        async with get_redis_client().pipeline(transaction=False) as pipe:
+            now = time.time()
+            for player_id in player_ids:
+                pipe.set(_last_write_key(player_id), now, ex=settings.READ_YOUR_WRITES_WINDOW)
+            await pipe.execute()
+    except aioredis.RedisError:
+        # Worst case a player briefly reads replica-lagged data
+        logger.warning("Could not record player writes for read-your-writes", exc_info=True)
+
+
+@asynccontextmanager
+async def _unit_of_work(factory: async_sessionmaker[AsyncSession]):
+    """Session committed on success, rolled back on error; records player writes."""
+    async with factory() as session:
         try:
             yield session
             await session.commit()
         except Exception:
             await session.rollback()
             raise
+        written = session.info.pop(_WRITTEN_PLAYERS, None)
+        if written:
+            await record_player_writes(written)
+
+
+async def _shard_for_request(player_id: int) -> int:
+    try:
+        return await shard_router.shard_for(player_id)
+    except PlayerMovingError:
+        raise HTTPException(
+            status_code=503, detail="Player data is being migrated, retry shortly"
+        ) from None
+
+
+async def get_player_db(player_id: int) -> AsyncSession:
+    """Dependency that yields a session on the player's shard.
+
+    ``player_id`` is the route's own path or query parameter. Routes that
+    aren't about one player use get_global_db instead.
+    """
+    if not shard_router.sharded:
+        factory = async_session
+    else:
+        factory = shard_router.sessions[await _shard_for_request(player_id)]
+    async with _unit_of_work(factory) as session:
+        yield session
+
+
+async def get_sessionmaker(player_id: int) -> async_sessionmaker[AsyncSession]:
+    """Dependency for work that outlives the request (e.g. a streamed reply).
+
+    Returns the player's shard's session factory instead of a session, so
+    the work can open its own transactions after the response has started.
+    """
+    return shard_router.sessions[await _shard_for_request(player_id)]
+
+
+async def get_global_db() -> AsyncSession:
+    """Dependency for global (not per-player) tables, which live on shard 0."""
+    async with _unit_of_work(async_session) as session:
+        yield session
+
+
+async def get_new_player_db() -> AsyncSession:
+    """Dependency for creating a player: reserves its global ID and shard.
+
+    The reserved ID is in ``session.info["new_player_id"]``; it is None
+    when unsharded, where the database assigns the ID on insert.
+    """
+    player_id, shard_id = await shard_router.allocate_player()
+    factory = async_session if shard_id == 0 else shard_router.sessions[shard_id]
+    async with _unit_of_work(factory) as session:
+        session.info["new_player_id"] = player_id
+        yield session
+
+
+async def needs_primary(redis: aioredis.Redis, player_id: int) -> bool:
+    """True if the player wrote within the read-your-writes window (or we can't tell)."""
+    try:
+        return bool(await redis.exists(_last_write_key(player_id)))
+    except aioredis.RedisError:
+        return True
+
+
+async def get_read_db(
+    player_id: int, redis: aioredis.Redis = Depends(get_redis)
+) -> AsyncSession:
+    """Dependency for read-only endpoints: replica session unless the player just wrote.
+
+    Must only be used on routes that never write - the session is not committed.
+    Replicas only exist for shard 0; other shards are read from their primary.
+    """
+    shard_id = await _shard_for_request(player_id)
+    if shard_id != 0:
+        factory = shard_router.sessions[shard_id]
+    elif replica_engine is engine or await needs_primary(redis, player_id):
+        factory = async_session
+    else:
+        factory = replica_session
+    async with factory() as session:
+        yield session
+
+
+async def warm_pool(target: AsyncEngine, size: int) -> None:
+    """Open ``size`` connections concurrently and return them to the pool.
+
+    Moves connect/auth latency out of the first requests after a deploy.
+    """
+    connections = await asyncio.gather(*(target.connect() for _ in range(size)))
+    for conn in connections:
+        await conn.close()
@@ -0,0 +1,114 @@
+"""Monthly range partitions for chat_messages (Postgres only).
+
+The table is partitioned by ``created_at`` in migration 0007. Partitions
+are named ``chat_messages_yYYYYmMM`` so their range can be read off the
+name. Future months are created ahead of time; whole months past the
+retention cutoff are detached and dropped, which is a metadata operation
+instead of a large DELETE. On SQLite (tests) or an unpartitioned table
+every function here is a no-op.
+"""
+
+import logging
+import re
+from datetime import date, datetime
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "chat_messages"
+_PARTITION_RE = re.compile(rf"^{PARENT_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def parse_partition_name(name: str) -> date | None:
+    match = _PARTITION_RE.match(name)
+    return date(int(match[1]), int(match[2]), 1) if match else None
+
+
+def create_partition_sql(month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    result = await conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :table"
+    ), {"table": PARENT_TABLE})
+    return result.scalar() is not None
+
+
+async def list_partitions(conn: AsyncConnection) -> list[date]:
+    """Month starts of the existing chat_messages partitions, oldest first."""
+    result = await conn.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table"
+    ), {"table": PARENT_TABLE})
+    months = [parse_partition_name(name) for name in result.scalars()]
+    return sorted(m for m in months if m is not None)
+
+
+async def ensure_future_partitions(
+    engine: AsyncEngine, months_ahead: int, today: date
+) -> list[str]:
+    """Create partitions for the current month and ``months_ahead`` after it."""
+    created = []
+    async with engine.begin() as conn:
+        if not await is_partitioned(conn):
+            return created
+        existing = set(await list_partitions(conn))
+        first = month_start(today)
+        for offset in range(months_ahead + 1):
+            month = add_months(first, offset)
+            if month not in existing:
+                await conn.execute(text(create_partition_sql(month)))
+                created.append(partition_name(month))
+    if created:
+        logger.info("Created chat_messages partitions: %s", created)
+    return created
+
+
+async def drop_partitions_before(engine: AsyncEngine, cutoff: datetime) -> list[str]:
+    """Detach and drop partitions whose whole month is older than ``cutoff``.
+
+    Uses DETACH ... CONCURRENTLY (Postgres 14+), which can't run inside a
+    transaction, so each statement is issued in autocommit mode.
+    """
+    dropped = []
+    async with engine.connect() as conn:
+        # Before any statement: the isolation level can't change once a transaction began
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if not await is_partitioned(conn):
+            return dropped
+        for month in await list_partitions(conn):
+            if add_months(month, 1) > cutoff.date():
+                break
+            name = partition_name(month)
+            await conn.execute(text(
+                f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name} CONCURRENTLY"
+            ))
+            await conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    if dropped:
+        logger.info("Dropped chat_messages partitions: %s", dropped)
+    return dropped
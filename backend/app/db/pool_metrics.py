@@ -0,0 +1,101 @@
+"""Connection-pool instrumentation - checkout wait times and saturation."""
+
+import logging
+import time
+from collections import deque
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Number of recent checkout waits kept for percentile estimates
+_WAIT_SAMPLE_SIZE = 1024
+
+
+class PoolMetrics:
+    """In-process counters for one pool. Cheap enough to update on every checkout."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent_waits: deque[float] = deque(maxlen=_WAIT_SAMPLE_SIZE)
+
+    def observe_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+        self._recent_waits.append(seconds)
+
+    def observe_timeout(self) -> None:
+        self.timeouts += 1
+
+    def wait_percentile(self, pct: float) -> float:
+        """Approximate checkout wait (seconds) at the given percentile of recent samples."""
+        if not self._recent_waits:
+            return 0.0
+        ordered = sorted(self._recent_waits)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long each checkout waited for a connection."""
+
+    def __init__(self, *args, max_overflow: int = 10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        # Public copy of the configured overflow (QueuePool only keeps it privately)
+        self.max_overflow = max_overflow
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.observe_timeout()
+            logger.warning("DB pool exhausted: checkout timed out (%s)", self.status())
+            raise
+        waited = time.perf_counter() - start
+        self.metrics.observe_wait(waited)
+        if waited * 1000 >= settings.DB_POOL_SLOW_CHECKOUT_MS:
+            logger.warning(
+                "Slow DB pool checkout: waited %.1f ms (%s)", waited * 1000, self.status()
+            )
+        return conn
+
+
+def pool_stats(pool) -> dict:
+    """Snapshot of pool occupancy and checkout latency, suitable for a health endpoint."""
+    stats: dict = {"pool_class": type(pool).__name__}
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return stats
+
+    # Uninstrumented pools are built from the same settings (see app.db.database)
+    max_overflow = getattr(pool, "max_overflow", settings.DB_MAX_OVERFLOW)
+    capacity = pool.size() + max(max_overflow, 0)
+    checked_out = pool.checkedout()
+    stats.update(
+        size=pool.size(),
+        max_overflow=max_overflow,
+        checked_out=checked_out,
+        checked_in=pool.checkedin(),
+        overflow=pool.overflow(),
+        saturation=round(checked_out / capacity, 3) if capacity else 0.0,
+    )
+
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(
+            checkouts=metrics.checkouts,
+            timeouts=metrics.timeouts,
+            wait_avg_ms=round(metrics.total_wait / metrics.checkouts * 1000, 3)
+            if metrics.checkouts else 0.0,
+            wait_p95_ms=round(metrics.wait_percentile(95) * 1000, 3),
+            wait_max_ms=round(metrics.max_wait * 1000, 3),
+        )
+    return stats
@@ -0,0 +1,155 @@
+"""Player sharding - route each player's rows to one of N Postgres databases.
+
+Shard 0 is DATABASE_URL; shards 1..N-1 are SHARD_DATABASE_URLS in order. A
+player and all of its child rows (level choices, affinity records, chat
+messages, embeddings, episodes, archives) always live on the same shard.
+
+Shard 0 additionally holds the global state:
+
+- ``player_shards``: the player -> shard directory. It is authoritative;
+  players without an entry predate sharding and live on shard 0.
+- ``players_id_seq``: every player ID is drawn from this one sequence, so
+  IDs stay unique across shards.
+
+New players are placed by a jump consistent hash of their ID, so growing
+from N to N+1 shards only makes ~1/(N+1) of players want to move (see
+``app.jobs.rebalance``). With a single shard every lookup short-circuits to
+shard 0 without touching the directory.
+"""
+
+import time
+from collections import OrderedDict
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash (Lamping & Veach): map ``key`` to a bucket in [0, buckets)."""
+    b, j = -1, 0
+    key &= 0xFFFFFFFFFFFFFFFF
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+class PlayerMovingError(Exception):
+    """The player's rows are being moved between shards; retry shortly."""
+
+    def __init__(self, player_id: int):
+        super().__init__(f"Player {player_id} is being moved between shards")
+        self.player_id = player_id
+
+
+class ShardRouter:
+    """Maps player IDs to shard engines/session factories via the directory on shard 0."""
+
+    def __init__(
+        self, engines: list[AsyncEngine], cache_ttl: float = 30.0, cache_size: int = 100_000
+    ):
+        self.engines = engines
+        self.sessions = [
+            async_sessionmaker(e, class_=AsyncSession, expire_on_commit=False) for e in engines
+        ]
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        # player_id -> (shard_id, moving, expires_at), least recently used first
+        self._cache: OrderedDict[int, tuple[int, bool, float]] = OrderedDict()
+
+    @property
+    def shard_count(self) -> int:
+        return len(self.engines)
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.engines) > 1
+
+    def _remember(self, player_id: int, shard_id: int, moving: bool) -> None:
+        self._cache[player_id] = (shard_id, moving, time.monotonic() + self.cache_ttl)
+        self._cache.move_to_end(player_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def forget(self, player_id: int) -> None:
+        self._cache.pop(player_id, None)
+
+    async def lookup(self, player_id: int) -> tuple[int, bool]:
+        """(shard_id, moving) straight from the directory, bypassing the cache."""
+        async with self.engines[0].connect() as conn:
+            row = (await conn.execute(
+                text("SELECT shard_id, moving FROM player_shards WHERE player_id = :pid"),
+                {"pid": player_id},
+            )).first()
+        if row is None:
+            return 0, False
+        return row.shard_id, bool(row.moving)
+
+    async def shard_for(self, player_id: int) -> int:
+        """Shard holding ``player_id``; raises PlayerMovingError mid-rebalance."""
+        if not self.sharded:
+            return 0
+        cached = self._cache.get(player_id)
+        if cached is None or cached[2] < time.monotonic():
+            shard_id, moving = await self.lookup(player_id)
+            self._remember(player_id, shard_id, moving)
+        else:
+            shard_id, moving, _ = cached
+            self._cache.move_to_end(player_id)
+        if moving:
+            raise PlayerMovingError(player_id)
+        return shard_id
+
+    async def sessionmaker_for(self, player_id: int) -> async_sessionmaker[AsyncSession]:
+        return self.sessions[await self.shard_for(player_id)]
+
+    async def allocate_player(self) -> tuple[int | None, int]:
+        """Reserve a global ID for a new player and register its shard.
+
+        Returns (player_id, shard_id). Unsharded this is (None, 0) and the
+        database assigns the ID on insert as usual.
+        """
+        if not self.sharded:
+            return None, 0
+        async with self.engines[0].begin() as conn:
+            player_id = (await conn.execute(text("SELECT nextval('players_id_seq')"))).scalar_one()
+            shard_id = jump_hash(player_id, self.shard_count)
+            await conn.execute(
+                text(
+                    "INSERT INTO player_shards (player_id, shard_id, moving) "
+                    "VALUES (:pid, :sid, false)"
+                ),
+                {"pid": player_id, "sid": shard_id},
+            )
+        self._remember(player_id, shard_id, False)
+        return player_id, shard_id
+
+    async def set_route(self, player_id: int, shard_id: int, moving: bool = False) -> None:
+        """Create or update a player's directory entry (used by the rebalancer)."""
+        await self.set_routes([player_id], shard_id, moving)
+
+    async def set_routes(self, player_ids: list[int], shard_id: int, moving: bool = False) -> None:
+        """Bulk form of ``set_route`` (e.g. after importing players onto a shard)."""
+        if not player_ids:
+            return
+        async with self.engines[0].begin() as conn:
+            await conn.execute(
+                text(
+                    "INSERT INTO player_shards (player_id, shard_id, moving) "
+                    "VALUES (:pid, :sid, :moving) "
+                    "ON CONFLICT (player_id) DO UPDATE "
+                    "SET shard_id = excluded.shard_id, moving = excluded.moving"
+                ),
+                [{"pid": pid, "sid": shard_id, "moving": moving} for pid in player_ids],
+            )
+        for player_id in player_ids:
+            self.forget(player_id)
+
+    async def remove_route(self, player_id: int) -> None:
+        """Drop a deleted player's directory entry."""
+        async with self.engines[0].begin() as conn:
+            await conn.execute(
+                text("DELETE FROM player_shards WHERE player_id = :pid"), {"pid": player_id}
+            )
+        self.forget(player_id)
@@ -0,0 +1 @@
+"""Background jobs - runnable as CLIs (`python -m app.jobs.<name>`) or scheduled in-process."""
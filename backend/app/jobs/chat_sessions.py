@@ -0,0 +1,46 @@
+"""Idle chat session evaluation - end SSE chat sessions that went quiet.
+
+SSE chat has no disconnect event, so a session counts as over once the
+player has sent nothing for CHAT_SESSION_IDLE_TIMEOUT seconds; it is then
+evaluated (affinity delta, memory extraction) like a closed WebSocket.
+
+Usage:
+    python -m app.jobs.chat_sessions                  # evaluate one batch of idle sessions
+    python -m app.jobs.chat_sessions --batch 20
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+from app.config import settings
+from app.db.database import shard_router
+from app.db.redis import get_redis_client
+from app.services.chat_session_service import chat_session_service
+
+
+async def run_chat_session_evaluation(batch: int | None = None) -> dict:
+    """Evaluate up to ``batch`` idle sessions; the rest wait for the next sweep.
+
+    One bounded batch per run keeps a backlog from turning a sweep into a
+    long burst of LLM calls.
+    """
+    batch = batch or settings.CHAT_SESSION_EVALUATION_BATCH
+    count = await chat_session_service.evaluate_idle(
+        get_redis_client(), shard_router.sessionmaker_for, batch
+    )
+    return {"sessions": count}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Evaluate chat sessions that went idle.")
+    parser.add_argument("--batch", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(asyncio.run(run_chat_session_evaluation(args.batch))))
+
+
+if __name__ == "__main__":
+    main()
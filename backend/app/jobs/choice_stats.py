@@ -0,0 +1,58 @@
+"""Choice counter jobs - add pending Redis increments to Postgres, or recount from scratch.
+
+Usage:
+    python -m app.jobs.choice_stats                   # flush dirty counters
+    python -m app.jobs.choice_stats --backfill        # recount level_choices, then flush
+    python -m app.jobs.choice_stats --backfill --chunk-size 20000
+
+Disable the scheduled flush (CHOICE_STATS_FLUSH_INTERVAL=0) while backfilling.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+from app.db.database import async_session, shard_router
+from app.db.redis import get_redis_client
+from app.services.choice_stats_service import BACKFILL_CHUNK_SIZE, choice_stats_service
+
+FLUSH_BATCH = 1000
+
+
+async def run_choice_stats_flush() -> dict:
+    """Flush every dirty node, FLUSH_BATCH nodes per transaction."""
+    redis = get_redis_client()
+    flushed = 0
+    while True:
+        async with async_session() as db:
+            batch = await choice_stats_service.flush(db, redis, FLUSH_BATCH)
+        flushed += batch
+        if batch < FLUSH_BATCH:
+            return {"nodes": flushed}
+
+
+async def run_backfill(chunk_size: int = BACKFILL_CHUNK_SIZE) -> dict:
+    scanned = await choice_stats_service.backfill(
+        shard_router.sessions, get_redis_client(), chunk_size
+    )
+    return {"scanned": scanned, **await run_choice_stats_flush()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Flush or rebuild choice counters.")
+    parser.add_argument("--backfill", action="store_true",
+                        help="recount choice_stats from level_choices first")
+    parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.backfill:
+        result = asyncio.run(run_backfill(args.chunk_size))
+    else:
+        result = asyncio.run(run_choice_stats_flush())
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
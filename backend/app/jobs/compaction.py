@@ -0,0 +1,77 @@
+"""Chat history compaction job.
+
+Usage:
+    python -m app.jobs.compaction                     # defaults from settings
+    python -m app.jobs.compaction --older-than-days 60 --no-archive
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from datetime import timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.core.clock import utcnow
+from app.db.database import shard_router
+from app.db.redis import get_redis_client
+from app.services.compaction_service import compaction_service
+
+logger = logging.getLogger(__name__)
+
+
+async def run_compaction(
+    older_than_days: int | None = None,
+    archive: bool | None = None,
+    max_players: int = 100,
+    session_factory: async_sessionmaker[AsyncSession] | None = None,
+) -> dict:
+    """Compact up to ``max_players`` players' old history per shard, one player at a time.
+
+    ``session_factory`` limits the run to one database; by default every shard is processed.
+    """
+    days = settings.CHAT_COMPACTION_AGE_DAYS if older_than_days is None else older_than_days
+    cutoff = utcnow() - timedelta(days=days)
+    factories = shard_router.sessions if session_factory is None else [session_factory]
+    redis = get_redis_client()
+
+    totals = {"players": 0, "episodes": 0, "failed": 0}
+    for factory in factories:
+        async with factory() as db:
+            player_ids = await compaction_service.players_with_old_messages(
+                db, cutoff, max_players
+            )
+        totals["players"] += len(player_ids)
+
+        for player_id in player_ids:
+            try:
+                totals["episodes"] += await compaction_service.compact_player(
+                    factory, player_id, cutoff, archive=archive, redis=redis
+                )
+            except Exception:
+                totals["failed"] += 1
+                logger.exception("Compaction failed for player %s", player_id)
+
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compact old chat history into episodes.")
+    parser.add_argument("--older-than-days", type=int, default=None)
+    parser.add_argument("--no-archive", action="store_true", help="summarise only, keep raw rows")
+    parser.add_argument("--max-players", type=int, default=100)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(run_compaction(
+        older_than_days=args.older_than_days,
+        archive=False if args.no_archive else None,
+        max_players=args.max_players,
+    ))
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
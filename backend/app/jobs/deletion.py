@@ -0,0 +1,48 @@
+"""Player deletion sweep - purge tombstoned players' rows in batches.
+
+Usage:
+    python -m app.jobs.deletion                       # defaults from settings
+    python -m app.jobs.deletion --max-players 500 --batch-size 200 --pause-ms 100
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+from app.db.database import shard_router
+from app.db.redis import get_redis_client
+from app.services.deletion_service import deletion_service
+
+
+async def run_player_deletion(max_players: int = 100, **purge_options) -> dict:
+    """Sweep every shard; returns the purged player IDs."""
+    redis = get_redis_client()
+    purged = []
+    for factory in shard_router.sessions:
+        player_ids = await deletion_service.run(factory, redis, max_players, **purge_options)
+        if shard_router.sharded:
+            for player_id in player_ids:
+                await shard_router.remove_route(player_id)
+        purged += player_ids
+    return {"purged": purged}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Purge rows of deleted (tombstoned) players.")
+    parser.add_argument("--max-players", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--pause-ms", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(run_player_deletion(
+        max_players=args.max_players,
+        batch_size=args.batch_size,
+        pause=None if args.pause_ms is None else args.pause_ms / 1000,
+    ))
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
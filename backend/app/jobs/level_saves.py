@@ -0,0 +1,44 @@
+"""Level state write-behind - copy paused states from Redis to level_saves.
+
+Usage:
+    python -m app.jobs.level_saves                    # flush every dirty player
+    python -m app.jobs.level_saves --batch 2000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+from app.config import settings
+from app.db.database import shard_router
+from app.db.redis import get_redis_client
+from app.services.level_save_service import level_save_service
+
+
+async def run_level_save_flush(batch: int | None = None) -> dict:
+    """Flush every dirty player, ``batch`` players per Redis round trip.
+
+    Stops after a short batch, so players put back for retry wait for the next run.
+    """
+    batch = batch or settings.LEVEL_SAVE_FLUSH_BATCH
+    redis = get_redis_client()
+    flushed = 0
+    while True:
+        handled = await level_save_service.flush(redis, shard_router.sessionmaker_for, batch)
+        flushed += handled
+        if handled < batch:
+            return {"players": flushed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Persist paused level states to Postgres.")
+    parser.add_argument("--batch", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(asyncio.run(run_level_save_flush(args.batch))))
+
+
+if __name__ == "__main__":
+    main()
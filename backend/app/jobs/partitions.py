@@ -0,0 +1,46 @@
+"""chat_messages partition maintenance job.
+
+Creates upcoming monthly partitions and, when a chat retention period is
+configured, detaches and drops months that are entirely past it.
+
+Usage:
+    python -m app.jobs.partitions
+"""
+
+import asyncio
+import json
+import logging
+from datetime import timedelta
+
+from app.config import settings
+from app.core.clock import utcnow
+from app.db.database import shard_router
+from app.db.partitions import drop_partitions_before, ensure_future_partitions
+
+
+async def run_partition_maintenance() -> dict:
+    """Maintain partitions on every shard; partition names are prefixed with the shard."""
+    now = utcnow()
+    created, dropped = [], []
+    for shard_id, engine in enumerate(shard_router.engines):
+        created += [
+            f"{shard_id}:{name}"
+            for name in await ensure_future_partitions(
+                engine, settings.CHAT_PARTITION_MONTHS_AHEAD, now.date()
+            )
+        ]
+        if settings.RETENTION_CHAT_MESSAGES_DAYS > 0:
+            cutoff = now - timedelta(days=settings.RETENTION_CHAT_MESSAGES_DAYS)
+            dropped += [
+                f"{shard_id}:{name}" for name in await drop_partitions_before(engine, cutoff)
+            ]
+    return {"created": created, "dropped": dropped}
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(asyncio.run(run_partition_maintenance())))
+
+
+if __name__ == "__main__":
+    main()
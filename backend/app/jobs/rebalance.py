@@ -0,0 +1,204 @@
+"""Offline shard rebalancing - move players' rows between shards.
+
+A move marks the player as moving in the directory (their requests get 503
+and websockets are refused), waits for app workers' directory caches to
+expire, copies every co-located row to the target shard in one
+transaction, flips the directory entry and finally deletes the source rows.
+Re-running an interrupted move is safe: the copy first clears any partial
+rows on the target.
+
+Child rows get fresh IDs from the target shard's sequences (IDs other than
+player IDs are only unique per shard); episode -> message references are
+remapped and the embedding index is rebuilt on the target.
+
+Usage:
+    python -m app.jobs.rebalance --player 42 --to 1
+    python -m app.jobs.rebalance --plan               # players not on their hashed shard
+    python -m app.jobs.rebalance --rehash --limit 500 # move those players
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import shard_router
+from app.db.sharding import ShardRouter, jump_hash
+from app.models.affinity import AffinityRecord
+from app.models.chat_archive import ChatArchive, ChatEpisode
+from app.models.chat_embedding import ChatEmbeddingIndex
+from app.models.chat_history import ChatMessage
+from app.models.level import LevelChoice
+from app.models.level_save import LevelSave
+from app.models.player import Player
+from app.services.deletion_service import PLAYER_CHILD_MODELS
+from app.services.embedding_service import embedding_service
+
+logger = logging.getLogger(__name__)
+
+COPY_BATCH_SIZE = 1000
+
+
+def _column_values(row, model, skip: tuple[str, ...] = ()) -> dict:
+    return {c.key: getattr(row, c.key) for c in model.__table__.columns if c.key not in skip}
+
+
+async def _delete_player_rows(db: AsyncSession, player_id: int) -> None:
+    for model in PLAYER_CHILD_MODELS:
+        await db.execute(delete(model).where(model.player_id == player_id))
+    await db.execute(delete(Player).where(Player.id == player_id))
+
+
+async def _copy_rows(
+    src: AsyncSession, dst: AsyncSession, model, player_id: int,
+    remap: dict[str, dict[int, int]] | None = None,
+) -> dict[int, int]:
+    """Copy one child table's rows for the player; returns {old id: new id}.
+
+    ``remap`` maps column names to old -> new ID translations to apply.
+    """
+    id_map: dict[int, int] = {}
+    result = await src.stream(
+        select(model).where(model.player_id == player_id).order_by(model.id)
+        .execution_options(yield_per=COPY_BATCH_SIZE)
+    )
+    async for batch in result.scalars().partitions():
+        values = []
+        for row in batch:
+            row_values = _column_values(row, model, skip=("id",))
+            for column, mapping in (remap or {}).items():
+                row_values[column] = mapping.get(row_values[column], row_values[column])
+            values.append(row_values)
+        new_ids = await dst.scalars(
+            insert(model).returning(model.id, sort_by_parameter_order=True), values
+        )
+        id_map.update(zip((row.id for row in batch), new_ids))
+    return id_map
+
+
+async def copy_player(router: ShardRouter, player_id: int, source: int, target: int) -> dict:
+    """Copy a player's rows from ``source`` to ``target`` in a single target transaction."""
+    counts: dict[str, int] = {}
+    async with router.sessions[source]() as src, router.sessions[target]() as dst:
+        player = await src.get(Player, player_id)
+        if player is None:
+            raise LookupError(f"Player {player_id} not found on shard {source}")
+
+        await _delete_player_rows(dst, player_id)
+        await dst.execute(insert(Player).values(**_column_values(player, Player)))
+
+        counts["level_choices"] = len(await _copy_rows(src, dst, LevelChoice, player_id))
+        counts["affinity_records"] = len(await _copy_rows(src, dst, AffinityRecord, player_id))
+        message_ids = await _copy_rows(src, dst, ChatMessage, player_id)
+        counts["chat_messages"] = len(message_ids)
+        episode_ids = await _copy_rows(
+            src, dst, ChatEpisode, player_id,
+            remap={"first_message_id": message_ids, "last_message_id": message_ids},
+        )
+        counts["chat_episodes"] = len(episode_ids)
+        counts["chat_archives"] = len(await _copy_rows(
+            src, dst, ChatArchive, player_id, remap={"episode_id": episode_ids}
+        ))
+        save = await src.get(LevelSave, player_id)
+        if save is not None:
+            await dst.execute(insert(LevelSave).values(**_column_values(save, LevelSave)))
+        counts["level_saves"] = int(save is not None)
+        if await src.get(ChatEmbeddingIndex, player_id) is not None:
+            await embedding_service.rebuild_index(dst, player_id)
+        await dst.commit()
+    return counts
+
+
+async def move_players(
+    router: ShardRouter, moves: list[tuple[int, int]], settle: float | None = None
+) -> list[dict]:
+    """Move each (player_id, target shard); ``settle`` defaults to the directory cache TTL.
+
+    All players are marked as moving up front so the cache wait is paid once.
+    """
+    pending = []
+    for player_id, target in moves:
+        if not 0 <= target < router.shard_count:
+            raise ValueError(f"No shard {target} (have {router.shard_count})")
+        source, _ = await router.lookup(player_id)
+        if source != target:
+            await router.set_route(player_id, source, moving=True)
+        pending.append((player_id, source, target))
+    if any(source != target for _, source, target in pending):
+        await asyncio.sleep(router.cache_ttl if settle is None else settle)
+
+    results = []
+    for player_id, source, target in pending:
+        if source == target:
+            results.append({"player_id": player_id, "moved": False, "shard": target})
+            continue
+        counts = await copy_player(router, player_id, source, target)
+        await router.set_route(player_id, target, moving=False)
+        async with router.sessions[source]() as db:
+            await _delete_player_rows(db, player_id)
+            await db.commit()
+        logger.info("Moved player %s from shard %s to %s: %s", player_id, source, target, counts)
+        results.append(
+            {"player_id": player_id, "moved": True, "from": source, "to": target, **counts}
+        )
+    return results
+
+
+async def move_player(
+    router: ShardRouter, player_id: int, target: int, settle: float | None = None
+) -> dict:
+    return (await move_players(router, [(player_id, target)], settle=settle))[0]
+
+
+async def misplaced_players(router: ShardRouter, limit: int) -> list[tuple[int, int, int]]:
+    """(player_id, current shard, hashed shard) for players not on their hashed shard."""
+    found: list[tuple[int, int, int]] = []
+    for shard_id, factory in enumerate(router.sessions):
+        async with factory() as db:
+            result = await db.stream_scalars(
+                select(Player.id).order_by(Player.id)
+                .execution_options(yield_per=COPY_BATCH_SIZE)
+            )
+            async for player_id in result:
+                wanted = jump_hash(player_id, router.shard_count)
+                if wanted != shard_id:
+                    found.append((player_id, shard_id, wanted))
+                    if len(found) >= limit:
+                        return found
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move players' rows between shards.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--player", type=int, help="move this player (with --to)")
+    mode.add_argument("--plan", action="store_true", help="list players off their hashed shard")
+    mode.add_argument("--rehash", action="store_true", help="move players off their hashed shard")
+    parser.add_argument("--to", type=int, help="target shard for --player")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--settle", type=float, default=None,
+                        help="seconds to wait for directory caches (default: cache TTL)")
+    args = parser.parse_args()
+    if args.player is not None and args.to is None:
+        parser.error("--player requires --to")
+
+    async def run():
+        if args.player is not None:
+            return await move_player(shard_router, args.player, args.to, settle=args.settle)
+        plan = await misplaced_players(shard_router, args.limit)
+        if args.plan:
+            return [{"player_id": p, "from": s, "to": t} for p, s, t in plan]
+        return await move_players(
+            shard_router, [(player_id, target) for player_id, _, target in plan],
+            settle=args.settle,
+        )
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Retention purge job.
+
+Usage:
+    python -m app.jobs.retention --dry-run            # report what would be removed
+    python -m app.jobs.retention                      # purge every enabled policy
+    python -m app.jobs.retention --table chat_messages --batch-size 500 --pause-ms 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+from app.db.database import shard_router
+from app.services.retention_service import retention_service
+
+
+async def run_on_shards(**options) -> list[dict]:
+    """Run the retention service on every shard; results are tagged with the shard."""
+    results = []
+    for shard_id, factory in enumerate(shard_router.sessions):
+        for result in await retention_service.run(factory, **options):
+            results.append({"shard": shard_id, **result})
+    return results
+
+
+async def run_retention() -> list[dict]:
+    """Scheduled entry point: purge every enabled policy with settings defaults."""
+    return await run_on_shards()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Purge rows past their retention period.")
+    parser.add_argument("--table", action="append", dest="tables",
+                        help="limit to this table (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="only count expired rows")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--pause-ms", type=int, default=None)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    purge_options = {}
+    if not args.dry_run:
+        purge_options = {
+            "batch_size": args.batch_size,
+            "pause": None if args.pause_ms is None else args.pause_ms / 1000,
+            "max_batches": args.max_batches,
+        }
+    results = asyncio.run(run_on_shards(
+        tables=args.tables, dry_run=args.dry_run, **purge_options
+    ))
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""In-process periodic job runner.
+
+Every worker starts the same loops; a Redis lock per job run makes sure
+only one of them actually does the work each interval. Jobs with an
+interval of 0 are disabled (run them from cron via their CLI instead).
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections.abc import Awaitable, Callable
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.db.redis import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[object]]
+
+# Identifies this worker in lock values, for debugging who holds a lock
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def scheduled_jobs() -> list[tuple[str, int, Job]]:
+    """(name, interval seconds, coroutine function) for every schedulable job."""
+    from app.jobs.chat_sessions import run_chat_session_evaluation
+    from app.jobs.choice_stats import run_choice_stats_flush
+    from app.jobs.compaction import run_compaction
+    from app.jobs.deletion import run_player_deletion
+    from app.jobs.level_saves import run_level_save_flush
+    from app.jobs.partitions import run_partition_maintenance
+    from app.jobs.retention import run_retention
+
+    return [
+        ("chat_compaction", settings.CHAT_COMPACTION_INTERVAL, run_compaction),
+        ("retention", settings.RETENTION_INTERVAL, run_retention),
+        ("player_deletion", settings.PLAYER_DELETION_INTERVAL, run_player_deletion),
+        ("choice_stats_flush", settings.CHOICE_STATS_FLUSH_INTERVAL, run_choice_stats_flush),
+        ("level_save_flush", settings.LEVEL_SAVE_FLUSH_INTERVAL, run_level_save_flush),
+        (
+            "chat_session_evaluation",
+            settings.CHAT_SESSION_EVALUATION_INTERVAL,
+            run_chat_session_evaluation,
+        ),
+        (
+            "chat_partitions",
+            settings.CHAT_PARTITION_MAINTENANCE_INTERVAL,
+            run_partition_maintenance,
+        ),
+    ]
+
+
+async def run_exclusive(name: str, interval: int, job: Job) -> bool:
+    """Run ``job`` if no other worker holds its lock; returns whether it ran.
+
+    The lock outlives the longest allowed run (JOB_MAX_RUNTIME, after which
+    the job is cancelled), so runs never overlap. Afterwards it is kept until
+    one ``interval`` after the start, which spaces runs across workers.
+    """
+    redis = get_redis_client()
+    lock_key = f"job:lock:{name}"
+    try:
+        if not await redis.set(
+            lock_key, WORKER_ID, nx=True, ex=interval + settings.JOB_MAX_RUNTIME
+        ):
+            return False
+    except aioredis.RedisError:
+        logger.warning("Skipping job %s: Redis unavailable for locking", name)
+        return False
+    started = time.monotonic()
+    try:
+        result = await asyncio.wait_for(job(), settings.JOB_MAX_RUNTIME)
+        logger.info("Job %s finished: %s", name, result)
+    finally:
+        remaining = int(interval - (time.monotonic() - started))
+        try:
+            if remaining > 0:
+                await redis.expire(lock_key, remaining)
+            else:
+                await redis.delete(lock_key)
+        except aioredis.RedisError:
+            pass  # the lock still expires on its own
+    return True
+
+
+async def _run_periodically(name: str, interval: int, job: Job) -> None:
+    while True:
+        try:
+            await run_exclusive(name, interval, job)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Job %s failed", name)
+        await asyncio.sleep(interval)
+
+
+def start_scheduled_jobs() -> list[asyncio.Task]:
+    """Start a background loop for each enabled job."""
+    return [
+        asyncio.create_task(_run_periodically(name, interval, job), name=f"job:{name}")
+        for name, interval, job in scheduled_jobs()
+        if interval > 0
+    ]
+
+
+async def stop_scheduled_jobs(tasks: list[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,92 @@
+"""Bulk player data export/import (NDJSON, optionally gzipped).
+
+Usage:
+    python -m app.jobs.transfer export -o dump.ndjson.gz               # every player, every shard
+    python -m app.jobs.transfer export --player 42 --player 43 -o p.ndjson
+    python -m app.jobs.transfer import dump.ndjson.gz                   # into shard 0
+    python -m app.jobs.transfer import dump.ndjson.gz --shard 1 --batch-size 5000
+
+Imports keep player IDs, so importing into a database that already has
+those players fails on the primary key; child rows get new IDs.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import sys
+from collections import defaultdict
+from typing import TextIO
+
+from app.db.database import shard_router
+from app.services.export_service import EXPORT_BATCH_SIZE, export_service
+
+
+def _open(path: str, mode: str) -> TextIO:
+    if path == "-":
+        return sys.stdout if "w" in mode else sys.stdin
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+async def run_export(out: TextIO, player_ids: list[int] | None, batch_size: int) -> None:
+    """Write players (all, or the given ones) from every shard they live on."""
+    if player_ids is None:
+        targets = {shard_id: None for shard_id in range(shard_router.shard_count)}
+    else:
+        targets = defaultdict(list)
+        for player_id in player_ids:
+            targets[await shard_router.shard_for(player_id)].append(player_id)
+
+    for shard_id, ids in targets.items():
+        async with shard_router.sessions[shard_id]() as db:
+            async for chunk in export_service.export_ndjson(db, ids, batch_size):
+                out.write(chunk)
+
+
+async def run_import(source: TextIO, shard_id: int, batch_size: int) -> dict:
+    async def register(player_ids: list[int]) -> None:
+        await shard_router.set_routes(player_ids, shard_id)
+
+    result = await export_service.import_ndjson(
+        shard_router.sessions[shard_id], source, batch_size,
+        on_players=register if shard_router.sharded else None,
+    )
+    # Player IDs come from shard 0's sequence whichever shard they were imported into
+    async with shard_router.sessions[0]() as db:
+        await export_service.advance_player_ids(db, result["max_player_id"])
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export or import player data as NDJSON.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="dump player rows")
+    export.add_argument("--player", type=int, action="append", dest="players",
+                        help="only this player (repeatable)")
+    export.add_argument("-o", "--output", default="-", help="file path, .gz to compress")
+    export.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+
+    load = commands.add_parser("import", help="load rows from a dump")
+    load.add_argument("input", help="file path (.gz supported) or - for stdin")
+    load.add_argument("--shard", type=int, default=0, help="target shard")
+    load.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "export":
+        with _open(args.output, "w") as out:
+            asyncio.run(run_export(out, args.players, args.batch_size))
+    else:
+        if not 0 <= args.shard < shard_router.shard_count:
+            parser.error(f"--shard must be below {shard_router.shard_count}")
+        with _open(args.input, "r") as source:
+            result = asyncio.run(run_import(source, args.shard, args.batch_size))
+        print(json.dumps(result), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,46 @@
 """FastAPI application entry point."""
 
 from contextlib import asynccontextmanager
+from datetime import date
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.db.database import engine, Base
-from app.db.redis import close_redis
+from app.config import settings
+from app.core.serialization import FastJSONResponse
+from app.db.database import engine, replica_engine, shard_router, Base, warm_pool
+from app.db.partitions import ensure_future_partitions
+from app.db.pool_metrics import pool_stats
+from app.db.redis import close_redis, get_redis_client
+from app.jobs.scheduler import start_scheduled_jobs, stop_scheduled_jobs
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: create tables (dev only; use Alembic in production)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Startup: create tables in development only; other environments are
+    # migrated ahead of deploy with `alembic upgrade head`
+    for shard_engine in shard_router.engines:
+        if settings.APP_ENV == "development":
+            async with shard_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        # Inserts fail if the current month's chat partition is missing; cheap no-op otherwise
+        await ensure_future_partitions(
+            shard_engine, settings.CHAT_PARTITION_MONTHS_AHEAD, date.today()
+        )
+        if settings.DB_POOL_WARM and shard_engine.dialect.name == "postgresql":
+            await warm_pool(shard_engine, settings.DB_POOL_SIZE)
+    if settings.DB_POOL_WARM and replica_engine is not engine:
+        await warm_pool(replica_engine, settings.DB_POOL_SIZE)
+    jobs = start_scheduled_jobs()
+    connection_hub.start(get_redis_client())
     yield
-    # Shutdown: close connections
-    await engine.dispose()
+    # Shutdown: stop background jobs, close connections
+    await connection_hub.stop()
+    await stop_scheduled_jobs(jobs)
+    for shard_engine in shard_router.engines:
+        await shard_engine.dispose()
+    if replica_engine is not engine:
+        await replica_engine.dispose()
     await close_redis()
 
 
@@ -37,16 +61,33 @@ app.add_middleware(
 
 # --- Routes ---
 # Import here (not at top level) so modules with heavy deps don't block startup
-from app.api.routes import player, levels, chat, affinity  # noqa: E402
+from app.api.routes import player, levels, chat, affinity, admin  # noqa: E402
 from app.api.websocket import chat_ws  # noqa: E402
+from app.api.websocket.connections import connection_hub  # noqa: E402
+from app.api.rate_limit import rate_limited_handler  # noqa: E402
+from app.core.rate_limit import RateLimited  # noqa: E402
+
+app.add_exception_handler(RateLimited, rate_limited_handler)
 
 app.include_router(player.router, prefix="/api/player", tags=["player"])
 app.include_router(levels.router, prefix="/api/levels", tags=["levels"])
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
 app.include_router(affinity.router, prefix="/api/affinity", tags=["affinity"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 app.include_router(chat_ws.router, tags=["websocket"])
 
 
-@app.get("/health")
+@app.get("/health", response_class=FastJSONResponse)
 async def health_check():
     return {"status": "ok"}
+
+
+@app.get("/health/db", response_class=FastJSONResponse)
+async def db_health():
+    """Connection-pool occupancy and checkout wait-time metrics."""
+    stats = {"primary": pool_stats(engine.pool)}
+    if replica_engine is not engine:
+        stats["replica"] = pool_stats(replica_engine.pool)
+    if shard_router.sharded:
+        stats["shards"] = [pool_stats(e.pool) for e in shard_router.engines[1:]]
+    return stats
@@ -4,5 +4,15 @@ from app.models.player import Player
 from app.models.level import Level, LevelChoice
 from app.models.chat_history import ChatMessage
 from app.models.affinity import AffinityRecord
+from app.models.chat_embedding import ChatEmbeddingIndex
+from app.models.chat_archive import ChatEpisode, ChatArchive
+from app.models.job_checkpoint import JobCheckpoint
+from app.models.player_shard import PlayerShard
+from app.models.choice_stats import ChoiceStat
+from app.models.level_save import LevelSave
 
-__all__ = ["Player", "Level", "LevelChoice", "ChatMessage", "AffinityRecord"]
+__all__ = [
+    "Player", "Level", "LevelChoice", "ChatMessage", "AffinityRecord", "ChatEmbeddingIndex",
+    "ChatEpisode", "ChatArchive", "JobCheckpoint", "PlayerShard", "ChoiceStat",
+    "LevelSave",
+]
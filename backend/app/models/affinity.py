@@ -2,7 +2,7 @@
 
 from datetime import datetime
 
-from sqlalchemy import String, Integer, DateTime, ForeignKey, Text, func
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index, Text, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.database import Base
@@ -10,9 +10,14 @@ from app.db.database import Base
 
 class AffinityRecord(Base):
     __tablename__ = "affinity_records"
+    __table_args__ = (
+        Index("ix_affinity_records_player_created", "player_id", "created_at"),
+        # Keyset order for batched retention purges
+        Index("ix_affinity_records_created_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    player_id: Mapped[int] = mapped_column(ForeignKey("players.id"))
+    player_id: Mapped[int] = mapped_column(ForeignKey("players.id", ondelete="CASCADE"))
     delta: Mapped[int] = mapped_column(Integer)
     source: Mapped[str] = mapped_column(String(50))  # "level_choice" or "chat"
     reason: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -0,0 +1,47 @@
+"""Chat archive models - episode summaries and compressed cold storage for old chat."""
+
+from datetime import datetime
+
+from sqlalchemy import String, Text, Integer, LargeBinary, DateTime, ForeignKey, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.database import Base
+
+
+class ChatEpisode(Base):
+    """A condensed chat session: consecutive messages in one level gap, without long pauses."""
+    __tablename__ = "chat_episodes"
+    __table_args__ = (
+        Index("ix_chat_episodes_player_ended", "player_id", "ended_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    player_id: Mapped[int] = mapped_column(ForeignKey("players.id", ondelete="CASCADE"))
+    after_level_id: Mapped[str | None] = mapped_column(String(50), nullable=True)
+
+    started_at: Mapped[datetime] = mapped_column(DateTime)
+    ended_at: Mapped[datetime] = mapped_column(DateTime)
+    first_message_id: Mapped[int] = mapped_column(Integer)
+    last_message_id: Mapped[int] = mapped_column(Integer)
+    message_count: Mapped[int] = mapped_column(Integer)
+    summary: Mapped[str] = mapped_column(Text)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
+class ChatArchive(Base):
+    """Raw messages of one episode, moved out of chat_messages as a zlib-compressed JSON blob."""
+    __tablename__ = "chat_archives"
+    __table_args__ = (
+        Index("ix_chat_archives_player_ended", "player_id", "ended_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    player_id: Mapped[int] = mapped_column(ForeignKey("players.id", ondelete="CASCADE"))
+    episode_id: Mapped[int] = mapped_column(ForeignKey("chat_episodes.id", ondelete="CASCADE"))
+
+    started_at: Mapped[datetime] = mapped_column(DateTime)
+    ended_at: Mapped[datetime] = mapped_column(DateTime)
+    message_count: Mapped[int] = mapped_column(Integer)
+    # [[id, role, content, after_level_id, created_at_iso], ...] in chronological order
+    payload: Mapped[bytes] = mapped_column(LargeBinary)
@@ -0,0 +1,27 @@
+"""Chat embedding index - packed per-player vectors over persisted chat exchanges."""
+
+from datetime import datetime
+
+from sqlalchemy import Integer, LargeBinary, DateTime, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.database import Base
+
+
+class ChatEmbeddingIndex(Base):
+    """One row per player; both blobs are appended to as exchanges are persisted."""
+    __tablename__ = "chat_embedding_index"
+
+    player_id: Mapped[int] = mapped_column(
+        ForeignKey("players.id", ondelete="CASCADE"), primary_key=True
+    )
+    dim: Mapped[int] = mapped_column(Integer)
+
+    # int64 pairs (user_message_id, assistant_message_id), one pair per exchange
+    message_ids: Mapped[bytes] = mapped_column(LargeBinary, default=b"")
+    # float16 row-major matrix (exchanges x dim) of L2-normalised embeddings
+    vectors: Mapped[bytes] = mapped_column(LargeBinary, default=b"")
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now()
+    )
@@ -2,17 +2,29 @@
 
 from datetime import datetime
 
-from sqlalchemy import String, Text, Integer, DateTime, ForeignKey, func
+from sqlalchemy import String, Text, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.database import Base
 
 
 class ChatMessage(Base):
+    """On Postgres the table is range-partitioned by month on created_at (migration 0007).
+
+    The database primary key there is (id, created_at); ids still come from a
+    single sequence, so mapping on ``id`` alone stays correct. Queries should
+    bound created_at where they can so Postgres prunes partitions.
+    """
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # History is always read per player, newest first
+        Index("ix_chat_messages_player_created", "player_id", "created_at"),
+        # Keyset order for batched retention purges
+        Index("ix_chat_messages_created_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    player_id: Mapped[int] = mapped_column(ForeignKey("players.id"))
+    player_id: Mapped[int] = mapped_column(ForeignKey("players.id", ondelete="CASCADE"))
     role: Mapped[str] = mapped_column(String(20))  # "user" or "assistant"
     content: Mapped[str] = mapped_column(Text)
 
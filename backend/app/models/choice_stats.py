@@ -0,0 +1,25 @@
+"""Choice stats model - periodic snapshots of the Redis choice counters."""
+
+from datetime import datetime
+
+from sqlalchemy import String, BigInteger, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.database import Base
+
+
+class ChoiceStat(Base):
+    """How many times an option was chosen, as of the last counter flush.
+
+    Global (not per player); on sharded setups it lives on shard 0.
+    """
+    __tablename__ = "choice_stats"
+
+    level_id: Mapped[str] = mapped_column(String(50), primary_key=True)
+    node_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    choice_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger, default=0)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now()
+    )
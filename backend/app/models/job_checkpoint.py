@@ -0,0 +1,24 @@
+"""Job checkpoint model - resumable progress for long-running maintenance jobs."""
+
+from datetime import datetime
+
+from sqlalchemy import String, Integer, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.database import Base
+
+
+class JobCheckpoint(Base):
+    """Keyset position of an in-flight batched job; deleted when the job completes."""
+    __tablename__ = "job_checkpoints"
+
+    # e.g. "retention:chat_messages"
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    cutoff: Mapped[datetime] = mapped_column(DateTime)  # only ever lowered during a run
+    last_created_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_id: Mapped[int] = mapped_column(Integer, default=0)
+    processed: Mapped[int] = mapped_column(Integer, default=0)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now()
+    )
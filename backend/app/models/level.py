@@ -2,7 +2,7 @@
 
 from datetime import datetime
 
-from sqlalchemy import String, Integer, DateTime, ForeignKey, func
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.database import Base
@@ -20,12 +20,23 @@ class Level(Base):
 class LevelChoice(Base):
     """Records which choices a player made in a level."""
     __tablename__ = "level_choices"
+    __table_args__ = (
+        # Per-player lookups are scoped to a level (progress, replays)
+        Index("ix_level_choices_player_level", "player_id", "level_id", "created_at"),
+        # Keyset order for batched retention purges
+        Index("ix_level_choices_created_id", "created_at", "id"),
+        # Backstop against retried submissions (see idempotency_service)
+        UniqueConstraint("player_id", "request_key", name="uq_level_choices_player_request"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    player_id: Mapped[int] = mapped_column(ForeignKey("players.id"))
+    player_id: Mapped[int] = mapped_column(ForeignKey("players.id", ondelete="CASCADE"))
     level_id: Mapped[str] = mapped_column(String(50))
     node_id: Mapped[str] = mapped_column(String(100))  # dialogue node identifier
     choice_id: Mapped[str] = mapped_column(String(100))  # chosen option identifier
     affinity_delta: Mapped[int] = mapped_column(Integer, default=0)
+    # Idempotency-Key header, or "level_id/node_id" when the client sent none;
+    # cleared on progress reset so the level can be played again
+    request_key: Mapped[str | None] = mapped_column(String(200), nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
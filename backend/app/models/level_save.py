@@ -0,0 +1,30 @@
+"""Level save model - durable copy of a player's paused level state."""
+
+from datetime import datetime
+
+from sqlalchemy import String, Float, DateTime, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.database import Base
+from app.models.player import JSONDocument
+
+
+class LevelSave(Base):
+    """Write-behind copy of the player's Redis state hash (see app.core.level_engine)."""
+    __tablename__ = "level_saves"
+
+    player_id: Mapped[int] = mapped_column(
+        ForeignKey("players.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Both None once the state was cleared: the row stays as a tombstone so a
+    # flush that read the state before the clear can't write it back
+    level_id: Mapped[str | None] = mapped_column(String(50), nullable=True)
+    node_id: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    # node_id -> choice_id for the choices made so far in this level
+    choices: Mapped[dict] = mapped_column(JSONDocument, default=dict)
+    # Epoch seconds of the pause this row reflects
+    saved_at: Mapped[float] = mapped_column(Float)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now()
+    )
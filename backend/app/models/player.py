@@ -2,7 +2,8 @@
 
 from datetime import datetime
 
-from sqlalchemy import String, Integer, DateTime, JSON, Text, func
+from sqlalchemy import String, Integer, DateTime, Index, JSON, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.database import Base
@@ -10,9 +11,22 @@ from app.db.database import Base
 # Default starting level
 DEFAULT_LEVEL = "chapter_01"
 
+# JSONB on Postgres (server-side merges, GIN-indexable); plain JSON elsewhere (SQLite tests)
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
 
 class Player(Base):
     __tablename__ = "players"
+    __table_args__ = (
+        # Supports fact lookups such as `memory_facts ? 'pet_name'`
+        Index(
+            "ix_players_memory_facts", "memory_facts", postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+        # The deletion sweep only ever looks for tombstoned rows
+        Index(
+            "ix_players_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100), default="Player")
@@ -27,7 +41,10 @@ class Player(Base):
 
     # Long-term memory: key facts the character should remember
     # e.g. {"favorite_color": "蓝色", "pet_name": "小白"}
-    memory_facts: Mapped[dict] = mapped_column(JSON, default=dict)
+    memory_facts: Mapped[dict] = mapped_column(JSONDocument, default=dict)
+    # Per-fact bookkeeping for eviction and prompt selection, keyed like memory_facts
+    # e.g. {"pet_name": {"first_seen": 1.7e9, "last_ref": 1.7e9, "hits": 3}}
+    memory_meta: Mapped[dict] = mapped_column(JSONDocument, default=dict)
 
     # Player's personal note / bio (optional)
     bio: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -36,6 +53,8 @@ class Player(Base):
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, server_default=func.now(), onupdate=func.now()
     )
+    # Set by DELETE; the player reads as gone and a background sweep removes the rows
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     def reset_progress(self) -> None:
         """Reset player to the beginning of the game."""
@@ -43,3 +62,4 @@ class Player(Base):
         self.max_unlocked_level = DEFAULT_LEVEL
         self.affinity_score = 0
         self.memory_facts = {}
+        self.memory_meta = {}
@@ -0,0 +1,19 @@
+"""Player shard directory - which database holds each player's rows."""
+
+from sqlalchemy import Integer, Boolean, false
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.database import Base
+
+
+class PlayerShard(Base):
+    """Directory entry, only meaningful on shard 0 (see app.db.sharding).
+
+    No foreign key to players: the player row usually lives on another shard.
+    """
+    __tablename__ = "player_shards"
+
+    player_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    shard_id: Mapped[int] = mapped_column(Integer)
+    # Set by the rebalancer while rows are copied; requests get 503 meanwhile
+    moving: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false())
@@ -0,0 +1,20 @@
+"""Bootstrap schema - everything the client needs at launch, in one response."""
+
+from pydantic import BaseModel
+
+from app.schemas.affinity import AffinityStatus
+from app.schemas.chat import ChatHistory
+from app.schemas.level import LevelProgressResponse, LevelState, LevelSummary
+from app.schemas.player import PlayerState
+
+
+class BootstrapResponse(BaseModel):
+    """Launch payload; sections listed in ``unchanged`` are left null."""
+    versions: dict[str, str]  # section -> content version, sent back on the next launch
+    unchanged: list[str] = []  # sections whose version matched the client's
+    player: PlayerState | None = None
+    levels: list[LevelSummary] | None = None
+    progress: LevelProgressResponse | None = None
+    affinity: AffinityStatus | None = None
+    chat_history: ChatHistory | None = None  # most recent page
+    level_state: LevelState | None = None  # paused level to resume, if any
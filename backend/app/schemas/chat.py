@@ -14,5 +14,34 @@ class ChatMessageOut(BaseModel):
     is_stream_end: bool = False
 
 
+class ServerNotice(BaseModel):
+    """Server-initiated message pushed to a connected player."""
+    content: str
+
+
+class NoticeDelivery(BaseModel):
+    delivered: bool  # False when the player has no open chat connection
+
+
+class ConnectionBuffer(BaseModel):
+    """Send-buffer metrics of one chat connection (see app.api.websocket.outbox)."""
+    player_id: int
+    conn_id: str
+    queued_frames: int
+    queued_bytes: int
+    peak_bytes: int  # high-water mark of queued_bytes over the connection's life
+    sent_frames: int
+    coalesced_chunks: int  # chunks merged into a queued frame because the client lagged
+    idle_seconds: float  # since the client last sent anything
+    closed: bool
+    close_code: int | None = None
+
+
+class NodeConnections(BaseModel):
+    node: str
+    connections: list[ConnectionBuffer]
+
+
 class ChatHistory(BaseModel):
     messages: list[dict]  # [{"role": "user"|"assistant", "content": "..."}]
+    next_before: str | None = None  # cursor for the next older page, None when exhausted
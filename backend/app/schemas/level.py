@@ -5,7 +5,9 @@ Simplified for frontend-driven architecture:
 - Backend only stores: choice→affinity mapping, level ordering, player progress
 """
 
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, Field
 
 
 # --- Internal: loaded from YAML ---
@@ -26,11 +28,15 @@ class LevelConfig(BaseModel):
 
 # --- API request/response schemas ---
 
-class LevelSummary(BaseModel):
-    """Returned when listing levels with unlock status."""
+class LevelCatalogEntry(BaseModel):
+    """A level in the static catalog (same for every player)."""
     id: str
     title: str
     order: int
+
+
+class LevelSummary(LevelCatalogEntry):
+    """Returned when listing levels with unlock status."""
     is_unlocked: bool
 
 
@@ -68,3 +74,87 @@ class LevelProgressResponse(BaseModel):
     unlocked_levels: list[str]
     total_affinity: int
     affinity_tier: str
+
+
+# --- Pause / resume ---
+
+class LevelStateSave(BaseModel):
+    """Where the player paused; ``choices`` are merged into those already saved."""
+    level_id: str
+    node_id: str = Field(max_length=100)
+    choices: dict[str, str] = Field(default={}, max_length=200)  # node_id -> choice_id
+
+
+class LevelState(BaseModel):
+    """Saved in-progress level state to resume from."""
+    level_id: str
+    node_id: str
+    choices: dict[str, str]  # node_id -> choice_id made so far in this level
+    saved_at: float  # epoch seconds of the last pause
+
+
+# --- Batch submission (offline play / fewer round-trips) ---
+
+class BatchChoice(BaseModel):
+    node_id: str
+    choice_id: str
+    idempotency_key: str | None = Field(default=None, max_length=200)
+
+
+class LevelBatch(BaseModel):
+    """Choices made in one level, in play order, and whether it was finished."""
+    level_id: str
+    choices: list[BatchChoice] = Field(default=[], max_length=200)
+    complete: bool = False
+    ending_node: str | None = None
+
+
+class BatchSubmitRequest(BaseModel):
+    levels: list[LevelBatch] = Field(min_length=1, max_length=20)
+
+
+class BatchChoiceResult(BaseModel):
+    level_id: str
+    node_id: str
+    choice_id: str
+    # applied: recorded now; replayed: already recorded earlier (not re-applied);
+    # invalid: unknown level/node/choice; conflict: a different choice was recorded for it
+    status: Literal["applied", "replayed", "invalid", "conflict"]
+    affinity_delta: int = 0
+
+
+class BatchCompletionResult(BaseModel):
+    level_id: str
+    status: Literal["completed", "invalid"]
+    next_level_id: str | None = None
+    unlocked: bool = False
+
+
+class BatchSubmitResponse(BaseModel):
+    choices: list[BatchChoiceResult]
+    completions: list[BatchCompletionResult]
+    current_level: str
+    total_affinity: int
+    affinity_tier: str
+
+
+# --- Analytics ---
+
+class OptionStats(BaseModel):
+    choice_id: str
+    count: int
+    share: float  # of all choices made at this node
+    affinity_delta: int
+
+
+class NodeChoiceStats(BaseModel):
+    node_id: str
+    total: int
+    options: list[OptionStats]
+    affinity_distribution: dict[int, int]  # affinity_delta -> times applied
+
+
+class LevelChoiceStats(BaseModel):
+    """Choice distribution for every choice node of a level."""
+    level_id: str
+    nodes: list[NodeChoiceStats]
@@ -2,6 +2,7 @@
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 
 from app.models.affinity import AffinityRecord
 from app.models.player import Player
@@ -47,7 +48,11 @@ class AffinityService:
         db.add(record)
 
         # Update player's total
-        result = await db.execute(select(Player).where(Player.id == player_id))
+        result = await db.execute(
+            select(Player)
+            .where(Player.id == player_id)
+            .options(load_only(Player.affinity_score))
+        )
         player = result.scalar_one()
         player.affinity_score = max(0, player.affinity_score + delta)  # floor at 0
         await db.flush()
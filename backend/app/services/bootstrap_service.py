@@ -0,0 +1,41 @@
+"""Bootstrap service - content versions for the sections of the launch payload.
+
+A section's version is a short hash of its serialized content, so the
+client can send back the versions it holds and receive only the sections
+that changed since.
+"""
+
+import hashlib
+from typing import Any
+
+from pydantic_core import to_json
+
+from app.schemas.bootstrap import BootstrapResponse
+
+
+def section_version(content: Any) -> str:
+    """Stable short hash of a section (models, lists of models, dicts or None)."""
+    return hashlib.blake2b(to_json(content), digest_size=8).hexdigest()
+
+
+class BootstrapService:
+    @staticmethod
+    def parse_versions(raw: str | None) -> dict[str, str]:
+        """``"player:ab12,levels:cd34"`` -> {"player": "ab12", "levels": "cd34"}."""
+        versions = {}
+        for pair in (raw or "").split(","):
+            section, sep, version = pair.strip().partition(":")
+            if sep and section and version:
+                versions[section] = version
+        return versions
+
+    @staticmethod
+    def build(sections: dict[str, Any], known: dict[str, str]) -> BootstrapResponse:
+        """Response with every section whose version differs from the client's."""
+        versions = {name: section_version(content) for name, content in sections.items()}
+        unchanged = [name for name, version in versions.items() if known.get(name) == version]
+        changed = {name: content for name, content in sections.items() if name not in unchanged}
+        return BootstrapResponse(versions=versions, unchanged=unchanged, **changed)
+
+
+bootstrap_service = BootstrapService()
@@ -1,12 +1,13 @@
 """Chat service - orchestrates free-chat sessions with Redis context management."""
 
-import json
 from collections.abc import AsyncGenerator
 
 import redis.asyncio as aioredis
 
 from app.config import settings
+from app.core.serialization import dumps, loads
 from app.services.llm_service import llm_service
+from app.services.reply_buffer import ReplyBuffer
 
 
 class ChatService:
@@ -20,7 +21,7 @@ class ChatService:
         """Get short-term chat context from Redis."""
         raw = await self.redis.get(self._context_key(player_id))
         if raw:
-            return json.loads(raw)
+            return loads(raw)
         return []
 
     async def save_context(self, player_id: int, messages: list[dict]) -> None:
@@ -29,7 +30,7 @@ class ChatService:
         trimmed = messages[-(settings.MAX_CHAT_CONTEXT_TURNS * 2):]
         await self.redis.set(
             self._context_key(player_id),
-            json.dumps(trimmed, ensure_ascii=False),
+            dumps(trimmed),
             ex=settings.CHAT_CONTEXT_TTL,
         )
 
@@ -44,22 +45,39 @@ class ChatService:
         character_prompt: str,
         affinity_score: int = 0,
         memory_facts: dict | None = None,
+        recalled_exchanges: list[dict] | None = None,
+        reply_id: str | None = None,
     ) -> AsyncGenerator[str, None]:
-        """Send a message and stream back the LLM response, managing context."""
+        """Send a message and stream back the LLM response, managing context.
+
+        With a ``reply_id`` the chunks are also buffered in Redis so a client
+        that drops mid-reply can resume it (see app.services.reply_buffer).
+        """
         # Load existing context
         context = await self.get_context(player_id)
         context.append({"role": "user", "content": user_message})
+        buffer = ReplyBuffer(self.redis, player_id, reply_id) if reply_id else None
 
         # Stream response
         full_response = ""
-        async for chunk in llm_service.chat_stream(
-            messages=context,
-            character_prompt=character_prompt,
-            affinity_score=affinity_score,
-            memory_facts=memory_facts,
-        ):
-            full_response += chunk
-            yield chunk
+        try:
+            async for chunk in llm_service.chat_stream(
+                messages=context,
+                character_prompt=character_prompt,
+                affinity_score=affinity_score,
+                memory_facts=memory_facts,
+                recalled_exchanges=recalled_exchanges,
+            ):
+                full_response += chunk
+                if buffer:
+                    await buffer.append(chunk)
+                yield chunk
+        except Exception:
+            if buffer:
+                await buffer.finish(failed=True)
+            raise
+        if buffer:
+            await buffer.finish()
 
         # Save updated context
         context.append({"role": "assistant", "content": full_response})
@@ -0,0 +1,201 @@
+"""Chat session service - the per-turn pipeline shared by the WebSocket and SSE chat.
+
+A turn loads the player's affinity and relevant memories, streams the
+reply through ChatService.stream_reply, then persists the exchange. A
+session ends with an LLM evaluation of the conversation (affinity delta
+and memory extraction): on disconnect for WebSocket chat, and after
+CHAT_SESSION_IDLE_TIMEOUT seconds without a message for SSE chat, which
+has no disconnect to hook. SSE players are tracked in the sorted set
+``chat:sessions:idle`` (score = last message time) until a job evaluates them.
+"""
+
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import redis.asyncio as aioredis
+import yaml
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.core.rate_limit import RateLimited, rate_limiter
+from app.db.database import record_player_writes
+from app.db.sharding import PlayerMovingError
+from app.models.chat_history import ChatMessage
+from app.models.player import Player
+from app.services.affinity_service import affinity_service
+from app.services.chat_service import ChatService
+from app.services.embedding_service import embedding_service
+from app.services.llm_service import llm_service
+from app.services.memory_service import memory_service
+
+logger = logging.getLogger(__name__)
+
+SessionFactory = async_sessionmaker[AsyncSession]
+SessionFor = Callable[[int], Awaitable[SessionFactory]]
+
+CHARACTER_DIR = Path(__file__).parent.parent / "data" / "characters"
+IDLE_KEY = "chat:sessions:idle"
+
+# Remove a player from the idle set only if they are still idle
+_CLAIM_SCRIPT = """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if score and tonumber(score) <= tonumber(ARGV[2]) then
+    return redis.call('ZREM', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+def load_character_prompt(character: str = "yade") -> str:
+    path = CHARACTER_DIR / f"{character}.yaml"
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+        return data.get("system_prompt", "")
+    return ""
+
+
+@dataclass
+class ChatTurn:
+    """What the prompt needs to know about the player for one message."""
+    affinity_score: int
+    memory_facts: dict
+    recalled_exchanges: list[dict]
+
+
+class ChatSessionService:
+    @staticmethod
+    async def load_turn(
+        session_factory: SessionFactory, player_id: int, user_content: str
+    ) -> ChatTurn | None:
+        """Load player state for an affinity-aware reply; None if the player doesn't exist.
+
+        Only the facts relevant to this message go into the prompt.
+        """
+        async with session_factory() as db:
+            result = await db.execute(
+                select(Player.affinity_score, Player.memory_facts, Player.memory_meta)
+                .where(Player.id == player_id, Player.deleted_at.is_(None))
+            )
+            player = result.one_or_none()
+            if player is None:
+                return None
+            memory_facts = await memory_service.recall(
+                db, player_id, player.memory_facts or {}, player.memory_meta or {},
+                user_content,
+            )
+            recalled = await embedding_service.recall(db, player_id, user_content)
+            await db.commit()
+        return ChatTurn(player.affinity_score, memory_facts, recalled)
+
+    @staticmethod
+    async def persist_exchange(
+        session_factory: SessionFactory, player_id: int, user_content: str, reply: str
+    ) -> None:
+        """Store the user message and the reply, and index them for recall."""
+        async with session_factory() as db:
+            user_msg = ChatMessage(player_id=player_id, role="user", content=user_content)
+            reply_msg = ChatMessage(player_id=player_id, role="assistant", content=reply)
+            db.add_all([user_msg, reply_msg])
+            await db.flush()
+            await embedding_service.index_exchange(db, player_id, user_msg, reply_msg)
+            await db.commit()
+        await record_player_writes([player_id])
+
+    @staticmethod
+    async def mark_active(redis: aioredis.Redis, player_id: int) -> None:
+        """Note an SSE message, (re)starting the player's idle countdown."""
+        try:
+            await redis.zadd(IDLE_KEY, {str(player_id): time.time()})
+        except aioredis.RedisError:
+            # Only the end-of-session evaluation is lost
+            logger.warning("Could not track chat session of player %s", player_id,
+                           exc_info=True)
+
+    @staticmethod
+    async def defer_evaluation(redis: aioredis.Redis, player_id: int) -> None:
+        """Leave the session to the idle sweep, due on its next run (e.g. over budget)."""
+        due = time.time() - settings.CHAT_SESSION_IDLE_TIMEOUT
+        try:
+            await redis.zadd(IDLE_KEY, {str(player_id): due}, gt=True)
+        except aioredis.RedisError:
+            logger.warning("Could not defer chat session of player %s", player_id,
+                           exc_info=True)
+
+    @staticmethod
+    async def evaluate_session(
+        redis: aioredis.Redis,
+        session_factory: SessionFactory,
+        player_id: int,
+        character_prompt: str,
+    ) -> bool:
+        """Evaluate affinity and extract memory from the session; False if there was no exchange.
+
+        Both LLM calls are charged to the global LLM budget up front; raises
+        RateLimited (before any LLM call) when it has run out.
+        """
+        await redis.zrem(IDLE_KEY, str(player_id))
+        context = await ChatService(redis).get_context(player_id)
+        if len(context) < 2:  # at least one exchange
+            return False
+        await rate_limiter.spend_llm(redis, settings.LLM_TOKENS_PER_EVALUATION_ESTIMATE)
+        # Before opening the session: no connection is held during this LLM call
+        delta = await llm_service.evaluate_chat_affinity(context, character_prompt)
+        async with session_factory() as db:
+            if delta != 0:
+                await affinity_service.add_affinity(
+                    db, player_id, delta, "chat",
+                    reason=f"Chat session ({len(context)} messages)",
+                )
+            await memory_service.extract_and_save(db, player_id, context)
+            await db.commit()
+        await record_player_writes([player_id])
+        return True
+
+    @staticmethod
+    async def evaluate_idle(
+        redis: aioredis.Redis, session_for: SessionFor, max_players: int = 50
+    ) -> int:
+        """Evaluate up to ``max_players`` SSE sessions idle past the timeout; returns the count.
+
+        ``session_for`` maps a player ID to its shard's session factory.
+        Players mid-move are put back for the next run; a failed evaluation
+        is logged and dropped, like a failed evaluation on disconnect. Once
+        the global LLM budget runs out, the player is put back and the sweep
+        stops, so chat keeps its share of the budget.
+        """
+        cutoff = time.time() - settings.CHAT_SESSION_IDLE_TIMEOUT
+        due = await redis.zrangebyscore(
+            IDLE_KEY, "-inf", cutoff, start=0, num=max_players, withscores=True
+        )
+        character_prompt = load_character_prompt("yade")
+        evaluated = 0
+        for member, last_active in due:
+            if not await redis.eval(_CLAIM_SCRIPT, 1, IDLE_KEY, member, cutoff):
+                continue  # chatted again meanwhile
+            player_id = int(member)
+            try:
+                session_factory = await session_for(player_id)
+            except PlayerMovingError:
+                await redis.zadd(IDLE_KEY, {member: last_active}, gt=True)
+                continue
+            try:
+                if await ChatSessionService.evaluate_session(
+                    redis, session_factory, player_id, character_prompt
+                ):
+                    evaluated += 1
+            except RateLimited:
+                await redis.zadd(IDLE_KEY, {member: last_active}, gt=True)
+                logger.info("LLM budget exhausted; deferring idle chat sessions")
+                break
+            except Exception:
+                logger.warning("Could not evaluate chat session of player %s", player_id,
+                               exc_info=True)
+        return evaluated
+
+
+chat_session_service = ChatSessionService()
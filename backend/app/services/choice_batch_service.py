@@ -0,0 +1,176 @@
+"""Choice batch service - apply queued choices and completions in one transaction.
+
+Offline or flaky clients queue their choice/complete calls and send them
+together. The batch is validated against the level configs in one pass,
+previously recorded choices are found with a single query on their request
+keys (the same keys ``POST /api/levels/choice`` uses, so retries across both
+endpoints are recognised), and everything new is written as one bulk insert
+per table plus one player UPDATE. Each item gets its own result, so bad
+items don't sink the rest.
+"""
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.affinity import AffinityRecord
+from app.models.level import LevelChoice
+from app.models.player import Player
+from app.schemas.level import (
+    BatchChoiceResult,
+    BatchCompletionResult,
+    BatchSubmitRequest,
+    BatchSubmitResponse,
+    LevelConfig,
+)
+from app.services.affinity_service import affinity_service
+from app.services.level_service import level_service
+
+
+def choice_request_key(level_id: str, node_id: str, idempotency_key: str | None) -> str:
+    """Client key if given, else the natural key: one choice per node per playthrough."""
+    return idempotency_key or f"{level_id}/{node_id}"
+
+
+def natural_request_keys(config: LevelConfig) -> list[str]:
+    """The natural request keys of every choice node in the level."""
+    return [choice_request_key(config.id, node_id, None) for node_id in config.choices]
+
+
+class ChoiceBatchService:
+    @staticmethod
+    async def release_level(db: AsyncSession, player_id: int, config: LevelConfig) -> None:
+        """End the player's playthrough of a level so replaying it records new choices.
+
+        Clears the level's natural request keys (like a progress reset does
+        for every level); client Idempotency-Keys stay unique.
+        """
+        await db.execute(
+            update(LevelChoice)
+            .where(
+                LevelChoice.player_id == player_id,
+                LevelChoice.level_id == config.id,
+                LevelChoice.request_key.in_(natural_request_keys(config)),
+            )
+            .values(request_key=None)
+        )
+
+    @staticmethod
+    async def apply(
+        db: AsyncSession, player: Player, req: BatchSubmitRequest
+    ) -> tuple[BatchSubmitResponse, list[tuple[str, str, str]]]:
+        """Apply the batch to ``player`` (progress columns loaded); flushes, doesn't commit.
+
+        Returns the response and the (level, node, choice) triples newly applied.
+        """
+        all_levels = level_service.list_levels()
+        configs: dict[str, LevelConfig | None] = {}
+        for level in req.levels:
+            if level.level_id not in configs:
+                try:
+                    configs[level.level_id] = level_service.load_level(level.level_id)
+                except FileNotFoundError:
+                    configs[level.level_id] = None
+
+        keys = [
+            choice_request_key(level.level_id, c.node_id, c.idempotency_key)
+            for level in req.levels for c in level.choices
+        ]
+        recorded = {}
+        if keys:
+            result = await db.execute(
+                select(LevelChoice.request_key, LevelChoice.level_id, LevelChoice.node_id,
+                       LevelChoice.choice_id, LevelChoice.affinity_delta)
+                .where(LevelChoice.player_id == player.id, LevelChoice.request_key.in_(keys))
+            )
+            recorded = {row.request_key: row for row in result}
+
+        score = player.affinity_score
+        choice_rows: list[dict] = []
+        affinity_rows: list[dict] = []
+        choice_results: list[BatchChoiceResult] = []
+        completion_results: list[BatchCompletionResult] = []
+        applied: list[tuple[str, str, str]] = []
+        completed: list[LevelConfig] = []
+
+        for level in req.levels:
+            config = configs[level.level_id]
+            for choice in level.choices:
+                outcome = BatchChoiceResult(
+                    level_id=level.level_id, node_id=choice.node_id,
+                    choice_id=choice.choice_id, status="invalid",
+                )
+                choice_results.append(outcome)
+                option = config and config.choices.get(choice.node_id, {}).get(choice.choice_id)
+                if not option:
+                    continue
+                key = choice_request_key(level.level_id, choice.node_id, choice.idempotency_key)
+                previous = recorded.get(key)
+                if previous is not None:
+                    same = (previous.level_id, previous.node_id, previous.choice_id) == (
+                        level.level_id, choice.node_id, choice.choice_id
+                    )
+                    outcome.status = "replayed" if same else "conflict"
+                    outcome.affinity_delta = previous.affinity_delta if same else 0
+                    continue
+
+                # Same per-step floor at 0 as affinity_service.add_affinity
+                score = max(0, score + option.affinity_delta)
+                outcome.status = "applied"
+                outcome.affinity_delta = option.affinity_delta
+                recorded[key] = outcome  # later duplicates in this batch are replays
+                choice_rows.append({
+                    "player_id": player.id, "level_id": level.level_id,
+                    "node_id": choice.node_id, "choice_id": choice.choice_id,
+                    "affinity_delta": option.affinity_delta, "request_key": key,
+                })
+                affinity_rows.append({
+                    "player_id": player.id, "delta": option.affinity_delta,
+                    "source": "level_choice",
+                    "reason": f"{level.level_id}/{choice.node_id}/{choice.choice_id}",
+                })
+                applied.append((level.level_id, choice.node_id, choice.choice_id))
+
+            if level.complete:
+                if config is None:
+                    completion_results.append(
+                        BatchCompletionResult(level_id=level.level_id, status="invalid")
+                    )
+                    continue
+                next_level_id, player.max_unlocked_level, unlocked = (
+                    level_service.completion_progress(
+                        level.level_id, player.max_unlocked_level, all_levels
+                    )
+                )
+                player.current_level_id = next_level_id or level.level_id
+                # Later choices in this batch start a new playthrough of the level
+                completed.append(config)
+                released = set(natural_request_keys(config))
+                for row in choice_rows:
+                    if row["request_key"] in released:
+                        row["request_key"] = None
+                for key in released:
+                    recorded.pop(key, None)
+                completion_results.append(BatchCompletionResult(
+                    level_id=level.level_id, status="completed",
+                    next_level_id=next_level_id, unlocked=unlocked,
+                ))
+
+        for config in completed:
+            await ChoiceBatchService.release_level(db, player.id, config)
+        if choice_rows:
+            await db.execute(insert(LevelChoice), choice_rows)
+            await db.execute(insert(AffinityRecord), affinity_rows)
+        player.affinity_score = score
+        await db.flush()
+
+        response = BatchSubmitResponse(
+            choices=choice_results,
+            completions=completion_results,
+            current_level=player.current_level_id,
+            total_affinity=score,
+            affinity_tier=affinity_service.get_tier(score),
+        )
+        return response, applied
+
+
+choice_batch_service = ChoiceBatchService()
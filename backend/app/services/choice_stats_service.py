@@ -0,0 +1,248 @@
+"""Choice stats service - option counts in Postgres, with recent increments in Redis.
+
+``choice_stats`` holds each option's total as of the last flush. After a
+choice commits, ``POST /api/levels/choice`` bumps a Redis hash per (level,
+node) with one field per option; these hashes only hold the increments not
+yet flushed. Touched nodes are remembered in a dirty set, and the flush job
+takes each node's increments (read and delete in one transaction) and adds
+them to ``choice_stats``. Reading a node's distribution is therefore a
+primary-key lookup plus O(options) in Redis instead of a GROUP BY over
+level_choices, and losing Redis only loses unflushed increments.
+
+Counters are best-effort analytics: a failed increment is logged, never
+surfaced to the player.
+"""
+
+import logging
+from collections import Counter
+from collections.abc import Mapping, Sequence
+
+import redis.asyncio as aioredis
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.choice_stats import ChoiceStat
+from app.models.level import LevelChoice
+from app.schemas.level import LevelConfig, LevelChoiceStats, NodeChoiceStats, OptionStats
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "stats:choices:"
+DIRTY_KEY = "stats:choices:dirty"  # set of "level_id:node_id" awaiting a flush
+
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def counter_key(level_id: str, node_id: str) -> str:
+    return f"{_KEY_PREFIX}{level_id}:{node_id}"
+
+
+def _dirty_member(level_id: str, node_id: str) -> str:
+    return f"{level_id}:{node_id}"
+
+
+class ChoiceStatsService:
+    @staticmethod
+    async def record(redis: aioredis.Redis, level_id: str, node_id: str, choice_id: str) -> None:
+        """Count one choice; never raises."""
+        await ChoiceStatsService.record_many(redis, [(level_id, node_id, choice_id)])
+
+    @staticmethod
+    async def record_many(
+        redis: aioredis.Redis, choices: Sequence[tuple[str, str, str]]
+    ) -> None:
+        """Count (level_id, node_id, choice_id) triples in one round trip; never raises."""
+        if not choices:
+            return
+        try:
+            await ChoiceStatsService._increment(redis, Counter(choices))
+        except aioredis.RedisError:
+            logger.warning("Could not count %d choices", len(choices), exc_info=True)
+
+    @staticmethod
+    async def _increment(
+        redis: aioredis.Redis, counts: Mapping[tuple[str, str, str], int]
+    ) -> None:
+        """Add (level_id, node_id, choice_id) -> n to the pending hashes and mark them dirty."""
+        async with redis.pipeline(transaction=False) as pipe:
+            for (level_id, node_id, choice_id), n in counts.items():
+                pipe.hincrby(counter_key(level_id, node_id), choice_id, n)
+                pipe.sadd(DIRTY_KEY, _dirty_member(level_id, node_id))
+            await pipe.execute()
+
+    @staticmethod
+    async def pending_counts(
+        redis: aioredis.Redis, level_id: str, node_ids: Sequence[str]
+    ) -> dict[str, dict[str, int]]:
+        """node_id -> {choice_id: count} not flushed yet, in one round trip."""
+        async with redis.pipeline(transaction=False) as pipe:
+            for node_id in node_ids:
+                pipe.hgetall(counter_key(level_id, node_id))
+            hashes = await pipe.execute()
+        return {
+            node_id: {choice: int(n) for choice, n in counts.items()}
+            for node_id, counts in zip(node_ids, hashes)
+        }
+
+    @staticmethod
+    async def snapshot_counts(db: AsyncSession, level_id: str) -> dict[str, dict[str, int]]:
+        """node_id -> {choice_id: count} as of the last flush."""
+        result = await db.execute(
+            select(ChoiceStat.node_id, ChoiceStat.choice_id, ChoiceStat.count)
+            .where(ChoiceStat.level_id == level_id)
+        )
+        counts: dict[str, dict[str, int]] = {}
+        for row in result:
+            counts.setdefault(row.node_id, {})[row.choice_id] = row.count
+        return counts
+
+    @staticmethod
+    async def current_counts(
+        db: AsyncSession, redis: aioredis.Redis, level_id: str, node_ids: Sequence[str]
+    ) -> dict[str, dict[str, int]]:
+        """Flushed totals plus pending increments; just the totals if Redis is unavailable."""
+        counts = await ChoiceStatsService.snapshot_counts(db, level_id)
+        try:
+            pending = await ChoiceStatsService.pending_counts(redis, level_id, node_ids)
+        except aioredis.RedisError:
+            logger.warning("Choice counters unavailable, serving snapshot", exc_info=True)
+            return counts
+        for node_id, node_pending in pending.items():
+            node_counts = counts.setdefault(node_id, {})
+            for choice_id, n in node_pending.items():
+                node_counts[choice_id] = node_counts.get(choice_id, 0) + n
+        return counts
+
+    @staticmethod
+    def build_stats(config: LevelConfig, counts: dict[str, dict[str, int]]) -> LevelChoiceStats:
+        """Shape raw counts into per-node option shares and affinity-delta histograms."""
+        nodes = []
+        for node_id, options in config.choices.items():
+            node_counts = counts.get(node_id, {})
+            total = sum(node_counts.get(choice_id, 0) for choice_id in options)
+            deltas: Counter[int] = Counter()
+            option_stats = []
+            for choice_id, option in options.items():
+                n = node_counts.get(choice_id, 0)
+                deltas[option.affinity_delta] += n
+                option_stats.append(OptionStats(
+                    choice_id=choice_id,
+                    count=n,
+                    share=n / total if total else 0.0,
+                    affinity_delta=option.affinity_delta,
+                ))
+            nodes.append(NodeChoiceStats(
+                node_id=node_id,
+                total=total,
+                options=option_stats,
+                affinity_distribution=dict(sorted(deltas.items())),
+            ))
+        return LevelChoiceStats(level_id=config.id, nodes=nodes)
+
+    @staticmethod
+    async def _add_counts(db: AsyncSession, rows: list[dict]) -> None:
+        """Add each row's ``count`` to its option's total, creating missing rows."""
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(ChoiceStat)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["level_id", "node_id", "choice_id"],
+                set_={
+                    "count": ChoiceStat.__table__.c.count + stmt.excluded.count,
+                    "updated_at": func.now(),
+                },
+            ),
+            rows,
+        )
+
+    @staticmethod
+    async def flush(db: AsyncSession, redis: aioredis.Redis, max_nodes: int = 1000) -> int:
+        """Add up to ``max_nodes`` dirty nodes' increments to choice_stats; returns nodes flushed.
+
+        Each node's hash is read and deleted in one MULTI, so increments made
+        mid-flush start a fresh hash (and re-mark the node dirty) and are
+        added next time. Commits on success; on failure the taken increments
+        and members are put back.
+        """
+        members = await redis.spop(DIRTY_KEY, max_nodes)
+        if not members:
+            return 0
+        keys = [member.partition(":") for member in members]
+        async with redis.pipeline(transaction=True) as pipe:
+            for level_id, _, node_id in keys:
+                pipe.hgetall(counter_key(level_id, node_id))
+                pipe.delete(counter_key(level_id, node_id))
+            hashes = (await pipe.execute())[::2]
+        rows = [
+            {"level_id": level_id, "node_id": node_id, "choice_id": choice, "count": int(n)}
+            for (level_id, _, node_id), counts in zip(keys, hashes)
+            for choice, n in counts.items()
+        ]
+        try:
+            if rows:
+                await ChoiceStatsService._add_counts(db, rows)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            try:
+                await ChoiceStatsService._increment(redis, {
+                    (row["level_id"], row["node_id"], row["choice_id"]): row["count"]
+                    for row in rows
+                })
+            except aioredis.RedisError:
+                logger.warning("Lost %d unflushed choice counts", len(rows), exc_info=True)
+            raise
+        return len(members)
+
+    @staticmethod
+    async def backfill(
+        factories: Sequence[async_sessionmaker[AsyncSession]],
+        redis: aioredis.Redis,
+        chunk_size: int = BACKFILL_CHUNK_SIZE,
+    ) -> int:
+        """Recount every option from level_choices; returns the rows scanned.
+
+        ``factories`` are all shards, shard 0 (which holds choice_stats)
+        first. Pending increments and choice_stats are cleared before the
+        max id of each shard is read. Rows up to those ids are then counted
+        into the pending hashes, and the next flush adds them to the
+        emptied table. Choices made after that point are counted once, by
+        the live path. Run it with the flush job paused: a flush already in
+        progress when the counters are cleared would count its nodes twice.
+        """
+        async for key in redis.scan_iter(match=f"{_KEY_PREFIX}*"):
+            await redis.delete(key)
+        async with factories[0]() as db:
+            await db.execute(delete(ChoiceStat))
+            await db.commit()
+
+        bounds = []
+        for factory in factories:
+            async with factory() as db:
+                bounds.append(await db.scalar(select(func.max(LevelChoice.id))) or 0)
+
+        scanned = 0
+        for factory, max_id in zip(factories, bounds):
+            last_id = 0
+            while last_id < max_id:
+                async with factory() as db:
+                    result = await db.execute(
+                        select(LevelChoice.id, LevelChoice.level_id, LevelChoice.node_id,
+                               LevelChoice.choice_id)
+                        .where(LevelChoice.id > last_id, LevelChoice.id <= max_id)
+                        .order_by(LevelChoice.id)
+                        .limit(chunk_size)
+                    )
+                    rows = result.all()
+                if not rows:
+                    break
+                await ChoiceStatsService._increment(
+                    redis, Counter((r.level_id, r.node_id, r.choice_id) for r in rows)
+                )
+                scanned += len(rows)
+                last_id = rows[-1].id
+        return scanned
+
+
+choice_stats_service = ChoiceStatsService()
@@ -0,0 +1,272 @@
+"""Compaction service - condenses old chat history into episodes and cold archives.
+
+Old ``chat_messages`` rows are grouped into episodes (same ``after_level_id``,
+no silence longer than ``CHAT_EPISODE_GAP_MINUTES``). Each episode gets a
+short summary row; with archiving on, its raw rows are moved into one
+zlib-compressed ``ChatArchive`` blob and deleted from the hot table, which
+keeps ``chat_messages`` (and per-player queries on it) bounded.
+"""
+
+import json
+import logging
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import redis.asyncio as aioredis
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.core.rate_limit import RateLimited, rate_limiter
+from app.models.chat_archive import ChatArchive, ChatEpisode
+from app.models.chat_history import ChatMessage
+from app.services.embedding_service import embedding_service
+from app.services.llm_service import llm_service
+
+logger = logging.getLogger(__name__)
+
+# Fallback summary length when the LLM is unavailable
+_FALLBACK_SUMMARY_CHARS = 300
+# Upper bound on hot rows loaded per player per compaction run
+_MAX_MESSAGES_PER_RUN = 5000
+
+
+@dataclass
+class Episode:
+    after_level_id: str | None
+    messages: list = field(default_factory=list)  # ChatMessage-like rows, chronological
+
+    @property
+    def started_at(self) -> datetime:
+        return self.messages[0].created_at
+
+    @property
+    def ended_at(self) -> datetime:
+        return self.messages[-1].created_at
+
+
+def group_episodes(rows: list, gap: timedelta) -> list[Episode]:
+    """Split chronological message rows into episodes on level change or silence > ``gap``."""
+    episodes: list[Episode] = []
+    for row in rows:
+        current = episodes[-1] if episodes else None
+        if (
+            current is None
+            or row.after_level_id != current.after_level_id
+            or row.created_at - current.ended_at > gap
+        ):
+            current = Episode(after_level_id=row.after_level_id)
+            episodes.append(current)
+        current.messages.append(row)
+    return episodes
+
+
+def pack_messages(rows: list) -> bytes:
+    """Serialise message rows into a compressed archive payload."""
+    payload = [
+        [row.id, row.role, row.content, row.after_level_id, row.created_at.isoformat()]
+        for row in rows
+    ]
+    return zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+
+def unpack_messages(payload: bytes) -> list[dict]:
+    """Inverse of pack_messages: chronological message dicts."""
+    return [
+        {
+            "id": msg_id,
+            "role": role,
+            "content": content,
+            "after_level_id": after_level_id,
+            "created_at": datetime.fromisoformat(created_at),
+        }
+        for msg_id, role, content, after_level_id, created_at in json.loads(
+            zlib.decompress(payload)
+        )
+    ]
+
+
+async def _summarize(episode: Episode) -> str:
+    messages = [{"role": m.role, "content": m.content} for m in episode.messages]
+    try:
+        return await llm_service.summarize_episode(messages)
+    except Exception:
+        # Compaction must not stall on the LLM; keep an extractive summary instead
+        logger.warning("Episode summary failed, using extractive fallback", exc_info=True)
+        said = " / ".join(m.content for m in episode.messages if m.role == "user")
+        return said[:_FALLBACK_SUMMARY_CHARS]
+
+
+class CompactionService:
+    @staticmethod
+    async def players_with_old_messages(
+        db: AsyncSession, cutoff: datetime, limit: int
+    ) -> list[int]:
+        """Player IDs that have hot messages older than ``cutoff``."""
+        result = await db.execute(
+            select(ChatMessage.player_id)
+            .where(ChatMessage.created_at < cutoff)
+            .distinct()
+            .limit(limit)
+        )
+        return list(result.scalars())
+
+    @staticmethod
+    async def compact_player(
+        session_factory: async_sessionmaker[AsyncSession],
+        player_id: int,
+        cutoff: datetime,
+        archive: bool | None = None,
+        redis: aioredis.Redis | None = None,
+    ) -> int:
+        """Compact one player's messages older than ``cutoff``; returns episodes written.
+
+        An episode is only compacted once it ended at least one episode gap
+        before the cutoff, so sessions straddling the cutoff are left whole.
+        Messages are read in one short transaction, summarised with no
+        transaction open (LLM calls take seconds), then written in another;
+        an episode whose messages changed in between is left for the next run.
+        With ``redis``, each summary is charged to the global LLM budget;
+        episodes past the point where it runs out are left for the next run.
+        """
+        archive = settings.CHAT_COMPACTION_ARCHIVE if archive is None else archive
+        gap = timedelta(minutes=settings.CHAT_EPISODE_GAP_MINUTES)
+
+        async with session_factory() as db:
+            result = await db.execute(
+                select(
+                    ChatMessage.id, ChatMessage.role, ChatMessage.content,
+                    ChatMessage.after_level_id, ChatMessage.created_at,
+                )
+                .where(ChatMessage.player_id == player_id, ChatMessage.created_at < cutoff)
+                .order_by(ChatMessage.created_at, ChatMessage.id)
+                .limit(_MAX_MESSAGES_PER_RUN)
+            )
+            rows = result.all()
+        episodes = [ep for ep in group_episodes(rows, gap) if ep.ended_at < cutoff - gap]
+        if len(rows) == _MAX_MESSAGES_PER_RUN and episodes:
+            # The last episode may continue past the batch; leave it for the next run
+            episodes.pop()
+        if not episodes:
+            return 0
+
+        summaries = []
+        for episode in episodes:
+            if redis is not None:
+                try:
+                    await rate_limiter.spend_llm(redis, settings.LLM_TOKENS_PER_SUMMARY_ESTIMATE)
+                except RateLimited:
+                    logger.info("LLM budget exhausted; deferring compaction of player %s",
+                                player_id)
+                    break
+            summaries.append(await _summarize(episode))
+
+        written = 0
+        async with session_factory() as db:
+            for episode, summary in zip(episodes, summaries):
+                message_ids = [m.id for m in episode.messages]
+                present = await db.scalar(
+                    select(func.count()).select_from(ChatMessage).where(
+                        ChatMessage.player_id == player_id, ChatMessage.id.in_(message_ids)
+                    )
+                )
+                if present != len(message_ids):
+                    continue
+                row = ChatEpisode(
+                    player_id=player_id,
+                    after_level_id=episode.after_level_id,
+                    started_at=episode.started_at,
+                    ended_at=episode.ended_at,
+                    first_message_id=message_ids[0],
+                    last_message_id=message_ids[-1],
+                    message_count=len(message_ids),
+                    summary=summary,
+                )
+                db.add(row)
+                await db.flush()
+                written += 1
+
+                if archive:
+                    db.add(ChatArchive(
+                        player_id=player_id,
+                        episode_id=row.id,
+                        started_at=episode.started_at,
+                        ended_at=episode.ended_at,
+                        message_count=len(message_ids),
+                        payload=pack_messages(episode.messages),
+                    ))
+                    await db.execute(
+                        delete(ChatMessage).where(
+                            ChatMessage.player_id == player_id,
+                            ChatMessage.created_at.between(episode.started_at, episode.ended_at),
+                            ChatMessage.id.in_(message_ids),
+                        )
+                    )
+
+            if archive and written:
+                # Drop index rows that now point at archived messages
+                await embedding_service.rebuild_index(db, player_id)
+            await db.commit()
+        return written
+
+    @staticmethod
+    async def load_history(
+        db: AsyncSession, player_id: int, limit: int, before: str | None = None
+    ) -> tuple[list[dict], str | None]:
+        """Newest-first page of a player's history across the hot and archived tiers.
+
+        Returns (messages in chronological order, cursor for the next older
+        page or None when exhausted). Cursors are opaque strings.
+        """
+        bound = decode_cursor(before) if before else None
+        stmt = select(
+            ChatMessage.id, ChatMessage.role, ChatMessage.content, ChatMessage.created_at
+        ).where(ChatMessage.player_id == player_id)
+        if bound:
+            ts, msg_id = bound
+            # The plain created_at bound keeps the scan index- and partition-prunable
+            stmt = stmt.where(
+                ChatMessage.created_at <= ts,
+                or_(ChatMessage.created_at < ts, and_(ChatMessage.created_at == ts,
+                                                      ChatMessage.id < msg_id)),
+            )
+        result = await db.execute(
+            stmt.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(limit)
+        )
+        page = [row._asdict() for row in result]
+
+        if len(page) < limit:
+            # Continue into the archive tier, newest archive first
+            oldest = (page[-1]["created_at"], page[-1]["id"]) if page else bound
+            archives = select(ChatArchive.payload).where(ChatArchive.player_id == player_id)
+            if oldest:
+                archives = archives.where(ChatArchive.started_at <= oldest[0])
+            result = await db.stream(archives.order_by(ChatArchive.ended_at.desc()))
+            async for (payload,) in result:
+                older = [
+                    m for m in reversed(unpack_messages(payload))
+                    if oldest is None or (m["created_at"], m["id"]) < oldest
+                ]
+                page.extend(older[:limit - len(page)])
+                if len(page) >= limit:
+                    break
+            await result.close()
+
+        next_cursor = None
+        if len(page) == limit:
+            next_cursor = encode_cursor(page[-1]["created_at"], page[-1]["id"])
+        page.reverse()
+        return [{"role": m["role"], "content": m["content"]} for m in page], next_cursor
+
+
+def encode_cursor(created_at: datetime, message_id: int) -> str:
+    return f"{created_at.isoformat()}~{message_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    created_at, _, message_id = cursor.rpartition("~")
+    return datetime.fromisoformat(created_at), int(message_id)
+
+
+compaction_service = CompactionService()
@@ -0,0 +1,182 @@
+"""Deletion service - tombstone players now, remove their rows in the background.
+
+``DELETE /api/player/{id}`` only stamps ``players.deleted_at`` (a single-row
+UPDATE), after which every loader treats the player as gone. The sweep then
+deletes child rows in small id-ordered batches, one short transaction each,
+so a player with a huge chat history never holds long locks or produces a
+single giant transaction. Redis state is purged and the player row goes last,
+which keeps the sweep restartable at any point.
+"""
+
+import asyncio
+import logging
+
+import redis.asyncio as aioredis
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.core.clock import utcnow
+from app.core.level_engine import DIRTY_KEY as LEVEL_STATE_DIRTY_KEY
+from app.core.rate_limit import ROUTE_CLASSES
+from app.db.database import note_player_write
+from app.models.affinity import AffinityRecord
+from app.models.chat_archive import ChatArchive, ChatEpisode
+from app.models.chat_embedding import ChatEmbeddingIndex
+from app.models.chat_history import ChatMessage
+from app.models.level import LevelChoice
+from app.models.level_save import LevelSave
+from app.models.player import Player
+from app.services.chat_session_service import IDLE_KEY as CHAT_SESSIONS_IDLE_KEY
+from app.services.idempotency_service import SCOPES as IDEMPOTENCY_SCOPES
+
+logger = logging.getLogger(__name__)
+
+# Every per-player table, in a safe delete order (archives reference episodes)
+PLAYER_CHILD_MODELS = (
+    ChatEmbeddingIndex, ChatArchive, ChatEpisode, ChatMessage, AffinityRecord, LevelChoice,
+    LevelSave,
+)
+
+# Every piece of per-player Redis state. Add new per-player keys here so deletion
+# purges them: exact keys, SCAN patterns, and memberships in shared sets.
+PLAYER_REDIS_KEYS = (
+    "chat:context:{player_id}",
+    "level:state:{player_id}",
+    "db:last_write:{player_id}",
+    "ws:conn:{player_id}",
+    *(f"ratelimit:{route_class}:{{player_id}}" for route_class in ROUTE_CLASSES),
+)
+PLAYER_REDIS_PATTERNS = (
+    "chat:reply:{player_id}:*",
+    # Per scope: request keys may contain colons, so "idem:*:{player_id}:*" could over-match
+    *(f"idem:{scope}:{{player_id}}:*" for scope in IDEMPOTENCY_SCOPES),
+)
+PLAYER_REDIS_SETS = (LEVEL_STATE_DIRTY_KEY,)
+PLAYER_REDIS_SORTED_SETS = (CHAT_SESSIONS_IDLE_KEY,)
+
+
+class DeletionService:
+    @staticmethod
+    async def tombstone(db: AsyncSession, player_id: int) -> bool:
+        """Mark a live player deleted; False if missing or already tombstoned."""
+        result = await db.execute(
+            update(Player)
+            .where(Player.id == player_id, Player.deleted_at.is_(None))
+            .values(deleted_at=utcnow())
+        )
+        if not result.rowcount:
+            return False
+        note_player_write(db, player_id)
+        return True
+
+    @staticmethod
+    async def tombstoned_players(db: AsyncSession, limit: int) -> list[int]:
+        result = await db.execute(
+            select(Player.id)
+            .where(Player.deleted_at.is_not(None))
+            .order_by(Player.deleted_at)
+            .limit(limit)
+        )
+        return list(result.scalars())
+
+    @staticmethod
+    async def delete_rows(
+        session_factory: async_sessionmaker[AsyncSession],
+        model,
+        player_id: int,
+        batch_size: int,
+        pause: float,
+    ) -> int:
+        """Delete one table's rows for the player in id-ordered batches; returns the count."""
+        if "id" not in model.__table__.c:
+            # Single row keyed by player_id
+            async with session_factory() as db:
+                result = await db.execute(delete(model).where(model.player_id == player_id))
+                await db.commit()
+            return result.rowcount
+
+        deleted = 0
+        last_id = 0
+        while True:
+            async with session_factory() as db:
+                ids = list(await db.scalars(
+                    select(model.id)
+                    .where(model.player_id == player_id, model.id > last_id)
+                    .order_by(model.id)
+                    .limit(batch_size)
+                ))
+                if not ids:
+                    return deleted
+                await db.execute(delete(model).where(model.id.in_(ids)))
+                await db.commit()
+            deleted += len(ids)
+            last_id = ids[-1]
+            if pause:
+                await asyncio.sleep(pause)
+
+    @staticmethod
+    async def purge_redis(redis: aioredis.Redis, player_id: int) -> None:
+        """Delete everything in the PLAYER_REDIS_* registry for the player."""
+        try:
+            keys = [key.format(player_id=player_id) for key in PLAYER_REDIS_KEYS]
+            for pattern in PLAYER_REDIS_PATTERNS:
+                keys += [
+                    key async for key in
+                    redis.scan_iter(match=pattern.format(player_id=player_id), count=1000)
+                ]
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.delete(*keys)
+                for key in PLAYER_REDIS_SETS:
+                    pipe.srem(key, player_id)
+                for key in PLAYER_REDIS_SORTED_SETS:
+                    pipe.zrem(key, player_id)
+                await pipe.execute()
+        except aioredis.RedisError:
+            # The keys expire on their own; don't block row deletion on Redis
+            logger.warning("Could not purge Redis keys for player %s", player_id, exc_info=True)
+
+    @staticmethod
+    async def purge_player(
+        session_factory: async_sessionmaker[AsyncSession],
+        redis: aioredis.Redis,
+        player_id: int,
+        batch_size: int | None = None,
+        pause: float | None = None,
+    ) -> dict[str, int]:
+        """Remove all of a tombstoned player's rows and Redis state; returns rows per table."""
+        batch_size = batch_size or settings.PLAYER_DELETION_BATCH_SIZE
+        pause = settings.PLAYER_DELETION_BATCH_PAUSE_MS / 1000 if pause is None else pause
+
+        counts = {}
+        for model in PLAYER_CHILD_MODELS:
+            counts[model.__tablename__] = await DeletionService.delete_rows(
+                session_factory, model, player_id, batch_size, pause
+            )
+        await DeletionService.purge_redis(redis, player_id)
+        async with session_factory() as db:
+            await db.execute(
+                delete(Player).where(Player.id == player_id, Player.deleted_at.is_not(None))
+            )
+            await db.commit()
+        return counts
+
+    @staticmethod
+    async def run(
+        session_factory: async_sessionmaker[AsyncSession],
+        redis: aioredis.Redis,
+        max_players: int = 100,
+        **purge_options,
+    ) -> list[int]:
+        """Purge up to ``max_players`` tombstoned players, oldest first; returns their IDs."""
+        async with session_factory() as db:
+            player_ids = await DeletionService.tombstoned_players(db, max_players)
+        for player_id in player_ids:
+            counts = await DeletionService.purge_player(
+                session_factory, redis, player_id, **purge_options
+            )
+            logger.info("Purged player %s: %s", player_id, counts)
+        return player_ids
+
+
+deletion_service = DeletionService()
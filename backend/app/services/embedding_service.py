@@ -0,0 +1,252 @@
+"""Embedding service - local retrieval over a player's persisted chat history.
+
+Embeddings are hashed character n-grams (no model download, no network):
+each 1-3 gram is hashed into one of ``EMBEDDING_DIM`` signed buckets and
+the vector is L2-normalised, so a dot product is a cosine similarity.
+Character n-grams suit Chinese, which has no whitespace tokenisation.
+
+Each player has one ``ChatEmbeddingIndex`` row holding a packed float16
+matrix with one row per exchange (user message + Yade's reply). Persisting
+an exchange appends a row; on Postgres the append is a server-side
+``bytea || bytea`` upsert, so it doesn't rewrite the whole index.
+"""
+
+import zlib
+
+import numpy as np
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.models.chat_embedding import ChatEmbeddingIndex
+from app.models.chat_history import ChatMessage
+
+_NGRAM_WEIGHTS = {1: 0.5, 2: 1.0, 3: 1.0}
+_VECTOR_DTYPE = np.float16
+_ID_DTYPE = np.int64
+
+# Characters of each past message quoted back into the prompt
+_RECALL_SNIPPET_CHARS = 200
+
+
+def embed_text(text: str, dim: int | None = None) -> np.ndarray:
+    """Hashed character n-gram embedding, L2-normalised (all zeros for empty text)."""
+    dim = dim or settings.EMBEDDING_DIM
+    text = " ".join(text.lower().split())
+    vec = np.zeros(dim, dtype=np.float32)
+    for n, weight in _NGRAM_WEIGHTS.items():
+        for i in range(len(text) - n + 1):
+            # crc32 rather than hash(): str hashes are salted per process
+            h = zlib.crc32(text[i:i + n].encode("utf-8"))
+            vec[h % dim] += weight if h & 0x80000000 else -weight
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+def _exchange_text(user_content: str, assistant_content: str) -> str:
+    return f"{user_content}\n{assistant_content}"
+
+
+class EmbeddingService:
+    @staticmethod
+    async def index_exchange(
+        db: AsyncSession, player_id: int, user_msg: ChatMessage, assistant_msg: ChatMessage
+    ) -> None:
+        """Append one persisted exchange to the player's index (messages must be flushed)."""
+        vector = embed_text(_exchange_text(user_msg.content, assistant_msg.content))
+        vec_bytes = vector.astype(_VECTOR_DTYPE).tobytes()
+        id_bytes = np.array([user_msg.id, assistant_msg.id], dtype=_ID_DTYPE).tobytes()
+
+        if db.get_bind().dialect.name == "postgresql":
+            stmt = pg_insert(ChatEmbeddingIndex).values(
+                player_id=player_id,
+                dim=settings.EMBEDDING_DIM,
+                message_ids=id_bytes,
+                vectors=vec_bytes,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ChatEmbeddingIndex.player_id],
+                set_={
+                    "message_ids": ChatEmbeddingIndex.message_ids.op("||")(
+                        stmt.excluded.message_ids
+                    ),
+                    "vectors": ChatEmbeddingIndex.vectors.op("||")(stmt.excluded.vectors),
+                },
+                where=ChatEmbeddingIndex.dim == stmt.excluded.dim,
+            )
+            await db.execute(stmt)
+            return
+
+        index = await db.get(ChatEmbeddingIndex, player_id)
+        if index is None:
+            db.add(ChatEmbeddingIndex(
+                player_id=player_id,
+                dim=settings.EMBEDDING_DIM,
+                message_ids=id_bytes,
+                vectors=vec_bytes,
+            ))
+        elif index.dim == settings.EMBEDDING_DIM:
+            index.message_ids = index.message_ids + id_bytes
+            index.vectors = index.vectors + vec_bytes
+        await db.flush()
+
+    @staticmethod
+    async def rebuild_index(db: AsyncSession, player_id: int) -> int:
+        """Rebuild a player's index from chat_messages; returns the number of exchanges.
+
+        Used for backfill and after changing EMBEDDING_DIM.
+        """
+        result = await db.execute(
+            select(ChatMessage.id, ChatMessage.role, ChatMessage.content)
+            .where(ChatMessage.player_id == player_id)
+            .order_by(ChatMessage.created_at, ChatMessage.id)
+        )
+        ids: list[int] = []
+        vectors: list[np.ndarray] = []
+        pending_user = None
+        for row in result:
+            if row.role == "user":
+                pending_user = row
+            elif pending_user is not None:
+                ids.extend([pending_user.id, row.id])
+                vectors.append(embed_text(_exchange_text(pending_user.content, row.content)))
+                pending_user = None
+
+        index = await db.get(ChatEmbeddingIndex, player_id)
+        if index is None:
+            index = ChatEmbeddingIndex(player_id=player_id)
+            db.add(index)
+        index.dim = settings.EMBEDDING_DIM
+        index.message_ids = np.array(ids, dtype=_ID_DTYPE).tobytes()
+        index.vectors = (
+            np.stack(vectors).astype(_VECTOR_DTYPE).tobytes() if vectors else b""
+        )
+        await db.flush()
+        return len(vectors)
+
+    @staticmethod
+    async def prune(db: AsyncSession, player_ids: list[int]) -> int:
+        """Drop index entries whose messages were purged; returns the entries dropped.
+
+        Retention deletes a player's oldest messages, so entries older than
+        the player's oldest remaining message are the stale ones.
+        """
+        result = await db.execute(
+            select(ChatMessage.player_id, func.min(ChatMessage.id))
+            .where(ChatMessage.player_id.in_(player_ids))
+            .group_by(ChatMessage.player_id)
+        )
+        oldest = dict(result.all())
+        result = await db.execute(
+            select(
+                ChatEmbeddingIndex.player_id, ChatEmbeddingIndex.dim,
+                ChatEmbeddingIndex.message_ids, ChatEmbeddingIndex.vectors,
+            ).where(ChatEmbeddingIndex.player_id.in_(player_ids))
+        )
+        dropped = 0
+        for row in result.all():
+            if not row.message_ids:
+                continue
+            pairs = np.frombuffer(row.message_ids, dtype=_ID_DTYPE).reshape(-1, 2)
+            keep = pairs[:, 0] >= oldest.get(row.player_id, np.iinfo(_ID_DTYPE).max)
+            if keep.all():
+                continue
+            matrix = np.frombuffer(row.vectors, dtype=_VECTOR_DTYPE).reshape(-1, row.dim)
+            await db.execute(
+                update(ChatEmbeddingIndex)
+                .where(ChatEmbeddingIndex.player_id == row.player_id)
+                .values(message_ids=pairs[keep].tobytes(), vectors=matrix[keep].tobytes())
+            )
+            dropped += int((~keep).sum())
+        return dropped
+
+    @staticmethod
+    async def prune_all(
+        session_factory: async_sessionmaker[AsyncSession], batch_size: int = 500
+    ) -> int:
+        """``prune`` every index, ``batch_size`` players per transaction."""
+        dropped = 0
+        last_player_id = 0
+        while True:
+            async with session_factory() as db:
+                player_ids = list((await db.scalars(
+                    select(ChatEmbeddingIndex.player_id)
+                    .where(ChatEmbeddingIndex.player_id > last_player_id)
+                    .order_by(ChatEmbeddingIndex.player_id)
+                    .limit(batch_size)
+                )).all())
+                if not player_ids:
+                    return dropped
+                dropped += await EmbeddingService.prune(db, player_ids)
+                await db.commit()
+            last_player_id = player_ids[-1]
+
+    @staticmethod
+    def top_k(
+        index, query: str, k: int, skip_recent: int = 0, min_score: float = 0.0,
+    ) -> list[tuple[float, int, int]]:
+        """Cosine top-k over an index: [(score, user_message_id, assistant_message_id)].
+
+        ``index`` is a ChatEmbeddingIndex or a row with its dim, message_ids
+        and vectors. ``skip_recent`` excludes the newest exchanges (already
+        in short-term context).
+        """
+        if not index.vectors or index.dim != settings.EMBEDDING_DIM:
+            return []
+        matrix = np.frombuffer(index.vectors, dtype=_VECTOR_DTYPE).reshape(-1, index.dim)
+        pairs = np.frombuffer(index.message_ids, dtype=_ID_DTYPE).reshape(-1, 2)
+        searchable = len(matrix) - skip_recent
+        if searchable <= 0:
+            return []
+
+        scores = matrix[:searchable].astype(np.float32) @ embed_text(query)
+        k = min(k, searchable)
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [
+            (float(scores[i]), int(pairs[i][0]), int(pairs[i][1]))
+            for i in ranked
+            if scores[i] >= min_score
+        ]
+
+    @staticmethod
+    async def recall(db: AsyncSession, player_id: int, query: str) -> list[dict]:
+        """Past exchanges most similar to ``query``, oldest first.
+
+        Returns [{"user": "...", "assistant": "..."}], skipping the exchanges
+        still held in the short-term Redis context.
+        """
+        # Plain columns: the blobs aren't tracked in the identity map for a read
+        result = await db.execute(
+            select(
+                ChatEmbeddingIndex.dim, ChatEmbeddingIndex.message_ids, ChatEmbeddingIndex.vectors
+            ).where(ChatEmbeddingIndex.player_id == player_id)
+        )
+        index = result.one_or_none()
+        if index is None:
+            return []
+        hits = EmbeddingService.top_k(
+            index,
+            query,
+            settings.CHAT_RECALL_TOP_K,
+            skip_recent=settings.MAX_CHAT_CONTEXT_TURNS,
+            min_score=settings.CHAT_RECALL_MIN_SCORE,
+        )
+        if not hits:
+            return []
+
+        message_ids = [mid for _, user_id, reply_id in hits for mid in (user_id, reply_id)]
+        result = await db.execute(
+            select(ChatMessage.id, ChatMessage.content).where(ChatMessage.id.in_(message_ids))
+        )
+        contents = {row.id: row.content[:_RECALL_SNIPPET_CHARS] for row in result}
+        exchanges = [
+            {"user": contents[user_id], "assistant": contents[reply_id]}
+            for _, user_id, reply_id in sorted(hits, key=lambda hit: hit[1])
+            if user_id in contents and reply_id in contents
+        ]
+        return exchanges
+
+
+embedding_service = EmbeddingService()
@@ -0,0 +1,177 @@
+"""Export service - bulk player data dumps as NDJSON.
+
+Each line is one row: ``{"table": "<name>", "row": {...}}``. Tables are
+written players first, then their children, and each is read through a
+server-side cursor in ``batch_size`` chunks, so memory stays constant
+however large the dump. The importer streams lines back in with multi-row
+INSERTs, one transaction per batch.
+
+Player IDs are preserved on import (they are global, see app.db.sharding);
+child rows get fresh IDs from the target database's sequences, and archive
+rows are pointed at their episode's new ID. Message IDs recorded inside
+episodes and archives keep their source values. Binary columns travel as
+base64.
+"""
+
+import base64
+from collections import Counter
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from datetime import datetime
+
+from sqlalchemy import DateTime, LargeBinary, Table, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.serialization import dumps_str, loads
+from app.models.affinity import AffinityRecord
+from app.models.chat_archive import ChatArchive, ChatEpisode
+from app.models.chat_history import ChatMessage
+from app.models.level import LevelChoice
+from app.models.level_save import LevelSave
+from app.models.player import Player
+
+EXPORT_BATCH_SIZE = 1000
+
+# Dependency order: every child row's player (and an archive's episode) is written before it
+EXPORT_TABLES: tuple[Table, ...] = (
+    Player.__table__, LevelChoice.__table__, AffinityRecord.__table__, ChatMessage.__table__,
+    ChatEpisode.__table__, ChatArchive.__table__, LevelSave.__table__,
+)
+_TABLES_BY_NAME = {table.name: table for table in EXPORT_TABLES}
+
+
+def _columns_of_type(table: Table, type_: type) -> frozenset[str]:
+    return frozenset(c.name for c in table.columns if isinstance(c.type, type_))
+
+
+_DATETIME_COLUMNS = {table.name: _columns_of_type(table, DateTime) for table in EXPORT_TABLES}
+_BINARY_COLUMNS = {table.name: _columns_of_type(table, LargeBinary) for table in EXPORT_TABLES}
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    return value
+
+
+def encode_row(table: Table, row: dict) -> str:
+    """One NDJSON line (with trailing newline) for a row of ``table``."""
+    data = {key: _encode_value(value) for key, value in row.items()}
+    return dumps_str({"table": table.name, "row": data}) + "\n"
+
+
+def decode_line(line: str) -> tuple[Table, dict]:
+    """Parse an NDJSON line back into (table, insertable row)."""
+    record = loads(line)
+    table = _TABLES_BY_NAME.get(record.get("table"))
+    if table is None:
+        raise ValueError(f"Unknown table in export: {record.get('table')!r}")
+    row = record["row"]
+    for key in _DATETIME_COLUMNS[table.name]:
+        if row.get(key) is not None:
+            row[key] = datetime.fromisoformat(row[key])
+    for key in _BINARY_COLUMNS[table.name]:
+        if row.get(key) is not None:
+            row[key] = base64.b64decode(row[key])
+    return table, row
+
+
+class ExportService:
+    @staticmethod
+    async def export_ndjson(
+        db: AsyncSession,
+        player_ids: list[int] | None = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ) -> AsyncIterator[str]:
+        """Yield NDJSON chunks (one per fetched batch) for the given players, or everyone."""
+        for table in EXPORT_TABLES:
+            owner = table.c.id if table is Player.__table__ else table.c.player_id
+            stmt = select(table).order_by(*table.primary_key.columns)
+            if player_ids is not None:
+                stmt = stmt.where(owner.in_(player_ids))
+            result = await db.stream(stmt.execution_options(yield_per=batch_size))
+            async for rows in result.partitions():
+                yield "".join(encode_row(table, row._asdict()) for row in rows)
+
+    @staticmethod
+    async def import_ndjson(
+        session_factory: async_sessionmaker[AsyncSession],
+        lines: Iterable[str],
+        batch_size: int = EXPORT_BATCH_SIZE,
+        on_players: Callable[[list[int]], Awaitable[None]] | None = None,
+    ) -> dict:
+        """Insert rows from NDJSON ``lines``; returns row counts per table.
+
+        Consecutive rows of the same table are inserted ``batch_size`` at a
+        time and committed per batch. ``on_players`` is awaited with each
+        batch of imported player IDs after it commits (e.g. to register them
+        in the shard directory).
+        """
+        counts: Counter[str] = Counter()
+        max_player_id = 0
+        pending_table: Table | None = None
+        pending: list[dict] = []
+        # Source episode IDs of the pending episode rows, and source -> new episode ID
+        pending_episode_ids: list[int] = []
+        episode_ids: dict[int, int] = {}
+
+        async def flush() -> None:
+            nonlocal max_player_id
+            if not pending:
+                return
+            async with session_factory() as db:
+                if pending_table is ChatEpisode.__table__:
+                    result = await db.execute(
+                        insert(pending_table).returning(
+                            pending_table.c.id, sort_by_parameter_order=True
+                        ),
+                        pending,
+                    )
+                    episode_ids.update(zip(pending_episode_ids, result.scalars()))
+                    pending_episode_ids.clear()
+                else:
+                    await db.execute(insert(pending_table), pending)
+                await db.commit()
+            counts[pending_table.name] += len(pending)
+            if pending_table is Player.__table__:
+                player_ids = [row["id"] for row in pending]
+                max_player_id = max(max_player_id, *player_ids)
+                if on_players is not None:
+                    await on_players(player_ids)
+            pending.clear()
+
+        for line in lines:
+            if not line.strip():
+                continue
+            table, row = decode_line(line)
+            if table is not pending_table or len(pending) >= batch_size:
+                await flush()
+                pending_table = table
+            if table is ChatEpisode.__table__:
+                pending_episode_ids.append(row.pop("id"))
+            elif table is ChatArchive.__table__:
+                row["episode_id"] = episode_ids[row["episode_id"]]
+            if table is not Player.__table__:
+                row.pop("id", None)
+            pending.append(row)
+        await flush()
+
+        return {"rows": dict(counts), "max_player_id": max_player_id}
+
+    @staticmethod
+    async def advance_player_ids(db: AsyncSession, max_player_id: int) -> None:
+        """Move players_id_seq past imported IDs so new players don't collide (Postgres)."""
+        if db.get_bind().dialect.name != "postgresql" or max_player_id <= 0:
+            return
+        await db.execute(
+            text(
+                "SELECT setval('players_id_seq', "
+                "GREATEST(:max_id, (SELECT last_value FROM players_id_seq)))"
+            ),
+            {"max_id": max_player_id},
+        )
+        await db.commit()
+
+
+export_service = ExportService()
@@ -0,0 +1,86 @@
+"""Idempotency service - recognise retried requests and replay their responses.
+
+A request is identified per player by its ``Idempotency-Key`` header or, if
+the client sent none, by a natural key of the request itself. The first
+successful response is cached in Redis for IDEMPOTENCY_TTL seconds together
+with the request it answered, so a retry is answered from Redis without
+touching Postgres. Tables store the same key under a unique constraint as
+the backstop for when the cache is unavailable or expired.
+"""
+
+import logging
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.core.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Cache namespaces, one per idempotent endpoint
+CHOICE_SCOPE = "choice"  # POST /api/levels/choice
+BATCH_SCOPE = "batch"  # POST /api/levels/batch (Idempotency-Key only)
+SCOPES = (CHOICE_SCOPE, BATCH_SCOPE)
+
+
+def _cache_key(scope: str, player_id: int, request_key: str) -> str:
+    return f"idem:{scope}:{player_id}:{request_key}"
+
+
+class IdempotencyService:
+    @staticmethod
+    async def get(
+        redis: aioredis.Redis, scope: str, player_id: int, request_key: str
+    ) -> dict | None:
+        """Cached {"request": ..., "response": ...} for the key, or None (also if Redis is down)."""
+        try:
+            raw = await redis.get(_cache_key(scope, player_id, request_key))
+        except aioredis.RedisError:
+            logger.warning("Idempotency cache unavailable", exc_info=True)
+            return None
+        return loads(raw) if raw else None
+
+    @staticmethod
+    async def store(
+        redis: aioredis.Redis, scope: str, player_id: int, request_key: str,
+        request: dict, response: dict,
+    ) -> None:
+        try:
+            await redis.set(
+                _cache_key(scope, player_id, request_key),
+                dumps({"request": request, "response": response}),
+                ex=settings.IDEMPOTENCY_TTL,
+            )
+        except aioredis.RedisError:
+            # The database constraint still catches the retry
+            logger.warning("Could not cache idempotent response", exc_info=True)
+
+    @staticmethod
+    async def forget(
+        redis: aioredis.Redis, scope: str, player_id: int, request_keys: list[str]
+    ) -> None:
+        """Drop the cached responses for specific request keys."""
+        if not request_keys:
+            return
+        try:
+            await redis.delete(*(_cache_key(scope, player_id, key) for key in request_keys))
+        except aioredis.RedisError:
+            logger.warning("Could not clear idempotency cache for player %s", player_id,
+                           exc_info=True)
+
+    @staticmethod
+    async def forget_player(redis: aioredis.Redis, scope: str, player_id: int) -> None:
+        """Drop a player's cached responses (e.g. when their progress is reset)."""
+        try:
+            keys = [key async for key in redis.scan_iter(match=_cache_key(scope, player_id, "*"))]
+            if keys:
+                await redis.delete(*keys)
+        except aioredis.RedisError:
+            logger.warning("Could not clear idempotency cache for player %s", player_id,
+                           exc_info=True)
+
+
+idempotency_service = IdempotencyService()
@@ -0,0 +1,173 @@
+"""Level save service - Postgres side of paused level state.
+
+Pauses are written to Redis only (see app.core.level_engine); ``flush``
+copies the states of dirty players into ``level_saves`` in the background.
+Resume reads Redis and only falls back to ``level_saves`` (re-caching the
+row) once the Redis hash has expired, so a state survives Redis eviction
+for at most one flush interval's worth of pauses.
+
+Clearing a state leaves a tombstone row (no level, ``saved_at`` = clear
+time) instead of deleting it. The flush only overwrites rows with an older
+``saved_at``, so a flush that read the state just before the clear can't
+bring it back.
+"""
+
+import logging
+import time
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+
+import redis.asyncio as aioredis
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.level_engine import DIRTY_KEY, LevelEngine
+from app.db.sharding import PlayerMovingError
+from app.models.level_save import LevelSave
+from app.models.player import Player
+
+logger = logging.getLogger(__name__)
+
+SessionFor = Callable[[int], Awaitable[async_sessionmaker[AsyncSession]]]
+
+
+class LevelSaveService:
+    @staticmethod
+    async def load(db: AsyncSession, player_id: int) -> dict | None:
+        """The persisted state in LevelEngine's format, or None."""
+        save = await db.get(LevelSave, player_id)
+        if save is None or save.level_id is None:
+            return None
+        return {
+            "level_id": save.level_id,
+            "node_id": save.node_id,
+            "choices": dict(save.choices),
+            "saved_at": save.saved_at,
+        }
+
+    @staticmethod
+    async def cached(redis: aioredis.Redis, player_id: int) -> tuple[dict | None, bool]:
+        """(state from Redis, whether Redis answered); a Redis outage is not an error."""
+        try:
+            return await LevelEngine(redis).load_state(player_id), True
+        except aioredis.RedisError:
+            logger.warning("Level state cache unavailable for player %s", player_id,
+                           exc_info=True)
+            return None, False
+
+    @staticmethod
+    async def fallback(
+        db: AsyncSession, redis: aioredis.Redis, player_id: int, redis_available: bool
+    ) -> dict | None:
+        """The Postgres copy when ``cached`` found nothing; only re-cached if Redis is up."""
+        if redis_available:
+            return await LevelSaveService.reload(db, redis, player_id)
+        return await LevelSaveService.load(db, player_id)
+
+    @staticmethod
+    async def resume(db: AsyncSession, redis: aioredis.Redis, player_id: int) -> dict | None:
+        """Paused state from Redis, else from Postgres (re-cached in Redis)."""
+        state, redis_available = await LevelSaveService.cached(redis, player_id)
+        if state is not None:
+            return state
+        return await LevelSaveService.fallback(db, redis, player_id, redis_available)
+
+    @staticmethod
+    async def reload(db: AsyncSession, redis: aioredis.Redis, player_id: int) -> dict | None:
+        """The Postgres copy of the state, re-cached in Redis; None if there is none."""
+        state = await LevelSaveService.load(db, player_id)
+        if state is not None:
+            try:
+                await LevelEngine(redis).restore_state(player_id, state)
+            except aioredis.RedisError:
+                logger.warning("Could not re-cache level state of player %s", player_id,
+                               exc_info=True)
+        return state
+
+    @staticmethod
+    async def clear(db: AsyncSession, redis: aioredis.Redis, player_id: int) -> None:
+        """Drop the state from Redis and tombstone it in Postgres (the caller commits)."""
+        await LevelEngine(redis).clear_state(player_id)
+        await LevelSaveService._upsert(db, [{
+            "player_id": player_id, "level_id": None, "node_id": None, "choices": {},
+            "saved_at": time.time(),
+        }])
+
+    @staticmethod
+    async def _upsert(db: AsyncSession, rows: list[dict]) -> None:
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(LevelSave)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["player_id"],
+                set_={
+                    "level_id": stmt.excluded.level_id,
+                    "node_id": stmt.excluded.node_id,
+                    "choices": stmt.excluded.choices,
+                    "saved_at": stmt.excluded.saved_at,
+                    "updated_at": func.now(),
+                },
+                # A slower flush must not overwrite a newer pause
+                where=LevelSave.saved_at <= stmt.excluded.saved_at,
+            ),
+            rows,
+        )
+
+    @staticmethod
+    async def _write(db: AsyncSession, states: dict[int, dict]) -> int:
+        # Skip players deleted since they paused; their rows are being purged
+        live = set((await db.execute(
+            select(Player.id).where(Player.id.in_(states), Player.deleted_at.is_(None))
+        )).scalars())
+        rows = [
+            {"player_id": player_id, **state}
+            for player_id, state in states.items() if player_id in live
+        ]
+        if rows:
+            await LevelSaveService._upsert(db, rows)
+        await db.commit()
+        return len(rows)
+
+    @staticmethod
+    async def flush(redis: aioredis.Redis, session_for: SessionFor, max_players: int = 500) -> int:
+        """Persist up to ``max_players`` dirty states; returns the players handled.
+
+        ``session_for`` maps a player ID to its shard's session factory.
+        Members are popped before reading, so a pause landing mid-flush is
+        flushed next time. Players mid-move, and every player of a shard
+        whose write fails, are put back.
+        """
+        members = await redis.spop(DIRTY_KEY, max_players)
+        if not members:
+            return 0
+        player_ids = [int(member) for member in members]
+        states = await LevelEngine(redis).load_states(player_ids)
+
+        by_factory: dict[async_sessionmaker[AsyncSession], dict[int, dict]] = defaultdict(dict)
+        retry: list[int] = []
+        for player_id, state in states.items():
+            try:
+                by_factory[await session_for(player_id)][player_id] = state
+            except PlayerMovingError:
+                retry.append(player_id)
+
+        error: Exception | None = None
+        for factory, shard_states in by_factory.items():
+            try:
+                async with factory() as db:
+                    await LevelSaveService._write(db, shard_states)
+            except Exception as exc:
+                logger.warning(
+                    "Could not persist %d level states", len(shard_states), exc_info=True
+                )
+                retry.extend(shard_states)
+                error = exc
+        if retry:
+            await redis.sadd(DIRTY_KEY, *retry)
+        if error is not None:
+            raise error
+        return len(player_ids) - len(retry)
+
+
+level_save_service = LevelSaveService()
@@ -4,11 +4,13 @@ Simplified: YAML only contains choice→affinity mappings and level metadata.
 Dialogue content is managed by the frontend (YarnSpinner).
 """
 
+import hashlib
+from datetime import datetime, timezone
 from pathlib import Path
 
 import yaml
 
-from app.schemas.level import LevelConfig, ChoiceOption
+from app.schemas.level import LevelConfig, ChoiceOption, LevelSummary
 
 DATA_DIR = Path(__file__).parent.parent / "data" / "levels"
 
@@ -16,6 +18,10 @@ DATA_DIR = Path(__file__).parent.parent / "data" / "levels"
 class LevelService:
     def __init__(self):
         self._cache: dict[str, LevelConfig] = {}
+        # Level files only change on deploy, so the catalog is scanned once per process
+        self._catalog: list[dict] | None = None
+        self._catalog_version = ""
+        self._catalog_modified: datetime | None = None
 
     def load_level(self, level_id: str) -> LevelConfig:
         """Load a level config from its YAML file."""
@@ -55,29 +61,68 @@ class LevelService:
         return node_choices.get(choice_id)
 
     def list_levels(self) -> list[dict]:
-        """List all available levels with basic info."""
+        """List all available levels with basic info (cached; don't mutate the result)."""
+        if self._catalog is None:
+            self._scan_levels()
+        return self._catalog
+
+    def catalog_version(self) -> str:
+        """Hash of every level file's content; changes whenever any level does."""
+        if self._catalog is None:
+            self._scan_levels()
+        return self._catalog_version
+
+    def catalog_modified(self) -> datetime | None:
+        """Newest level file modification time (UTC), or None without levels."""
+        if self._catalog is None:
+            self._scan_levels()
+        return self._catalog_modified
+
+    def clear_cache(self) -> None:
+        """Forget loaded configs and the catalog (e.g. after level files change)."""
+        self._cache.clear()
+        self._catalog = None
+
+    def _scan_levels(self) -> None:
         levels = []
+        digest = hashlib.blake2b(digest_size=16)
+        newest = None
         for file_path in sorted(DATA_DIR.glob("*.yaml")):
-            with open(file_path, "r", encoding="utf-8") as f:
-                raw = yaml.safe_load(f)
+            content = file_path.read_bytes()
+            digest.update(file_path.name.encode() + b"\0" + content)
+            newest = max(newest or 0, file_path.stat().st_mtime)
+            raw = yaml.safe_load(content)
             levels.append({
                 "id": raw["id"],
                 "title": raw["title"],
                 "order": raw["order"],
             })
-        return sorted(levels, key=lambda x: x["order"])
+        self._catalog = sorted(levels, key=lambda x: x["order"])
+        self._catalog_version = digest.hexdigest()
+        self._catalog_modified = (
+            None if newest is None else datetime.fromtimestamp(newest, timezone.utc)
+        )
 
-    def get_next_level_id(self, current_level_id: str) -> str | None:
+    def get_next_level_id(
+        self, current_level_id: str, all_levels: list[dict] | None = None
+    ) -> str | None:
         """Get the next level ID after the given one, or None if it's the last."""
-        all_levels = self.list_levels()
+        if all_levels is None:
+            all_levels = self.list_levels()
         for i, level in enumerate(all_levels):
             if level["id"] == current_level_id and i + 1 < len(all_levels):
                 return all_levels[i + 1]["id"]
         return None
 
-    def get_unlocked_levels(self, max_unlocked: str) -> list[str]:
-        """Get list of all level IDs that are unlocked."""
-        all_levels = self.list_levels()
+    def get_unlocked_levels(
+        self, max_unlocked: str, all_levels: list[dict] | None = None
+    ) -> list[str]:
+        """Get list of all level IDs that are unlocked.
+
+        Pass ``all_levels`` when the caller already has the catalog to avoid a rescan.
+        """
+        if all_levels is None:
+            all_levels = self.list_levels()
         max_order = 0
         for lvl in all_levels:
             if lvl["id"] == max_unlocked:
@@ -85,5 +130,45 @@ class LevelService:
                 break
         return [lvl["id"] for lvl in all_levels if lvl["order"] <= max_order]
 
+    def level_summaries(
+        self, max_unlocked: str, all_levels: list[dict] | None = None
+    ) -> list[LevelSummary]:
+        """The catalog with each level's unlock status for a player."""
+        if all_levels is None:
+            all_levels = self.list_levels()
+        unlocked_ids = set(self.get_unlocked_levels(max_unlocked, all_levels))
+        return [
+            LevelSummary(
+                id=lvl["id"],
+                title=lvl["title"],
+                order=lvl["order"],
+                is_unlocked=lvl["id"] in unlocked_ids,
+            )
+            for lvl in all_levels
+        ]
+
+    def completion_progress(
+        self, level_id: str, max_unlocked: str, all_levels: list[dict] | None = None
+    ) -> tuple[str | None, str, bool]:
+        """Progress after finishing ``level_id``: (next_level_id, max_unlocked, unlocked).
+
+        The next level is only unlocked if the player hasn't already passed it.
+        """
+        if all_levels is None:
+            all_levels = self.list_levels()
+        next_level_id = self.get_next_level_id(level_id, all_levels)
+        if next_level_id and _level_order(next_level_id, all_levels) > _level_order(
+            max_unlocked, all_levels
+        ):
+            return next_level_id, next_level_id, True
+        return next_level_id, max_unlocked, False
+
+
+def _level_order(level_id: str, all_levels: list[dict]) -> int:
+    for lvl in all_levels:
+        if lvl["id"] == level_id:
+            return lvl["order"]
+    return 0
+
 
 level_service = LevelService()
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 from collections.abc import AsyncGenerator
 from app.config import settings
@@ -20,13 +21,26 @@ class LLMService:
     def __init__(self):
         self.model = settings.LLM_MODEL
 
-    def _build_system_prompt(self, character_prompt: str, affinity_score: int, memory_facts: dict) -> str:
+    def _build_system_prompt(
+        self,
+        character_prompt: str,
+        affinity_score: int,
+        memory_facts: dict,
+        recalled_exchanges: list[dict] | None = None,
+    ) -> str:
         """Build system prompt with character personality, affinity context, and memory."""
         memory_section = ""
         if memory_facts:
             facts = "\n".join(f"- {k}: {v}" for k, v in memory_facts.items())
             memory_section = f"\n\n你记得关于玩家的以下信息:\n{facts}"
 
+        recall_section = ""
+        if recalled_exchanges:
+            exchanges = "\n".join(
+                f"- 玩家: {ex['user']}\n  你: {ex['assistant']}" for ex in recalled_exchanges
+            )
+            recall_section = f"\n\n你们以前聊过这些(可自然地提起):\n{exchanges}"
+
         affinity_hint = ""
         if affinity_score < 20:
             affinity_hint = "\n你对玩家还比较陌生，回复保持礼貌但有距离感。"
@@ -37,7 +51,14 @@ class LLMService:
         else:
             affinity_hint = "\n你和玩家关系非常亲密，回复可以展现深层情感。"
 
-        return f"{character_prompt}{affinity_hint}{memory_section}"
+        return f"{character_prompt}{affinity_hint}{memory_section}{recall_section}"
+
+    async def _complete(self, messages: list[dict]):
+        """One non-streaming completion; the SDK call blocks, so it runs in a thread."""
+        Generation = _get_generation()
+        return await asyncio.to_thread(
+            Generation.call, model=self.model, messages=messages, result_format="message"
+        )
 
     async def chat_stream(
         self,
@@ -45,10 +66,11 @@ class LLMService:
         character_prompt: str,
         affinity_score: int = 0,
         memory_facts: dict | None = None,
+        recalled_exchanges: list[dict] | None = None,
     ) -> AsyncGenerator[str, None]:
         """Stream a chat response from the LLM."""
         system_prompt = self._build_system_prompt(
-            character_prompt, affinity_score, memory_facts or {}
+            character_prompt, affinity_score, memory_facts or {}, recalled_exchanges
         )
 
         full_messages = [{"role": "system", "content": system_prompt}] + messages
@@ -86,15 +108,10 @@ class LLMService:
             "只返回数字，不要其他内容。"
         )
 
-        Generation = _get_generation()
-        response = Generation.call(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": eval_prompt},
-                {"role": "user", "content": str(messages[-10:])},  # last 10 turns
-            ],
-            result_format="message",
-        )
+        response = await self._complete([
+            {"role": "system", "content": eval_prompt},
+            {"role": "user", "content": str(messages[-10:])},  # last 10 turns
+        ])
 
         if response.status_code == 200:
             try:
@@ -115,15 +132,10 @@ class LLMService:
             "如果没有新信息，返回空的 {}"
         )
 
-        Generation = _get_generation()
-        response = Generation.call(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": extract_prompt},
-                {"role": "user", "content": str(messages[-10:])},
-            ],
-            result_format="message",
-        )
+        response = await self._complete([
+            {"role": "system", "content": extract_prompt},
+            {"role": "user", "content": str(messages[-10:])},
+        ])
 
         if response.status_code == 200:
             try:
@@ -133,5 +145,23 @@ class LLMService:
                 return {}
         return {}
 
+    async def summarize_episode(self, messages: list[dict]) -> str:
+        """Use LLM to condense one chat episode into a short summary for the archive."""
+        summary_prompt = (
+            "你是一个对话归档模块。用两三句话概括以下玩家与亚德的对话，"
+            "保留话题、玩家透露的信息和情绪变化。只返回概括内容。"
+        )
+
+        response = await self._complete([
+            {"role": "system", "content": summary_prompt},
+            {"role": "user", "content": str(messages[-40:])},
+        ])
+
+        if response.status_code == 200:
+            return response.output.choices[0].message.content.strip()
+        raise RuntimeError(
+            f"LLM API error: {response.status_code} - {response.message}"
+        )
+
 
 llm_service = LLMService()
@@ -1,47 +1,261 @@
-"""Memory service - manages Yade's long-term memory of the player."""
+"""Memory service - manages Yade's long-term memory of the player.
 
-from sqlalchemy import select
+On Postgres, ``memory_facts``/``memory_meta`` are JSONB and updates are
+applied server-side (``memory_facts || :new`` / ``memory_facts - :keys``), so
+each write is a small atomic statement that doesn't depend on the document
+size and concurrent extractions can't clobber each other's keys. Other
+databases (SQLite in tests) fall back to read-merge-write.
+
+Memory is bounded: each fact carries metadata (first seen, last referenced,
+hit count), the store is capped at ``MEMORY_MAX_FACTS`` with the least
+valuable facts evicted, and only the top ``MEMORY_PROMPT_TOP_K`` facts for
+the current message are put into the prompt.
+"""
+
+import math
+import time
+
+from sqlalchemy import Update, cast, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from sqlalchemy.types import Text
 
+from app.config import settings
+from app.db.database import note_player_write
 from app.models.player import Player
 from app.services.llm_service import llm_service
 
+_SECONDS_PER_DAY = 86400
+
+
+# ---------------------------------------------------------------------------
+# Scoring
+# ---------------------------------------------------------------------------
+
+
+def _bigrams(text: str) -> set[str]:
+    """Character bigrams - works for Chinese without a tokenizer."""
+    text = "".join(text.lower().split())
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _recency(meta: dict, now: float) -> float:
+    """1.0 for a fact referenced just now, halving every MEMORY_HALF_LIFE_DAYS."""
+    age_days = max(0.0, now - meta.get("last_ref", 0)) / _SECONDS_PER_DAY
+    return 0.5 ** (age_days / settings.MEMORY_HALF_LIFE_DAYS)
+
+
+def retention_score(meta: dict, now: float) -> float:
+    """How much a fact is worth keeping: frequently and recently used facts score high."""
+    return (1 + math.log1p(meta.get("hits", 0))) * _recency(meta, now)
+
+
+def select_for_prompt(
+    facts: dict, meta: dict, message: str, k: int, now: float | None = None
+) -> dict:
+    """Pick the ``k`` facts most relevant to ``message``.
+
+    Relevance is bigram overlap between the message and the fact's key/value,
+    with retention score as the tie-breaker so a few well-established facts
+    still show up when nothing matches.
+    """
+    if len(facts) <= k:
+        return dict(facts)
+    now = now or time.time()
+    message_grams = _bigrams(message)
+
+    def score(key: str) -> tuple[float, float]:
+        fact_grams = _bigrams(f"{key} {facts[key]}")
+        overlap = len(message_grams & fact_grams) / len(fact_grams) if fact_grams else 0.0
+        return overlap, retention_score(meta.get(key, {}), now)
+
+    top = sorted(facts, key=score, reverse=True)[:k]
+    return {key: facts[key] for key in top}
+
+
+def eviction_candidates(
+    meta: dict, keys: list[str], capacity: int, protected: set[str], now: float | None = None
+) -> list[str]:
+    """Keys to drop so at most ``capacity`` remain, lowest retention score first.
+
+    ``protected`` keys (just learned) are only evicted if they alone exceed capacity.
+    """
+    overflow = len(keys) - capacity
+    if overflow <= 0:
+        return []
+    now = now or time.time()
+    ranked = sorted(
+        keys, key=lambda key: (key in protected, retention_score(meta.get(key, {}), now))
+    )
+    return ranked[:overflow]
+
+
+# ---------------------------------------------------------------------------
+# Server-side statements (Postgres)
+# ---------------------------------------------------------------------------
+
+
+def _player_update(player_id: int, **values) -> Update:
+    return (
+        update(Player)
+        .where(Player.id == player_id)
+        .values(**values)
+        .execution_options(synchronize_session="fetch")
+    )
+
+
+def _merge_stmt(player_id: int, new_facts: dict, new_meta: dict) -> Update:
+    """Merge facts (new values win) and meta (existing entries win, keeping first_seen)."""
+    return _player_update(
+        player_id,
+        memory_facts=Player.memory_facts.op("||")(cast(new_facts, JSONB)),
+        memory_meta=cast(new_meta, JSONB).op("||")(Player.memory_meta),
+    )
+
+
+def _touch_stmt(player_id: int, touched_meta: dict) -> Update:
+    # Bookkeeping only: keep updated_at (and the player's ETag) unchanged
+    return _player_update(
+        player_id,
+        memory_meta=Player.memory_meta.op("||")(cast(touched_meta, JSONB)),
+        updated_at=Player.updated_at,
+    )
+
+
+def _delete_keys_stmt(player_id: int, keys: list[str]) -> Update:
+    """``memory_facts - :keys`` on both the facts and their metadata."""
+    keys_array = cast(keys, ARRAY(Text))
+    return _player_update(
+        player_id,
+        memory_facts=Player.memory_facts.op("-")(keys_array),
+        memory_meta=Player.memory_meta.op("-")(keys_array),
+    )
+
+
+def _is_postgres(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
 
 class MemoryService:
     @staticmethod
     async def get_facts(db: AsyncSession, player_id: int) -> dict:
         """Get all stored memory facts for a player."""
-        result = await db.execute(select(Player).where(Player.id == player_id))
-        player = result.scalar_one()
-        return player.memory_facts or {}
+        result = await db.execute(select(Player.memory_facts).where(Player.id == player_id))
+        return result.scalar_one() or {}
+
+    @staticmethod
+    async def _load_for_update(db: AsyncSession, player_id: int) -> Player:
+        result = await db.execute(
+            select(Player)
+            .where(Player.id == player_id)
+            .options(load_only(Player.memory_facts, Player.memory_meta))
+            .with_for_update()
+        )
+        return result.scalar_one()
+
+    @staticmethod
+    async def update_facts(db: AsyncSession, player_id: int, new_facts: dict) -> None:
+        """Merge new facts into the player's memory (new values win per key).
+
+        Evicts the lowest-scoring facts if the store grows past MEMORY_MAX_FACTS.
+        """
+        if not new_facts:
+            return
+        now = time.time()
+        new_meta = {key: {"first_seen": now, "last_ref": now, "hits": 0} for key in new_facts}
+
+        if _is_postgres(db):
+            await db.execute(_merge_stmt(player_id, new_facts, new_meta))
+            note_player_write(db, player_id)
+            result = await db.execute(
+                select(Player.memory_facts, Player.memory_meta).where(Player.id == player_id)
+            )
+            facts, meta = result.one()
+        else:
+            player = await MemoryService._load_for_update(db, player_id)
+            facts = {**(player.memory_facts or {}), **new_facts}
+            meta = {**new_meta, **(player.memory_meta or {})}
+            player.memory_facts = facts
+            player.memory_meta = meta
+            await db.flush()
+
+        # Every stored fact counts; one without metadata scores as the oldest
+        victims = eviction_candidates(
+            meta or {}, list(facts or {}), settings.MEMORY_MAX_FACTS,
+            protected=set(new_facts), now=now,
+        )
+        await MemoryService.delete_facts(db, player_id, victims)
 
     @staticmethod
-    async def update_facts(db: AsyncSession, player_id: int, new_facts: dict) -> dict:
-        """Merge new facts into the player's memory."""
-        result = await db.execute(select(Player).where(Player.id == player_id))
-        player = result.scalar_one()
-        current = player.memory_facts or {}
-        current.update(new_facts)
-        player.memory_facts = current
+    async def delete_facts(db: AsyncSession, player_id: int, keys: list[str]) -> None:
+        """Remove the given keys (and their metadata); missing keys are ignored."""
+        if not keys:
+            return
+        if _is_postgres(db):
+            await db.execute(_delete_keys_stmt(player_id, list(keys)))
+            note_player_write(db, player_id)
+            return
+
+        drop = set(keys)
+        player = await MemoryService._load_for_update(db, player_id)
+        player.memory_facts = {
+            k: v for k, v in (player.memory_facts or {}).items() if k not in drop
+        }
+        player.memory_meta = {
+            k: v for k, v in (player.memory_meta or {}).items() if k not in drop
+        }
         await db.flush()
-        return current
+
+    @staticmethod
+    async def recall(
+        db: AsyncSession, player_id: int, facts: dict, meta: dict, message: str
+    ) -> dict:
+        """Select the facts to put in the prompt for ``message`` and record the references.
+
+        A fact's reference is recorded at most once per MEMORY_TOUCH_INTERVAL,
+        so chatting about the same things doesn't rewrite the row every message.
+        """
+        selected = select_for_prompt(facts, meta, message, settings.MEMORY_PROMPT_TOP_K)
+        now = time.time()
+        touched = {}
+        for key in selected:
+            entry = dict(meta.get(key) or {"first_seen": now})
+            recorded = entry.get("last_ref", 0)
+            if entry.get("hits") and now - recorded < settings.MEMORY_TOUCH_INTERVAL:
+                continue
+            entry["last_ref"] = now
+            entry["hits"] = entry.get("hits", 0) + 1
+            touched[key] = entry
+        if not touched:
+            return selected
+
+        if _is_postgres(db):
+            await db.execute(_touch_stmt(player_id, touched))
+        else:
+            player = await MemoryService._load_for_update(db, player_id)
+            await db.execute(_player_update(
+                player_id,
+                memory_meta={**(player.memory_meta or {}), **touched},
+                updated_at=Player.updated_at,
+            ))
+        return selected
 
     @staticmethod
     async def extract_and_save(
         db: AsyncSession, player_id: int, messages: list[dict]
     ) -> dict:
-        """Extract memory facts from a chat session and persist them."""
-        result = await db.execute(select(Player).where(Player.id == player_id))
-        player = result.scalar_one()
-        existing = player.memory_facts or {}
+        """Extract memory facts from a chat session and persist them.
 
+        Returns only the newly extracted facts.
+        """
+        existing = await MemoryService.get_facts(db, player_id)
         new_facts = await llm_service.extract_memory_facts(messages, existing)
         if new_facts:
-            existing.update(new_facts)
-            player.memory_facts = existing
-            await db.flush()
-
-        return existing
+            await MemoryService.update_facts(db, player_id, new_facts)
+        return new_facts
 
 
 memory_service = MemoryService()
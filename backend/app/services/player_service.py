@@ -0,0 +1,48 @@
+"""Player service - projection-aware player loading.
+
+Most endpoints only need a couple of score/progress columns, so loaders take
+the columns to fetch instead of always pulling the whole row (including the
+unbounded ``memory_facts`` JSON and ``bio``).
+"""
+
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+
+from app.models.player import Player
+
+# Column sets for the hot read paths
+PROGRESS_COLUMNS = (Player.current_level_id, Player.max_unlocked_level, Player.affinity_score)
+AFFINITY_COLUMNS = (Player.affinity_score,)
+
+
+class PlayerService:
+    @staticmethod
+    async def load(
+        db: AsyncSession, player_id: int, *columns: InstrumentedAttribute
+    ) -> Player | None:
+        """Load a Player entity, or None (also for tombstoned players).
+
+        With ``columns``, only those attributes (plus the primary key) are
+        fetched; the rest stay unloaded and must not be read. Assigning to a
+        loaded attribute and flushing still issues a normal UPDATE.
+        """
+        stmt = select(Player).where(Player.id == player_id, Player.deleted_at.is_(None))
+        if columns:
+            stmt = stmt.options(load_only(*columns))
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def load_columns(
+        db: AsyncSession, player_id: int, *columns: InstrumentedAttribute
+    ) -> Row | None:
+        """Fetch just ``columns`` for a player as a plain Row (no ORM entity), or None."""
+        result = await db.execute(
+            select(*columns).where(Player.id == player_id, Player.deleted_at.is_(None))
+        )
+        return result.one_or_none()
+
+
+player_service = PlayerService()
@@ -0,0 +1,103 @@
+"""Reply buffer - chat reply chunks kept in a short-lived Redis Stream for resuming.
+
+While a reply streams, every chunk is appended to
+``chat:reply:{player_id}:{reply_id}`` with entry ID ``0-<n>`` (n = 1-based
+chunk index), so "everything after offset n" is a plain XRANGE. A final
+entry marks the reply done (or failed). A client that lost its connection
+sends ``resume {reply_id, offset}`` and is served from the buffer - or
+tails it while the reply is still being generated - without a new LLM
+call. Buffers expire CHAT_REPLY_BUFFER_TTL seconds after their last write.
+
+Buffering is best-effort: if Redis fails, the reply still streams live,
+it just can't be resumed.
+"""
+
+import logging
+import time
+from collections.abc import AsyncIterator
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_CHUNK = "c"
+_DONE = "done"
+_FAILED = "failed"
+
+
+class ReplyUnavailable(Exception):
+    """The reply can't be resumed (expired, unknown, failed or abandoned); resend the message."""
+
+
+def reply_key(player_id: int, reply_id: str) -> str:
+    return f"chat:reply:{player_id}:{reply_id}"
+
+
+def _entry_id(index: int) -> str:
+    return f"0-{index}"
+
+
+class ReplyBuffer:
+    """Writer side: appends one reply's chunks as they are generated."""
+
+    def __init__(self, redis: aioredis.Redis, player_id: int, reply_id: str):
+        self.redis = redis
+        self.key = reply_key(player_id, reply_id)
+        self.count = 0
+        self.enabled = True
+
+    async def _add(self, fields: dict) -> None:
+        if not self.enabled:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.xadd(self.key, fields, id=_entry_id(self.count + 1))
+                pipe.expire(self.key, settings.CHAT_REPLY_BUFFER_TTL)
+                await pipe.execute()
+            self.count += 1
+        except aioredis.RedisError:
+            logger.warning("Reply buffer %s unavailable; reply won't be resumable", self.key,
+                           exc_info=True)
+            self.enabled = False
+
+    async def append(self, chunk: str) -> None:
+        await self._add({_CHUNK: chunk})
+
+    async def finish(self, failed: bool = False) -> None:
+        await self._add({_FAILED if failed else _DONE: "1"})
+
+
+async def read_reply(
+    redis: aioredis.Redis, player_id: int, reply_id: str, offset: int
+) -> AsyncIterator[str]:
+    """Yield the reply's chunks after the first ``offset``, until it is done.
+
+    Waits for new chunks while the reply is still being generated; raises
+    ReplyUnavailable if the buffer is missing, the reply failed, or nothing
+    new arrives for CHAT_REPLY_RESUME_IDLE_TIMEOUT seconds (its generator died).
+    """
+    key = reply_key(player_id, reply_id)
+    if not await redis.exists(key):
+        raise ReplyUnavailable("Reply expired, please resend")
+
+    last_id = _entry_id(offset)
+    entries = await redis.xrange(key, min=_entry_id(offset + 1))
+    idle_deadline = time.monotonic() + settings.CHAT_REPLY_RESUME_IDLE_TIMEOUT
+    while True:
+        for entry_id, fields in entries:
+            if _CHUNK in fields:
+                yield fields[_CHUNK]
+            elif _DONE in fields:
+                return
+            else:
+                raise ReplyUnavailable("Reply failed, please resend")
+            last_id = entry_id
+        if entries:
+            idle_deadline = time.monotonic() + settings.CHAT_REPLY_RESUME_IDLE_TIMEOUT
+        remaining = idle_deadline - time.monotonic()
+        if remaining <= 0:
+            raise ReplyUnavailable("Reply interrupted, please resend")
+        result = await redis.xread({key: last_id}, block=max(1, int(min(remaining, 5) * 1000)))
+        entries = result[0][1] if result else []
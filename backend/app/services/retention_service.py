@@ -0,0 +1,177 @@
+"""Retention service - batched, resumable purges of old ledger and chat rows.
+
+Each policy deletes rows older than its cutoff in small batches ordered by
+``(age column, id)``. Every batch is its own short transaction that also
+advances a ``JobCheckpoint``, so locks are held only briefly and an
+interrupted purge resumes where it stopped (with the same cutoff, unless
+the policy has since been lengthened).
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.core.clock import utcnow
+from app.db.partitions import PARENT_TABLE as PARTITIONED_TABLE, drop_partitions_before
+from app.models.affinity import AffinityRecord
+from app.models.chat_archive import ChatArchive, ChatEpisode
+from app.models.chat_history import ChatMessage
+from app.models.job_checkpoint import JobCheckpoint
+from app.models.level import LevelChoice
+from app.services.embedding_service import embedding_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    table: str
+    model: type
+    days: int  # 0 disables the policy
+    age_column: str = "created_at"  # rows expire when this timestamp passes the cutoff
+
+    @property
+    def checkpoint_name(self) -> str:
+        return f"retention:{self.table}"
+
+    @property
+    def age(self):
+        return getattr(self.model, self.age_column)
+
+
+def retention_policies() -> list[RetentionPolicy]:
+    """Policies from settings, in purge order."""
+    return [
+        RetentionPolicy("chat_messages", ChatMessage, settings.RETENTION_CHAT_MESSAGES_DAYS),
+        RetentionPolicy(
+            "affinity_records", AffinityRecord, settings.RETENTION_AFFINITY_RECORDS_DAYS
+        ),
+        RetentionPolicy("level_choices", LevelChoice, settings.RETENTION_LEVEL_CHOICES_DAYS),
+        # Archives before their episodes (archives reference episode_id); aged by conversation
+        RetentionPolicy(
+            "chat_archives", ChatArchive, settings.RETENTION_CHAT_ARCHIVES_DAYS, "ended_at"
+        ),
+        RetentionPolicy(
+            "chat_episodes", ChatEpisode, settings.RETENTION_CHAT_EPISODES_DAYS, "ended_at"
+        ),
+    ]
+
+
+class RetentionService:
+    @staticmethod
+    async def count_expired(db: AsyncSession, policy: RetentionPolicy, cutoff: datetime) -> int:
+        """Rows a purge with ``cutoff`` would remove (dry run)."""
+        return await db.scalar(
+            select(func.count()).select_from(policy.model).where(policy.age < cutoff)
+        )
+
+    @staticmethod
+    async def purge(
+        session_factory: async_sessionmaker[AsyncSession],
+        policy: RetentionPolicy,
+        batch_size: int | None = None,
+        pause: float | None = None,
+        max_batches: int | None = None,
+    ) -> dict:
+        """Delete expired rows for one policy in keyset-ordered batches.
+
+        Resumes from an existing checkpoint. ``max_batches`` bounds a single
+        call (the checkpoint is kept, so the next call continues).
+        """
+        batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+        pause = settings.RETENTION_BATCH_PAUSE_MS / 1000 if pause is None else pause
+        model, age = policy.model, policy.age
+        policy_cutoff = utcnow() - timedelta(days=policy.days)
+
+        async with session_factory() as db:
+            checkpoint = await db.get(JobCheckpoint, policy.checkpoint_name)
+            if checkpoint is None:
+                checkpoint = JobCheckpoint(
+                    name=policy.checkpoint_name,
+                    cutoff=policy_cutoff,
+                    last_id=0,
+                    processed=0,
+                )
+                db.add(checkpoint)
+                await db.commit()
+            elif policy_cutoff < checkpoint.cutoff:
+                # Retention was lengthened since the run started: rows the policy now
+                # keeps must not go. Rows behind the position are already deleted.
+                checkpoint.cutoff = policy_cutoff
+                await db.commit()
+            cutoff = checkpoint.cutoff
+            position = (checkpoint.last_created_at, checkpoint.last_id)
+            deleted_total = checkpoint.processed
+
+            if policy.table == PARTITIONED_TABLE:
+                # Whole months go as partition drops; batches only trim the boundary month
+                await drop_partitions_before(db.bind, cutoff)
+
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            async with session_factory() as db:
+                stmt = select(age.label("aged_at"), model.id).where(age < cutoff)
+                if position[0] is not None:
+                    stmt = stmt.where(tuple_(age, model.id) > position)
+                result = await db.execute(stmt.order_by(age, model.id).limit(batch_size))
+                rows = result.all()
+                if not rows:
+                    await db.execute(
+                        delete(JobCheckpoint).where(JobCheckpoint.name == policy.checkpoint_name)
+                    )
+                    await db.commit()
+                    result = {"table": policy.table, "deleted": deleted_total, "complete": True}
+                    if model is ChatMessage:
+                        # Recall must not keep vectors of messages that no longer exist
+                        result["embeddings_pruned"] = await embedding_service.prune_all(
+                            session_factory
+                        )
+                    return result
+
+                await db.execute(delete(model).where(
+                    age < cutoff, model.id.in_([row.id for row in rows])
+                ))
+                position = (rows[-1].aged_at, rows[-1].id)
+                deleted_total += len(rows)
+                checkpoint = await db.get(JobCheckpoint, policy.checkpoint_name)
+                checkpoint.last_created_at, checkpoint.last_id = position
+                checkpoint.processed = deleted_total
+                await db.commit()
+
+            batches += 1
+            if pause:
+                await asyncio.sleep(pause)
+
+        return {"table": policy.table, "deleted": deleted_total, "complete": False}
+
+    @staticmethod
+    async def run(
+        session_factory: async_sessionmaker[AsyncSession],
+        tables: list[str] | None = None,
+        dry_run: bool = False,
+        **purge_options,
+    ) -> list[dict]:
+        """Apply every enabled policy (optionally only ``tables``)."""
+        results = []
+        for policy in retention_policies():
+            if policy.days <= 0 or (tables and policy.table not in tables):
+                continue
+            if dry_run:
+                cutoff = utcnow() - timedelta(days=policy.days)
+                async with session_factory() as db:
+                    count = await RetentionService.count_expired(db, policy, cutoff)
+                results.append({"table": policy.table, "would_delete": count,
+                                "cutoff": cutoff.isoformat()})
+                continue
+            result = await RetentionService.purge(session_factory, policy, **purge_options)
+            logger.info("Retention purge %s", result)
+            results.append(result)
+        return results
+
+
+retention_service = RetentionService()
@@ -0,0 +1,73 @@
+"""Microbenchmark: stdlib json vs orjson for the payloads the API sends.
+
+Usage (from backend/):
+    python -m benchmarks.json_serialization
+    python -m benchmarks.json_serialization --number 50000
+
+Prints microseconds per operation for each backend and the saving per
+response/frame. REST routes with a response model are serialized by
+Pydantic and are not affected by JSON_BACKEND; the "player_state" case is
+what routes without one (and Redis/NDJSON payloads) pay.
+"""
+
+import argparse
+import json
+import timeit
+from datetime import datetime
+
+from app.core import serialization
+
+CHUNK = "今天的风好舒服呀，我们去河边走走吧？"
+
+PAYLOADS = {
+    "player_state": {
+        "id": 42, "name": "Player", "nickname": "小明", "current_level_id": "chapter_02",
+        "max_unlocked_level": "chapter_03", "affinity_score": 57, "affinity_tier": "朋友",
+        "memory_facts": {f"fact_{i}": f"记住的事情 {i}" for i in range(32)},
+        "bio": None, "created_at": datetime(2026, 1, 1, 12), "updated_at": datetime(2026, 2, 1),
+    },
+    "chat_context": [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": CHUNK * 3} for i in range(40)
+    ],
+}
+
+
+def _bench(label: str, number: int, stdlib_fn, fast_fn) -> None:
+    slow = timeit.timeit(stdlib_fn, number=number) / number * 1e6
+    fast = timeit.timeit(fast_fn, number=number) / number * 1e6
+    print(f"{label:<28} stdlib {slow:8.2f} us   {serialization.BACKEND} {fast:8.2f} us   "
+          f"saved {slow - fast:7.2f} us ({slow / fast:4.1f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare JSON backends on API payloads.")
+    parser.add_argument("--number", type=int, default=20000, help="iterations per case")
+    args = parser.parse_args()
+
+    _, stdlib_dumps, stdlib_loads = serialization._select("stdlib")
+    dumps, loads = serialization.dumps, serialization.loads
+    print(f"selected backend: {serialization.BACKEND}")
+
+    # The chat frames as chat_ws used to build them vs the precompiled encoder
+    _bench(
+        "chunk frame",
+        args.number,
+        lambda: json.dumps({"type": "chunk", "content": CHUNK}, ensure_ascii=False),
+        lambda: serialization.chunk_frame(CHUNK),
+    )
+    _bench(
+        "incoming message",
+        args.number,
+        lambda: json.loads('{"type": "message", "content": "%s"}' % CHUNK),
+        lambda: loads('{"type": "message", "content": "%s"}' % CHUNK),
+    )
+    for name, payload in PAYLOADS.items():
+        encoded = stdlib_dumps(payload)
+        _bench(f"{name} dumps", args.number, lambda p=payload: stdlib_dumps(p),
+               lambda p=payload: dumps(p))
+        _bench(f"{name} loads", args.number, lambda e=encoded: stdlib_loads(e),
+               lambda e=encoded: loads(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,16 @@ import pytest
 from httpx import ASGITransport, AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
-from app.db.database import Base, get_db
+from app.config import settings
+from app.db.database import (
+    Base,
+    get_global_db,
+    get_new_player_db,
+    get_player_db,
+    get_read_db,
+    get_sessionmaker,
+)
+from app.db.redis import get_redis
 
 # In-memory SQLite for tests (no Docker needed)
 TEST_DATABASE_URL = "sqlite+aiosqlite:///file::memory:?cache=shared&uri=true"
@@ -38,6 +47,12 @@ async def setup_db():
         await conn.run_sync(Base.metadata.drop_all)
 
 
+@pytest.fixture(autouse=True)
+def no_rate_limits(monkeypatch):
+    """Rate limiting is off by default; tests/test_rate_limit.py turns it on."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+
+
 @pytest.fixture
 async def db():
     """Direct async DB session for service-level tests."""
@@ -47,12 +62,34 @@ async def db():
 
 
 @pytest.fixture
-async def client():
-    """Async HTTP test client with test DB override."""
+def session_factory():
+    """Session factory for code that manages its own transactions (jobs, batch purges)."""
+    return test_session_factory
+
+
+@pytest.fixture
+async def client(redis):
+    """Async HTTP test client with test DB and in-memory Redis overrides."""
     from app.main import app
 
-    app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_player_db] = _override_get_db
+    app.dependency_overrides[get_global_db] = _override_get_db
+    app.dependency_overrides[get_new_player_db] = _override_get_db
+    app.dependency_overrides[get_read_db] = _override_get_db
+    app.dependency_overrides[get_sessionmaker] = lambda: test_session_factory
+    app.dependency_overrides[get_redis] = lambda: redis
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def redis():
+    """In-memory Redis stand-in for services that keep state in Redis."""
+    import fakeredis
+
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    yield client
+    await client.flushall()
+    await client.aclose()
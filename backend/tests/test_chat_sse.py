@@ -0,0 +1,127 @@
+"""Tests for the SSE chat endpoint and idle-session evaluation."""
+
+import asyncio
+import time
+
+import pytest
+
+from app.api.routes import chat as chat_routes
+from app.config import settings
+from app.core.rate_limit import rate_limiter
+from app.core.serialization import loads
+from app.services import chat_service as chat_module
+from app.services import chat_session_service as session_module
+from app.services.chat_session_service import IDLE_KEY, chat_session_service
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    async def chat_stream(messages, **kwargs):
+        for chunk in ("你", "好", "呀"):
+            yield chunk
+
+    monkeypatch.setattr(chat_module.llm_service, "chat_stream", chat_stream)
+
+
+@pytest.fixture
+async def player_id(client):
+    resp = await client.post("/api/player/", json={"name": "Streamer"})
+    return resp.json()["id"]
+
+
+def _events(body: str) -> list[dict]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append({**fields, "data": loads(fields["data"])})
+    return events
+
+
+async def test_stream_reply_persists_and_resumes(client, redis, player_id, fake_llm):
+    resp = await client.post(f"/api/chat/stream/{player_id}", json={"content": "hi"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = _events(resp.text)
+    reply_id = events[0]["data"]["reply_id"]
+    assert [e["event"] for e in events] == ["start", "chunk", "chunk", "chunk", "end"]
+    assert events[2] == {"id": f"{reply_id}:2", "event": "chunk", "data": {"content": "好"}}
+
+    await asyncio.gather(*chat_routes._generations)
+    history = (await client.get(f"/api/chat/history/{player_id}")).json()["messages"]
+    assert [m["content"] for m in history] == ["hi", "你好呀"]
+    assert await redis.zscore(IDLE_KEY, str(player_id)) is not None
+
+    resp = await client.post(
+        f"/api/chat/stream/{player_id}", headers={"Last-Event-ID": f"{reply_id}:1"}
+    )
+    events = _events(resp.text)
+    assert [e.get("id") for e in events] == [f"{reply_id}:2", f"{reply_id}:3", None]
+    assert events[-1]["event"] == "end"
+
+    resp = await client.post(f"/api/chat/stream/{player_id}", headers={"Last-Event-ID": "x:1"})
+    assert _events(resp.text)[0]["event"] == "error"
+
+
+async def test_stream_rejects_bad_requests(client, player_id):
+    resp = await client.post(f"/api/chat/stream/{player_id}", json={"content": "  "})
+    assert resp.status_code == 400
+    resp = await client.post("/api/chat/stream/999", json={"content": "hi"})
+    assert resp.status_code == 404
+    resp = await client.post(f"/api/chat/stream/{player_id}", headers={"Last-Event-ID": "nope"})
+    assert resp.status_code == 400
+
+
+async def test_idle_sessions_are_evaluated_once(
+    client, redis, player_id, session_factory, fake_llm, monkeypatch
+):
+    evaluated = []
+
+    async def evaluate(context, character_prompt):
+        evaluated.append(len(context))
+        return 2
+
+    async def extract(db, pid, context):
+        return []
+
+    monkeypatch.setattr(session_module.llm_service, "evaluate_chat_affinity", evaluate)
+    monkeypatch.setattr(session_module.memory_service, "extract_and_save", extract)
+
+    async def session_for(pid):
+        return session_factory
+
+    await client.post(f"/api/chat/stream/{player_id}", json={"content": "hi"})
+    await asyncio.gather(*chat_routes._generations)
+    # Not idle long enough yet
+    assert await chat_session_service.evaluate_idle(redis, session_for) == 0
+
+    await redis.zadd(IDLE_KEY, {str(player_id): time.time() - 3600})
+    assert await chat_session_service.evaluate_idle(redis, session_for) == 1
+    assert evaluated == [2]
+    assert await chat_session_service.evaluate_idle(redis, session_for) == 0
+
+    player = (await client.get(f"/api/player/{player_id}")).json()
+    assert player["affinity_score"] == 2
+
+
+async def test_idle_sweep_stops_when_llm_budget_runs_out(
+    client, redis, player_id, session_factory, fake_llm, monkeypatch
+):
+    async def evaluate(context, character_prompt):
+        raise AssertionError("over budget, must not call the LLM")
+
+    monkeypatch.setattr(session_module.llm_service, "evaluate_chat_affinity", evaluate)
+
+    async def session_for(pid):
+        return session_factory
+
+    await client.post(f"/api/chat/stream/{player_id}", json={"content": "hi"})
+    await asyncio.gather(*chat_routes._generations)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_TOKEN_BUDGET_PER_MINUTE", 100)
+    monkeypatch.setattr(settings, "LLM_TOKENS_PER_EVALUATION_ESTIMATE", 1000)
+    rate_limiter.clear_leases()
+    idle_since = time.time() - 3600
+    await redis.zadd(IDLE_KEY, {str(player_id): idle_since})
+    assert await chat_session_service.evaluate_idle(redis, session_for) == 0
+    # Still due, for a later sweep
+    assert await redis.zscore(IDLE_KEY, str(player_id)) == pytest.approx(idle_since)
@@ -0,0 +1,99 @@
+"""Tests for the choice counters, their snapshots and the stats endpoint."""
+
+import pytest
+
+from app.config import settings
+from app.models.choice_stats import ChoiceStat
+from app.models.level import LevelChoice
+from app.models.player import Player
+from app.services.choice_stats_service import DIRTY_KEY, choice_stats_service, counter_key
+
+ADMIN = {"X-Admin-Token": "s3cret"}
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+
+
+async def _choose(client, player_id, node_id, choice_id):
+    body = {"level_id": "chapter_01", "node_id": node_id, "choice_id": choice_id}
+    resp = await client.post("/api/levels/choice", params={"player_id": player_id}, json=body)
+    assert resp.status_code == 200
+
+
+async def test_choices_feed_counters_and_stats(client, redis):
+    player_id = (await client.post("/api/player/", json={"name": "A"})).json()["id"]
+    for choice_id in ("A", "A", "C"):
+        # One playthrough per choice
+        await _choose(client, player_id, "choice_1", choice_id)
+        resp = await client.post("/api/levels/complete", params={"player_id": player_id},
+                                 json={"level_id": "chapter_01"})
+        assert resp.status_code == 200
+
+    assert await redis.hgetall(counter_key("chapter_01", "choice_1")) == {"A": "2", "C": "1"}
+
+    resp = await client.get("/api/admin/levels/chapter_01/choice-stats", headers=ADMIN)
+    assert resp.status_code == 200
+    node = next(n for n in resp.json()["nodes"] if n["node_id"] == "choice_1")
+    assert node["total"] == 3
+    shares = {o["choice_id"]: (o["count"], round(o["share"], 2)) for o in node["options"]}
+    assert shares == {"A": (2, 0.67), "B": (0, 0.0), "C": (1, 0.33)}
+    assert node["affinity_distribution"] == {"-1": 1, "0": 0, "1": 2}
+
+
+async def test_flush_adds_pending_increments(db, redis):
+    await choice_stats_service.record(redis, "chapter_01", "choice_1", "B")
+    await choice_stats_service.record(redis, "chapter_01", "choice_1", "B")
+
+    assert await choice_stats_service.flush(db, redis) == 1
+    assert await redis.scard(DIRTY_KEY) == 0
+    assert await redis.exists(counter_key("chapter_01", "choice_1")) == 0
+    assert await choice_stats_service.snapshot_counts(db, "chapter_01") == {
+        "choice_1": {"B": 2}
+    }
+
+    # Flushed counts are added to the total, so losing Redis loses nothing flushed
+    await redis.flushdb()
+    await choice_stats_service.record(redis, "chapter_01", "choice_1", "B")
+    await choice_stats_service.flush(db, redis)
+    stat = await db.get(ChoiceStat, ("chapter_01", "choice_1", "B"))
+    await db.refresh(stat)
+    assert stat.count == 3
+
+
+async def test_backfill_recounts_from_level_choices(db, session_factory, redis):
+    player = Player(name="Old")
+    db.add(player)
+    await db.flush()
+    db.add_all([
+        LevelChoice(player_id=player.id, level_id="chapter_01", node_id="choice_2",
+                    choice_id=choice_id)
+        for choice_id in ("A", "A", "A", "B", "B")
+    ])
+    await db.commit()
+    # Stale total and stale pending increments
+    db.add(ChoiceStat(level_id="chapter_01", node_id="choice_2", choice_id="A", count=99))
+    await db.commit()
+    await redis.hset(counter_key("chapter_01", "choice_2"), "A", 7)
+
+    assert await choice_stats_service.backfill([session_factory], redis, chunk_size=2) == 5
+    assert await redis.hgetall(counter_key("chapter_01", "choice_2")) == {"A": "3", "B": "2"}
+    assert await redis.sismember(DIRTY_KEY, "chapter_01:choice_2")
+
+    await choice_stats_service.flush(db, redis)
+    db.expire_all()
+    assert await choice_stats_service.snapshot_counts(db, "chapter_01") == {
+        "choice_2": {"A": 3, "B": 2}
+    }
+
+
+async def test_stats_add_pending_counts_to_snapshot(client, db, redis):
+    db.add(ChoiceStat(level_id="chapter_01", node_id="choice_1", choice_id="A", count=5))
+    await db.commit()
+    await choice_stats_service.record(redis, "chapter_01", "choice_1", "A")
+    await choice_stats_service.record(redis, "chapter_01", "choice_1", "B")
+
+    resp = await client.get("/api/admin/levels/chapter_01/choice-stats", headers=ADMIN)
+    node = next(n for n in resp.json()["nodes"] if n["node_id"] == "choice_1")
+    assert {o["choice_id"]: o["count"] for o in node["options"]} == {"A": 6, "B": 1, "C": 0}
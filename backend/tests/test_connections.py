@@ -0,0 +1,102 @@
+"""Tests for the chat connection registry and cross-node delivery."""
+
+import asyncio
+
+import pytest
+from starlette.websockets import WebSocketState
+
+from app.api.websocket.connections import (
+    REPLACED_CLOSE_CODE,
+    ConnectionHub,
+    connection_key,
+)
+from app.config import settings
+
+
+class FakeSocket:
+    def __init__(self):
+        self.application_state = WebSocketState.CONNECTED
+        self.sent: list[str] = []
+        self.close_code: int | None = None
+
+    async def send_text(self, frame: str) -> None:
+        self.sent.append(frame)
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        self.close_code = code
+        self.application_state = WebSocketState.DISCONNECTED
+
+
+@pytest.fixture
+async def nodes(redis):
+    hubs = [ConnectionHub("node-a"), ConnectionHub("node-b")]
+    for hub in hubs:
+        hub.start(redis)
+    await asyncio.sleep(0.05)  # let the subscriptions land
+    yield hubs
+    for hub in hubs:
+        await hub.stop()
+
+
+async def _eventually(predicate):
+    for _ in range(100):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met")
+
+
+async def test_send_reaches_socket_on_other_node(nodes, redis):
+    node_a, node_b = nodes
+    sock = FakeSocket()
+    await node_b.register(redis, 7, sock)
+    assert (await redis.get(connection_key(7))).startswith("node-b|")
+    assert await redis.ttl(connection_key(7)) == settings.WS_REGISTRY_TTL
+
+    assert await node_a.send(redis, 7, '{"type":"notice"}')
+    await _eventually(lambda: sock.sent == ['{"type":"notice"}'])
+    assert not await node_a.send(redis, 8, "{}")
+
+
+async def test_reconnect_elsewhere_replaces_old_connection(nodes, redis):
+    node_a, node_b = nodes
+    old, new = FakeSocket(), FakeSocket()
+    old_conn = await node_a.register(redis, 7, old)
+    new_conn = await node_b.register(redis, 7, new)
+
+    await _eventually(lambda: old.close_code == REPLACED_CLOSE_CODE)
+    assert old.sent == ['{"type":"replaced"}']
+    assert node_a.local_count == 0
+
+    # The old socket's late disconnect must not drop the new entry
+    await node_a.unregister(redis, 7, old_conn)
+    assert (await redis.get(connection_key(7))).endswith(new_conn)
+    await node_b.unregister(redis, 7, new_conn)
+    assert await redis.get(connection_key(7)) is None
+
+
+async def test_reconnect_on_same_node(redis):
+    hub = ConnectionHub("solo")
+    old, new = FakeSocket(), FakeSocket()
+    await hub.register(redis, 3, old)
+    await hub.register(redis, 3, new)
+    assert old.close_code == REPLACED_CLOSE_CODE
+    assert await hub.send(redis, 3, "hi")
+    assert new.sent == ["hi"]
+
+
+async def test_admin_notice_endpoint(client, redis, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    from app.api.websocket.connections import connection_hub
+
+    sock = FakeSocket()
+    conn_id = await connection_hub.register(redis, 5, sock)
+    try:
+        resp = await client.post(
+            "/api/admin/players/5/notice", json={"content": "维护通知"},
+            headers={"X-Admin-Token": "s3cret"},
+        )
+        assert resp.json() == {"delivered": True}
+        assert sock.sent == ['{"type":"notice","content":"维护通知"}']
+    finally:
+        await connection_hub.unregister(redis, 5, conn_id)
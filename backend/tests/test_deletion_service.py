@@ -0,0 +1,94 @@
+"""Tests for tombstoned player deletion and the batched purge sweep."""
+
+from sqlalchemy import func, select
+
+from app.models.affinity import AffinityRecord
+from app.models.chat_history import ChatMessage
+from app.models.player import Player
+from app.services.deletion_service import deletion_service
+
+
+async def _player_with_history(db, messages: int = 5) -> int:
+    player = Player(name="Heavy")
+    db.add(player)
+    await db.flush()
+    db.add_all(
+        [ChatMessage(player_id=player.id, role="user", content=f"m{i}") for i in range(messages)]
+        + [AffinityRecord(player_id=player.id, delta=1, source="chat")]
+    )
+    await db.commit()
+    return player.id
+
+
+async def _count(db, model, player_id: int) -> int:
+    column = model.id if model is Player else model.player_id
+    return await db.scalar(select(func.count()).select_from(model).where(column == player_id))
+
+
+async def test_delete_route_tombstones_without_removing_rows(client, db):
+    player_id = await _player_with_history(db)
+
+    resp = await client.delete(f"/api/player/{player_id}")
+    assert resp.status_code == 204
+    assert (await client.get(f"/api/player/{player_id}")).status_code == 404
+    assert (await client.delete(f"/api/player/{player_id}")).status_code == 404
+
+    # Rows are still there until the sweep runs
+    assert await _count(db, ChatMessage, player_id) == 5
+    player = await db.get(Player, player_id)
+    assert player.deleted_at is not None
+
+
+async def test_sweep_purges_rows_and_redis_in_batches(db, session_factory, redis):
+    doomed = await _player_with_history(db, messages=7)
+    kept = await _player_with_history(db, messages=2)
+    await deletion_service.tombstone(db, doomed)
+    await db.commit()
+    await redis.set(f"chat:context:{doomed}", "[]")
+    await redis.set(f"level:state:{doomed}", "{}")
+    await redis.set(f"chat:context:{kept}", "[]")
+
+    purged = await deletion_service.run(session_factory, redis, batch_size=3, pause=0)
+    assert purged == [doomed]
+
+    assert await _count(db, Player, doomed) == 0
+    assert await _count(db, ChatMessage, doomed) == 0
+    assert await _count(db, AffinityRecord, doomed) == 0
+    assert await _count(db, ChatMessage, kept) == 2
+    assert await redis.exists(f"chat:context:{doomed}", f"level:state:{doomed}") == 0
+    assert await redis.exists(f"chat:context:{kept}") == 1
+
+    # Nothing left to sweep
+    assert await deletion_service.run(session_factory, redis) == []
+
+
+
+async def test_purge_redis_covers_every_registered_key(redis):
+    from app.core.level_engine import DIRTY_KEY
+    from app.services.chat_session_service import IDLE_KEY
+
+    def keys_of(pid: int) -> list[str]:
+        return [
+            f"chat:context:{pid}", f"level:state:{pid}", f"db:last_write:{pid}",
+            f"ws:conn:{pid}", f"ratelimit:chat:{pid}", f"ratelimit:read:{pid}",
+            f"chat:reply:{pid}:abc", f"idem:choice:{pid}:key-1",
+        ]
+
+    doomed, kept = 1, 11
+    for pid in (doomed, kept):
+        for key in keys_of(pid):
+            await redis.set(key, "x")
+        await redis.sadd(DIRTY_KEY, pid)
+        await redis.zadd(IDLE_KEY, {str(pid): 1.0})
+    # Request keys may contain colons; another player's key must survive
+    await redis.set(f"idem:choice:{kept}:chapter_01:{doomed}:a", "x")
+
+    await deletion_service.purge_redis(redis, doomed)
+
+    assert await redis.exists(*keys_of(doomed)) == 0
+    assert await redis.sismember(DIRTY_KEY, doomed) == 0
+    assert await redis.zscore(IDLE_KEY, str(doomed)) is None
+
+    assert await redis.exists(*keys_of(kept), f"idem:choice:{kept}:chapter_01:{doomed}:a") == 9
+    assert await redis.sismember(DIRTY_KEY, kept) == 1
+    assert await redis.zscore(IDLE_KEY, str(kept)) == 1.0
@@ -0,0 +1,78 @@
+"""Tests for the embedding service - hashed n-gram vectors and chat recall."""
+
+import numpy as np
+import pytest
+from sqlalchemy import delete
+
+from app.models.chat_history import ChatMessage
+from app.models.player import Player
+from app.services import embedding_service as embedding_module
+from app.services.embedding_service import embed_text, embedding_service
+
+
+def test_embed_text_is_normalised_and_stable():
+    vec = embed_text("我家的猫叫小白")
+    assert vec.shape == (embedding_module.settings.EMBEDDING_DIM,)
+    assert np.isclose(np.linalg.norm(vec), 1.0)
+    assert np.array_equal(vec, embed_text("我家的猫叫小白"))
+    assert not embed_text("").any()
+
+
+def test_similar_text_scores_higher():
+    query = embed_text("小白最近怎么样")
+    related = embed_text("我家的猫叫小白")
+    unrelated = embed_text("明天要去市场买菜")
+    assert query @ related > query @ unrelated
+
+
+@pytest.fixture
+async def chatty_player(db):
+    player = Player(name="Chatty")
+    db.add(player)
+    await db.flush()
+    exchanges = [
+        ("我家的猫叫小白", "小白这个名字真可爱！"),
+        ("明天要去市场买菜", "记得带上篮子哦。"),
+        ("我喜欢下雨天", "下雨天很适合看书。"),
+    ]
+    for user_text, reply_text in exchanges:
+        user_msg = ChatMessage(player_id=player.id, role="user", content=user_text)
+        reply_msg = ChatMessage(player_id=player.id, role="assistant", content=reply_text)
+        db.add_all([user_msg, reply_msg])
+        await db.flush()
+        await embedding_service.index_exchange(db, player.id, user_msg, reply_msg)
+    return player.id
+
+
+async def test_recall_finds_relevant_exchange(db, chatty_player, monkeypatch):
+    monkeypatch.setattr(embedding_module.settings, "MAX_CHAT_CONTEXT_TURNS", 0)
+    monkeypatch.setattr(embedding_module.settings, "CHAT_RECALL_TOP_K", 1)
+    recalled = await embedding_service.recall(db, chatty_player, "小白还好吗")
+    assert recalled == [
+        {"user": "我家的猫叫小白", "assistant": "小白这个名字真可爱！"}
+    ]
+
+
+async def test_recall_skips_short_term_context(db, chatty_player, monkeypatch):
+    monkeypatch.setattr(embedding_module.settings, "MAX_CHAT_CONTEXT_TURNS", 3)
+    assert await embedding_service.recall(db, chatty_player, "小白还好吗") == []
+
+
+async def test_rebuild_matches_incremental_index(db, chatty_player):
+    index = await db.get(embedding_module.ChatEmbeddingIndex, chatty_player)
+    incremental = (index.message_ids, index.vectors)
+    assert await embedding_service.rebuild_index(db, chatty_player) == 3
+    assert (index.message_ids, index.vectors) == incremental
+
+
+async def test_prune_drops_purged_exchanges(db, chatty_player, session_factory):
+    index = await db.get(embedding_module.ChatEmbeddingIndex, chatty_player)
+    first_pair = np.frombuffer(index.message_ids, dtype=np.int64)[:2].tolist()
+    await db.execute(delete(ChatMessage).where(ChatMessage.id.in_(first_pair)))
+    await db.commit()
+
+    assert await embedding_service.prune_all(session_factory) == 1
+    await db.refresh(index)
+    assert len(np.frombuffer(index.message_ids, dtype=np.int64)) == 4
+    assert len(index.vectors) == 2 * index.dim * 2  # two float16 rows
+    assert await embedding_service.prune_all(session_factory) == 0
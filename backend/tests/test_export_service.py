@@ -0,0 +1,113 @@
+"""Tests for NDJSON player export/import and the admin export endpoint."""
+
+import json
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.core.clock import utcnow
+from app.models.affinity import AffinityRecord
+from app.models.chat_archive import ChatArchive, ChatEpisode
+from app.models.chat_history import ChatMessage
+from app.models.level import LevelChoice
+from app.models.level_save import LevelSave
+from app.models.player import Player
+from app.services.compaction_service import pack_messages, unpack_messages
+from app.services.export_service import export_service
+
+
+async def _seed(db) -> int:
+    player = Player(name="小明", memory_facts={"pet_name": "小白"})
+    db.add(player)
+    await db.flush()
+    db.add_all([
+        LevelChoice(player_id=player.id, level_id="chapter_01", node_id="n1", choice_id="a"),
+        AffinityRecord(player_id=player.id, delta=2, source="level_choice"),
+        *[
+            ChatMessage(player_id=player.id, role="user", content=f"消息{i}")
+            for i in range(5)
+        ],
+        LevelSave(player_id=player.id, level_id="chapter_01", node_id="n2",
+                  choices={"n1": "a"}, saved_at=1.5),
+    ])
+    await db.flush()
+    archived = ChatMessage(id=1000, player_id=player.id, role="user", content="旧消息",
+                           created_at=utcnow())
+    episode = ChatEpisode(
+        player_id=player.id, started_at=archived.created_at, ended_at=archived.created_at,
+        first_message_id=1000, last_message_id=1000, message_count=1, summary="打招呼",
+    )
+    db.add(episode)
+    await db.flush()
+    db.add(ChatArchive(
+        player_id=player.id, episode_id=episode.id, started_at=archived.created_at,
+        ended_at=archived.created_at, message_count=1, payload=pack_messages([archived]),
+    ))
+    other = Player(name="Other")
+    db.add(other)
+    await db.flush()
+    db.add(ChatMessage(player_id=other.id, role="user", content="not exported"))
+    await db.commit()
+    return player.id
+
+
+async def _count(db, model) -> int:
+    return await db.scalar(select(func.count()).select_from(model))
+
+
+async def test_export_import_round_trip(db, session_factory):
+    player_id = await _seed(db)
+
+    chunks = [c async for c in export_service.export_ndjson(db, [player_id], batch_size=2)]
+    lines = "".join(chunks).splitlines()
+    tables = [json.loads(line)["table"] for line in lines]
+    assert tables[0] == "players"
+    assert tables.count("chat_messages") == 5
+    assert len(chunks) > len(set(tables))  # chat rows arrived in several batches
+
+    await db.execute(ChatArchive.__table__.delete())
+    await db.execute(ChatEpisode.__table__.delete())
+    await db.execute(LevelSave.__table__.delete())
+    await db.execute(ChatMessage.__table__.delete())
+    await db.execute(AffinityRecord.__table__.delete())
+    await db.execute(LevelChoice.__table__.delete())
+    await db.execute(Player.__table__.delete())
+    await db.commit()
+
+    result = await export_service.import_ndjson(session_factory, lines, batch_size=2)
+    assert result["rows"] == {
+        "players": 1, "level_choices": 1, "affinity_records": 1, "chat_messages": 5,
+        "chat_episodes": 1, "chat_archives": 1, "level_saves": 1,
+    }
+    assert result["max_player_id"] == player_id
+
+    restored = await db.get(Player, player_id)
+    assert restored.name == "小明"
+    assert restored.memory_facts == {"pet_name": "小白"}
+    assert restored.created_at is not None
+    assert await _count(db, ChatMessage) == 5
+    episode_id = await db.scalar(select(ChatEpisode.id))
+    archive = await db.scalar(select(ChatArchive))
+    assert archive.episode_id == episode_id
+    assert [m["content"] for m in unpack_messages(archive.payload)] == ["旧消息"]
+    level_save = await db.get(LevelSave, player_id)
+    assert (level_save.node_id, level_save.choices) == ("n2", {"n1": "a"})
+
+
+async def test_admin_export_requires_token(client, db, monkeypatch):
+    player_id = await _seed(db)
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+
+    resp = await client.get(f"/api/admin/players/{player_id}/export")
+    assert resp.status_code == 403
+
+    headers = {"X-Admin-Token": "s3cret"}
+    resp = await client.get(f"/api/admin/players/{player_id}/export", headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert len(rows) == 11
+    assert all(r["row"].get("player_id", player_id) == player_id for r in rows)
+
+    resp = await client.get("/api/admin/players/99999/export", headers=headers)
+    assert resp.status_code == 404
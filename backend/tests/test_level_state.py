@@ -0,0 +1,118 @@
+"""Tests for level pause/resume - the Redis state hash and its Postgres write-behind."""
+
+import pytest
+
+from app.core.level_engine import DIRTY_KEY, LevelEngine
+from app.models.level_save import LevelSave
+from app.services.level_save_service import level_save_service
+
+
+@pytest.fixture
+async def player_id(client):
+    resp = await client.post("/api/player/", json={"name": "Pauser"})
+    return resp.json()["id"]
+
+
+async def _pause(client, player_id, node_id, choices=None):
+    body = {"level_id": "chapter_01", "node_id": node_id, "choices": choices or {}}
+    return await client.put("/api/levels/state", params={"player_id": player_id}, json=body)
+
+
+def _single_shard(session_factory):
+    async def session_for(player_id):
+        return session_factory
+    return session_for
+
+
+async def test_pause_and_resume_merges_choices(client, player_id, redis):
+    assert (await _pause(client, player_id, "choice_1", {"choice_1": "A"})).status_code == 204
+    assert (await _pause(client, player_id, "choice_2", {"choice_2": "B"})).status_code == 204
+    assert await redis.sismember(DIRTY_KEY, str(player_id))
+
+    resp = await client.get("/api/levels/state", params={"player_id": player_id})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["level_id"] == "chapter_01"
+    assert data["node_id"] == "choice_2"
+    assert data["choices"] == {"choice_1": "A", "choice_2": "B"}
+
+
+async def test_pause_validates_input(client, player_id):
+    assert (await _pause(client, player_id, "n", {"choice_1": "Z"})).status_code == 400
+    body = {"level_id": "nope", "node_id": "n"}
+    resp = await client.put("/api/levels/state", params={"player_id": player_id}, json=body)
+    assert resp.status_code == 404
+    assert (await _pause(client, 999, "n")).status_code == 404
+    resp = await client.delete("/api/levels/state", params={"player_id": 999})
+    assert resp.status_code == 404
+
+
+async def test_clear_and_complete_drop_state(client, player_id):
+    params = {"player_id": player_id}
+    await _pause(client, player_id, "choice_1")
+    assert (await client.delete("/api/levels/state", params=params)).status_code == 204
+    assert (await client.get("/api/levels/state", params=params)).status_code == 404
+
+    await _pause(client, player_id, "choice_1")
+    await client.post("/api/levels/complete", params=params, json={"level_id": "chapter_01"})
+    assert (await client.get("/api/levels/state", params=params)).status_code == 404
+
+    # A batch completion clears it in the same transaction
+    await _pause(client, player_id, "choice_1")
+    batch = {"levels": [{"level_id": "chapter_01", "complete": True}]}
+    assert (await client.post("/api/levels/batch", params=params, json=batch)).status_code == 200
+    assert (await client.get("/api/levels/state", params=params)).status_code == 404
+
+
+async def test_stale_level_choices_are_ignored(redis):
+    engine = LevelEngine(redis)
+    await engine.save_state(1, "chapter_00", "x", {"old": "A"})
+    await engine.save_state(1, "chapter_01", "choice_1", {"choice_1": "C"})
+    state = await engine.load_state(1)
+    assert state["choices"] == {"choice_1": "C"}
+
+
+async def test_flush_persists_and_resume_falls_back(client, player_id, redis, db, session_factory):
+    await _pause(client, player_id, "choice_2", {"choice_1": "B"})
+
+    flushed = await level_save_service.flush(redis, _single_shard(session_factory))
+    assert flushed == 1
+    assert await redis.scard(DIRTY_KEY) == 0
+    save = await db.get(LevelSave, player_id)
+    assert (save.node_id, save.choices) == ("choice_2", {"choice_1": "B"})
+
+    # Redis lost the state: resume reads Postgres and re-caches it
+    await redis.delete(f"level:state:{player_id}")
+    resp = await client.get("/api/levels/state", params={"player_id": player_id})
+    assert resp.status_code == 200
+    assert resp.json()["choices"] == {"choice_1": "B"}
+    assert await redis.exists(f"level:state:{player_id}")
+    assert not await redis.sismember(DIRTY_KEY, str(player_id))
+
+
+async def test_flush_skips_deleted_players(client, player_id, redis, db, session_factory):
+    await _pause(client, player_id, "choice_1")
+    await client.delete(f"/api/player/{player_id}")
+
+    await level_save_service.flush(redis, _single_shard(session_factory))
+    assert await db.get(LevelSave, player_id) is None
+
+
+async def test_flush_racing_a_clear_does_not_resurrect_state(
+    client, player_id, redis, session_factory, monkeypatch
+):
+    params = {"player_id": player_id}
+    await _pause(client, player_id, "choice_1", {"choice_1": "A"})
+
+    load_states = LevelEngine.load_states
+
+    async def load_then_clear(self, player_ids):
+        states = await load_states(self, player_ids)
+        # The player leaves the level after the flush read their state
+        assert (await client.delete("/api/levels/state", params=params)).status_code == 204
+        return states
+
+    monkeypatch.setattr(LevelEngine, "load_states", load_then_clear)
+    await level_save_service.flush(redis, _single_shard(session_factory))
+
+    assert (await client.get("/api/levels/state", params=params)).status_code == 404
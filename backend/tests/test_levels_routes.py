@@ -0,0 +1,225 @@
+"""Tests for the level and affinity routes - choices, completion, progress."""
+
+import pytest
+
+
+@pytest.fixture
+async def player_id(client):
+    resp = await client.post("/api/player/", json={"name": "LevelTester"})
+    return resp.json()["id"]
+
+
+async def test_list_levels(client, player_id):
+    resp = await client.get("/api/levels/", params={"player_id": player_id})
+    assert resp.status_code == 200
+    levels = resp.json()
+    assert levels[0]["id"] == "chapter_01"
+    assert levels[0]["is_unlocked"] is True
+
+
+async def test_list_levels_player_not_found(client):
+    resp = await client.get("/api/levels/", params={"player_id": 999})
+    assert resp.status_code == 404
+
+
+async def test_make_choice_updates_affinity(client, player_id):
+    body = {"level_id": "chapter_01", "node_id": "choice_3", "choice_id": "A"}
+    resp = await client.post("/api/levels/choice", params={"player_id": player_id}, json=body)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["affinity_delta"] == 3
+    assert data["new_affinity_total"] == 3
+
+    resp = await client.get(f"/api/affinity/{player_id}")
+    assert resp.json()["score"] == 3
+
+
+async def test_make_choice_invalid(client, player_id):
+    body = {"level_id": "chapter_01", "node_id": "choice_1", "choice_id": "Z"}
+    resp = await client.post("/api/levels/choice", params={"player_id": player_id}, json=body)
+    assert resp.status_code == 400
+
+
+async def test_complete_level_and_progress(client, player_id):
+    resp = await client.post(
+        "/api/levels/complete", params={"player_id": player_id}, json={"level_id": "chapter_01"}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["next_level_id"] is None
+
+    resp = await client.get("/api/levels/progress", params={"player_id": player_id})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["current_level"] == "chapter_01"
+    assert data["unlocked_levels"] == ["chapter_01"]
+    assert data["total_affinity"] == 0
+
+
+async def test_affinity_player_not_found(client):
+    resp = await client.get("/api/affinity/999")
+    assert resp.status_code == 404
+
+
+async def _submit(client, player_id, choice_id="A", node_id="choice_3", headers=None):
+    body = {"level_id": "chapter_01", "node_id": node_id, "choice_id": choice_id}
+    return await client.post(
+        "/api/levels/choice", params={"player_id": player_id}, json=body, headers=headers
+    )
+
+
+async def test_make_choice_retry_is_replayed(client, player_id):
+    headers = {"Idempotency-Key": "req-1"}
+    first = await _submit(client, player_id, headers=headers)
+    retry = await _submit(client, player_id, headers=headers)
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+    resp = await client.get(f"/api/affinity/{player_id}")
+    assert resp.json()["score"] == 3
+
+
+async def test_make_choice_natural_key_dedupes(client, player_id):
+    await _submit(client, player_id)
+    assert (await _submit(client, player_id)).json()["new_affinity_total"] == 3
+
+    # Same node, different option: a conflict, not a replay
+    resp = await _submit(client, player_id, choice_id="B")
+    assert resp.status_code == 409
+
+
+async def test_make_choice_db_backstop_without_cache(client, player_id, redis, db):
+    from sqlalchemy import func, select
+    from app.models.level import LevelChoice
+
+    await _submit(client, player_id)
+    await redis.flushall()  # cache lost
+
+    resp = await _submit(client, player_id)
+    assert resp.status_code == 200
+    assert resp.headers["Idempotent-Replayed"] == "true"
+    assert resp.json()["new_affinity_total"] == 3
+    count = await db.scalar(select(func.count()).select_from(LevelChoice))
+    assert count == 1
+
+
+async def test_reset_allows_choosing_again(client, player_id):
+    await _submit(client, player_id)
+    await client.post(f"/api/player/{player_id}/reset")
+
+    resp = await _submit(client, player_id, choice_id="B")
+    assert resp.status_code == 200
+    assert "Idempotent-Replayed" not in resp.headers
+
+
+async def test_batch_applies_choices_and_completion(client, player_id, db):
+    from sqlalchemy import func, select
+    from app.models.affinity import AffinityRecord
+
+    await _submit(client, player_id, node_id="choice_1", choice_id="A")  # sent online earlier
+    body = {"levels": [{
+        "level_id": "chapter_01",
+        "choices": [
+            {"node_id": "choice_1", "choice_id": "A"},  # replay of the online call
+            {"node_id": "choice_2", "choice_id": "A", "idempotency_key": "q-2"},
+            {"node_id": "choice_2", "choice_id": "B", "idempotency_key": "q-2"},  # conflict
+            {"node_id": "choice_3", "choice_id": "Z"},  # unknown option
+            {"node_id": "choice_3", "choice_id": "A", "idempotency_key": "q-3"},
+        ],
+        "complete": True,
+    }, {
+        "level_id": "no_such_level",
+        "choices": [{"node_id": "x", "choice_id": "y"}],
+    }]}
+    headers = {"Idempotency-Key": "batch-1"}
+    resp = await client.post("/api/levels/batch", params={"player_id": player_id}, json=body,
+                             headers=headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [c["status"] for c in data["choices"]] == [
+        "replayed", "applied", "conflict", "invalid", "applied", "invalid",
+    ]
+    assert data["total_affinity"] == 1 + 1 + 3
+    assert data["completions"] == [{
+        "level_id": "chapter_01", "status": "completed", "next_level_id": None,
+        "unlocked": False,
+    }]
+
+    records = await db.scalar(select(func.count()).select_from(AffinityRecord))
+    assert records == 3
+    resp = await client.get(f"/api/affinity/{player_id}")
+    assert resp.json()["score"] == 5
+
+    # A resend after a lost response is a full replay, keyless choices included
+    resp = await client.post("/api/levels/batch", params={"player_id": player_id}, json=body,
+                             headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["Idempotent-Replayed"] == "true"
+    assert resp.json() == data
+    assert await db.scalar(select(func.count()).select_from(AffinityRecord)) == 3
+    resp = await client.get(f"/api/affinity/{player_id}")
+    assert resp.json()["score"] == 5
+
+    # Reusing the key for another batch is rejected
+    body["levels"].pop()
+    resp = await client.post("/api/levels/batch", params={"player_id": player_id}, json=body,
+                             headers=headers)
+    assert resp.status_code == 409
+
+
+async def test_replaying_a_completed_level_records_new_choices(client, player_id):
+    await _submit(client, player_id)
+    complete = {"level_id": "chapter_01"}
+    await client.post("/api/levels/complete", params={"player_id": player_id}, json=complete)
+
+    resp = await _submit(client, player_id, choice_id="B")
+    assert resp.status_code == 200
+    assert "Idempotent-Replayed" not in resp.headers
+    # Within the new playthrough the natural key dedupes again
+    assert (await _submit(client, player_id, choice_id="C")).status_code == 409
+
+
+async def test_client_key_reused_for_another_node_conflicts(client, player_id):
+    headers = {"Idempotency-Key": "req-1"}
+    await _submit(client, player_id, headers=headers)
+    resp = await _submit(client, player_id, node_id="choice_1", headers=headers)
+    assert resp.status_code == 409
+
+
+async def test_cached_choice_not_served_for_deleted_player(client, player_id):
+    await _submit(client, player_id)
+    await client.delete(f"/api/player/{player_id}")
+    assert (await _submit(client, player_id)).status_code == 404
+
+
+async def test_batch_player_not_found(client):
+    body = {"levels": [{"level_id": "chapter_01", "complete": True}]}
+    resp = await client.post("/api/levels/batch", params={"player_id": 999}, json=body)
+    assert resp.status_code == 404
+
+
+async def test_level_catalog_conditional_get(client):
+    resp = await client.get("/api/levels/catalog")
+    assert resp.status_code == 200
+    assert resp.json()[0]["id"] == "chapter_01"
+    assert resp.headers["cache-control"].startswith("public")
+    etag = resp.headers["etag"]
+
+    resp = await client.get("/api/levels/catalog", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.headers["etag"] == etag
+    assert resp.content == b""
+
+    resp = await client.get(
+        "/api/levels/catalog", headers={"If-Modified-Since": resp.headers["last-modified"]}
+    )
+    assert resp.status_code == 304
+
+
+async def test_list_levels_etag(client, player_id):
+    params = {"player_id": player_id}
+    etag = (await client.get("/api/levels/", params=params)).headers["etag"]
+    resp = await client.get("/api/levels/", params=params, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    resp = await client.get("/api/levels/", params=params, headers={"If-None-Match": '"stale"'})
+    assert resp.status_code == 200
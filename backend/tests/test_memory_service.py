@@ -0,0 +1,126 @@
+"""Tests for the memory service - fact merges, eviction and prompt selection."""
+
+from sqlalchemy.dialects import postgresql
+
+from app.models.player import Player
+from app.services import memory_service as memory_module
+from app.services.memory_service import memory_service
+
+
+async def _make_player(db, facts: dict) -> int:
+    player = Player(name="Mem", memory_facts=facts)
+    db.add(player)
+    await db.flush()
+    return player.id
+
+
+async def test_update_facts_merges(db):
+    player_id = await _make_player(db, {"pet_name": "小白", "color": "red"})
+    await memory_service.update_facts(db, player_id, {"color": "蓝色", "city": "杭州"})
+
+    facts = await memory_service.get_facts(db, player_id)
+    assert facts == {"pet_name": "小白", "color": "蓝色", "city": "杭州"}
+
+
+async def test_delete_facts(db):
+    player_id = await _make_player(db, {"a": 1, "b": 2})
+    await memory_service.delete_facts(db, player_id, ["a", "missing"])
+    assert await memory_service.get_facts(db, player_id) == {"b": 2}
+
+
+async def test_extract_and_save_returns_new_facts(db, monkeypatch):
+    player_id = await _make_player(db, {"a": 1})
+
+    async def fake_extract(messages, existing):
+        assert existing == {"a": 1}
+        return {"b": 2}
+
+    monkeypatch.setattr(memory_module.llm_service, "extract_memory_facts", fake_extract)
+    new = await memory_service.extract_and_save(db, player_id, [])
+    assert new == {"b": 2}
+    assert await memory_service.get_facts(db, player_id) == {"a": 1, "b": 2}
+
+
+def test_postgres_statements_are_server_side():
+    """On Postgres, merges and deletes are single JSONB operator updates."""
+    merge_sql = str(
+        memory_module._merge_stmt(1, {"a": 1}, {}).compile(dialect=postgresql.dialect())
+    )
+    assert "memory_facts || CAST" in merge_sql
+
+    delete_sql = str(
+        memory_module._delete_keys_stmt(1, ["a"]).compile(dialect=postgresql.dialect())
+    )
+    assert "memory_facts - CAST" in delete_sql
+
+
+def test_select_for_prompt_prefers_relevant_facts():
+    facts = {f"fact_{i}": f"无关内容{i}" for i in range(10)}
+    facts["pet_name"] = "小白是一只猫"
+    selected = memory_module.select_for_prompt(facts, {}, "我的猫小白今天生病了", k=3)
+    assert len(selected) == 3
+    assert "pet_name" in selected
+
+
+def test_eviction_prefers_stale_unused_facts():
+    now = 1_000_000_000.0
+    day = 86400
+    meta = {
+        "fresh": {"last_ref": now, "hits": 5},
+        "stale": {"last_ref": now - 90 * day, "hits": 1},
+        "legacy": {},  # pre-metadata fact
+        "just_learned": {"last_ref": now, "hits": 0},
+    }
+    victims = memory_module.eviction_candidates(
+        meta, list(meta), capacity=2, protected={"just_learned"}, now=now
+    )
+    assert set(victims) == {"legacy", "stale"}
+
+
+async def test_update_facts_is_bounded(db, monkeypatch):
+    monkeypatch.setattr(memory_module.settings, "MEMORY_MAX_FACTS", 3)
+    player_id = await _make_player(db, {})
+    await memory_service.update_facts(db, player_id, {"a": 1, "b": 2})
+    await memory_service.update_facts(db, player_id, {"c": 3, "d": 4})
+
+    facts = await memory_service.get_facts(db, player_id)
+    assert len(facts) == 3
+    assert {"c", "d"} <= set(facts)
+
+
+async def test_recall_records_references(db, monkeypatch):
+    monkeypatch.setattr(memory_module.settings, "MEMORY_PROMPT_TOP_K", 1)
+    player_id = await _make_player(db, {})
+    await memory_service.update_facts(db, player_id, {"city": "杭州", "pet": "小白"})
+    player = await db.get(Player, player_id)
+
+    selected = await memory_service.recall(
+        db, player_id, player.memory_facts, player.memory_meta, "杭州的天气"
+    )
+    assert selected == {"city": "杭州"}
+    assert player.memory_meta["city"]["hits"] == 1
+    assert player.memory_meta["pet"]["hits"] == 0
+
+
+async def test_facts_without_meta_count_toward_capacity(db, monkeypatch):
+    monkeypatch.setattr(memory_module.settings, "MEMORY_MAX_FACTS", 2)
+    # Facts stored before metadata existed have no meta entry
+    player_id = await _make_player(db, {"old1": 1, "old2": 2})
+    await memory_service.update_facts(db, player_id, {"new": 3})
+
+    assert set(await memory_service.get_facts(db, player_id)) in ({"new", "old1"}, {"new", "old2"})
+
+
+async def test_recall_skips_recent_references(db, monkeypatch):
+    monkeypatch.setattr(memory_module.settings, "MEMORY_PROMPT_TOP_K", 1)
+    player_id = await _make_player(db, {})
+    await memory_service.update_facts(db, player_id, {"city": "杭州", "pet": "小白"})
+    player = await db.get(Player, player_id)
+    await memory_service.recall(db, player_id, player.memory_facts, player.memory_meta, "杭州")
+    updated_at = player.updated_at
+
+    # Referenced again within MEMORY_TOUCH_INTERVAL: nothing is written
+    await memory_service.recall(db, player_id, player.memory_facts, player.memory_meta, "杭州")
+    await db.refresh(player)
+    assert player.memory_meta["city"]["hits"] == 1
+    assert player.updated_at == updated_at
@@ -0,0 +1,98 @@
+"""Tests for the per-connection WebSocket send buffer."""
+
+import asyncio
+
+from app.api.websocket.connections import REPLACED_CLOSE_CODE, REPLACED_FRAME, connection_hub
+from app.api.websocket.outbox import SLOW_CONSUMER_CLOSE_CODE, Outbox
+from app.config import settings
+from app.core.serialization import END_FRAME, chunk_frame, start_frame
+from tests.test_connections import FakeSocket
+
+
+class SlowSocket(FakeSocket):
+    """A client whose sends block until ``release`` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+
+    async def send_text(self, frame: str) -> None:
+        await self.release.wait()
+        await super().send_text(frame)
+
+
+async def test_lagging_client_gets_coalesced_chunks():
+    sock = SlowSocket()
+    outbox = Outbox(sock).start()
+    outbox.send(start_frame("r"))
+    for chunk in ("你", "好", "呀"):
+        assert outbox.send_chunk(chunk)
+    outbox.send(END_FRAME)
+    assert outbox.stats()["queued_frames"] == 3
+
+    sock.release.set()
+    await outbox.aclose()
+    assert sock.sent == [start_frame("r"), chunk_frame("你好呀"), END_FRAME]
+    assert outbox.coalesced_chunks == 2
+    assert outbox.stats()["queued_bytes"] == 0
+
+
+async def test_client_past_high_water_mark_is_dropped():
+    sock = SlowSocket()
+    outbox = Outbox(sock, max_bytes=8).start()
+    assert outbox.send_chunk("1234")
+    assert not outbox.send_chunk("56789")
+    assert outbox.closed and outbox.close_code == SLOW_CONSUMER_CLOSE_CODE
+    assert not outbox.send(END_FRAME)
+
+    await asyncio.sleep(0)
+    assert sock.close_code == SLOW_CONSUMER_CLOSE_CODE
+    await outbox.aclose()
+    assert sock.sent == []
+
+
+async def test_replaced_notice_waits_for_the_frame_in_flight(redis):
+    old_sock, new_sock = SlowSocket(), FakeSocket()
+    old = Outbox(old_sock).start()
+    old_conn = await connection_hub.register(redis, 8, old_sock, old)
+    old.send(start_frame("r"))
+    await asyncio.sleep(0)  # the sender is now stuck writing the start frame
+    old.send_chunk("stale")
+
+    new = Outbox(new_sock).start()
+    registering = asyncio.create_task(connection_hub.register(redis, 8, new_sock, new))
+    await asyncio.sleep(0.01)
+    assert old_sock.sent == [] and old_sock.close_code is None
+    old_sock.release.set()
+    new_conn = await registering
+    try:
+        # Queued frames are dropped; the notice follows the frame that was in flight
+        assert old_sock.sent == [start_frame("r"), REPLACED_FRAME]
+        assert old_sock.close_code == REPLACED_CLOSE_CODE
+    finally:
+        await connection_hub.unregister(redis, 8, old_conn)
+        await connection_hub.unregister(redis, 8, new_conn)
+        await old.aclose()
+        await new.aclose()
+
+
+async def test_hub_sends_through_outbox_and_reports_it(client, redis, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    sock = FakeSocket()
+    outbox = Outbox(sock).start()
+    conn_id = await connection_hub.register(redis, 9, sock, outbox)
+    try:
+        assert await connection_hub.send(redis, 9, "hi")
+        await asyncio.sleep(0.01)
+        assert sock.sent == ["hi"]
+
+        resp = await client.get("/api/admin/connections", headers={"X-Admin-Token": "s3cret"})
+        assert resp.status_code == 200
+        stats = resp.json()
+        assert stats["node"] == connection_hub.node_id
+        [entry] = [c for c in stats["connections"] if c["player_id"] == 9]
+        assert entry["conn_id"] == conn_id
+        assert entry["sent_frames"] == 1 and entry["queued_bytes"] == 0
+    finally:
+        await connection_hub.unregister(redis, 9, conn_id)
+        await outbox.aclose()
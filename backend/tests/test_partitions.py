@@ -0,0 +1,102 @@
+"""Tests for chat_messages partition naming and DDL helpers."""
+
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+
+from sqlalchemy.exc import InvalidRequestError
+
+from app.db import partitions
+
+
+def test_add_months_wraps_years():
+    assert partitions.add_months(date(2026, 11, 1), 1) == date(2026, 12, 1)
+    assert partitions.add_months(date(2026, 12, 1), 1) == date(2027, 1, 1)
+    assert partitions.add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+
+def test_partition_name_round_trip():
+    month = partitions.month_start(datetime(2026, 3, 17, 8, 30))
+    name = partitions.partition_name(month)
+    assert name == "chat_messages_y2026m03"
+    assert partitions.parse_partition_name(name) == date(2026, 3, 1)
+    assert partitions.parse_partition_name("chat_messages_legacy") is None
+
+
+def test_create_partition_sql_bounds():
+    sql = partitions.create_partition_sql(date(2026, 12, 1))
+    assert "PARTITION OF chat_messages" in sql
+    assert "FROM ('2026-12-01') TO ('2027-01-01')" in sql
+
+
+async def test_noop_without_partitioning():
+    """SQLite (and unpartitioned tables) are left alone."""
+    from tests.conftest import test_engine
+
+    assert await partitions.ensure_future_partitions(test_engine, 3, date.today()) == []
+    assert await partitions.drop_partitions_before(test_engine, datetime.now()) == []
+
+
+class _FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalar(self):
+        return self._rows[0] if self._rows else None
+
+    def scalars(self):
+        return iter(self._rows)
+
+
+class _FakePostgresConnection:
+    """Records statements; like SQLAlchemy, refuses an isolation change mid-transaction."""
+
+    class dialect:
+        name = "postgresql"
+
+    def __init__(self, partition_names):
+        self.partition_names = partition_names
+        self.in_transaction = False
+        self.autocommit = False
+        self.statements = []
+
+    async def execution_options(self, isolation_level=None):
+        if self.in_transaction:
+            raise InvalidRequestError("isolation level can't change inside a transaction")
+        self.autocommit = isolation_level == "AUTOCOMMIT"
+        return self
+
+    async def execute(self, statement, params=None):
+        self.in_transaction = not self.autocommit
+        sql = str(statement)
+        self.statements.append(sql)
+        if "pg_partitioned_table" in sql:
+            return _FakeResult([1])
+        if "pg_inherits" in sql:
+            return _FakeResult(self.partition_names)
+        return _FakeResult([])
+
+
+class _FakeEngine:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def connect(self):
+        yield self.conn
+
+
+async def test_drop_partitions_before_detaches_whole_months_in_autocommit():
+    conn = _FakePostgresConnection([
+        "chat_messages_y2026m01", "chat_messages_y2026m02", "chat_messages_y2026m03",
+    ])
+    dropped = await partitions.drop_partitions_before(
+        _FakeEngine(conn), datetime(2026, 3, 10)
+    )
+
+    assert dropped == ["chat_messages_y2026m01", "chat_messages_y2026m02"]
+    assert conn.autocommit
+    assert (
+        "ALTER TABLE chat_messages DETACH PARTITION chat_messages_y2026m02 CONCURRENTLY"
+        in conn.statements
+    )
+    assert "DROP TABLE chat_messages_y2026m03" not in conn.statements
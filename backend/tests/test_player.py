@@ -184,3 +184,85 @@ async def test_create_player_name_validation(client):
 
     resp = await client.post("/api/player/", json={"name": "x" * 101})
     assert resp.status_code == 422
+
+
+async def test_bootstrap_returns_all_sections(client):
+    player_id = (await client.post("/api/player/", json={"name": "Boot"})).json()["id"]
+    body = {"level_id": "chapter_01", "node_id": "choice_2"}
+    await client.put("/api/levels/state", params={"player_id": player_id}, json=body)
+
+    resp = await client.get(f"/api/player/{player_id}/bootstrap")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["unchanged"] == []
+    assert data["player"]["name"] == "Boot"
+    assert (data["levels"][0]["id"], data["levels"][0]["is_unlocked"]) == ("chapter_01", True)
+    assert data["progress"]["current_level"] == "chapter_01"
+    assert data["affinity"]["score"] == 0
+    assert data["chat_history"]["messages"] == []
+    assert data["level_state"]["node_id"] == "choice_2"
+    assert set(data["versions"]) == {
+        "player", "levels", "progress", "affinity", "chat_history", "level_state"
+    }
+
+
+async def test_bootstrap_skips_unchanged_sections(client):
+    player_id = (await client.post("/api/player/", json={"name": "Boot"})).json()["id"]
+    versions = (await client.get(f"/api/player/{player_id}/bootstrap")).json()["versions"]
+    known = ",".join(f"{name}:{version}" for name, version in versions.items())
+
+    await client.post("/api/levels/choice", params={"player_id": player_id},
+                      json={"level_id": "chapter_01", "node_id": "choice_3", "choice_id": "A"})
+    resp = await client.get(f"/api/player/{player_id}/bootstrap", params={"versions": known})
+    data = resp.json()
+    assert set(data["unchanged"]) == {"levels", "chat_history", "level_state"}
+    assert data["levels"] is None
+    assert data["affinity"]["score"] == 3
+    assert data["versions"]["levels"] == versions["levels"]
+
+
+async def test_bootstrap_falls_back_to_saved_state_without_redis(client, db, monkeypatch):
+    import redis.asyncio as aioredis
+
+    from app.core.level_engine import LevelEngine
+    from app.models.level_save import LevelSave
+
+    player_id = (await client.post("/api/player/", json={"name": "Boot"})).json()["id"]
+    db.add(LevelSave(player_id=player_id, level_id="chapter_01", node_id="choice_2",
+                     choices={"choice_1": "A"}, saved_at=1.0))
+    await db.commit()
+
+    async def redis_down(*args, **kwargs):
+        raise aioredis.ConnectionError("Redis is down")
+
+    monkeypatch.setattr(LevelEngine, "load_state", redis_down)
+    monkeypatch.setattr(LevelEngine, "restore_state", redis_down)
+    resp = await client.get(f"/api/player/{player_id}/bootstrap")
+    assert resp.status_code == 200
+    assert resp.json()["level_state"]["choices"] == {"choice_1": "A"}
+
+
+async def test_bootstrap_player_not_found(client):
+    resp = await client.get("/api/player/999/bootstrap")
+    assert resp.status_code == 404
+
+
+async def test_get_player_conditional(client):
+    player_id = (await client.post("/api/player/", json={"name": "Etag"})).json()["id"]
+    resp = await client.get(f"/api/player/{player_id}")
+    etag = resp.headers["etag"]
+    assert resp.headers["cache-control"] == "private, no-cache"
+
+    resp = await client.get(f"/api/player/{player_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+    # An affinity change invalidates the ETag even within the same updated_at second
+    await client.post("/api/levels/choice", params={"player_id": player_id},
+                      json={"level_id": "chapter_01", "node_id": "choice_3", "choice_id": "A"})
+    resp = await client.get(f"/api/player/{player_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.json()["affinity_score"] == 3
+    assert resp.headers["etag"] != etag
+
+    resp = await client.get("/api/player/999", headers={"If-None-Match": etag})
+    assert resp.status_code == 404
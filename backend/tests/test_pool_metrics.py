@@ -0,0 +1,34 @@
+"""Tests for connection-pool instrumentation."""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.pool_metrics import InstrumentedQueuePool, PoolMetrics, pool_stats
+
+
+def test_wait_percentile():
+    metrics = PoolMetrics()
+    assert metrics.wait_percentile(95) == 0.0
+    for ms in range(1, 101):
+        metrics.observe_wait(ms / 1000)
+    assert metrics.checkouts == 100
+    assert metrics.max_wait == 0.1
+    assert metrics.wait_percentile(95) == 0.096
+
+
+async def test_instrumented_pool_records_checkouts():
+    """Each checkout is counted and shows up in the pool snapshot."""
+    engine = create_async_engine(
+        "sqlite+aiosqlite://", poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=0
+    )
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            stats = pool_stats(engine.pool)
+            assert stats["checked_out"] == 1
+            assert stats["saturation"] == 0.5
+        stats = pool_stats(engine.pool)
+        assert stats["checkouts"] == 1
+        assert stats["checked_out"] == 0
+    finally:
+        await engine.dispose()
@@ -0,0 +1,96 @@
+"""Tests for the Redis token-bucket rate limiter."""
+
+import pytest
+
+from app.config import settings
+from app.core.rate_limit import Bucket, RateLimited, bucket_key, rate_limiter
+from app.core.serialization import error_frame, loads
+from app.services import chat_service as chat_module
+
+
+@pytest.fixture(autouse=True)
+def limits_on(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    rate_limiter.clear_leases()
+    yield
+    rate_limiter.clear_leases()
+
+
+@pytest.fixture
+async def player_id(client):
+    resp = await client.post("/api/player/", json={"name": "Spammer"})
+    return resp.json()["id"]
+
+
+async def test_read_route_returns_429_with_retry_after(client, player_id, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_READ_BURST", 2)
+    monkeypatch.setattr(settings, "RATE_LIMIT_READ_PER_MINUTE", 30)
+    for _ in range(2):
+        assert (await client.get(f"/api/player/{player_id}")).status_code == 200
+
+    resp = await client.get(f"/api/affinity/{player_id}")
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "2"
+    assert resp.json()["retry_after"] == pytest.approx(2, abs=0.1)
+    # Other players have their own buckets
+    assert (await client.get("/api/player/999")).status_code == 404
+
+
+async def test_lease_serves_calls_locally(redis):
+    bucket = Bucket(capacity=100, refill=1)
+    key = bucket_key("read", 1)
+    await rate_limiter.acquire(redis, key, bucket)
+    # One token spent plus a lease of RATE_LIMIT_LEASE_CALLS more
+    tokens = float(await redis.hget(key, "tokens"))
+    assert tokens == pytest.approx(100 - 1 - settings.RATE_LIMIT_LEASE_CALLS, abs=0.1)
+
+    for _ in range(settings.RATE_LIMIT_LEASE_CALLS):
+        await rate_limiter.acquire(redis, key, bucket)
+    assert float(await redis.hget(key, "tokens")) == tokens
+    await rate_limiter.acquire(redis, key, bucket)
+    assert float(await redis.hget(key, "tokens")) < tokens
+
+
+async def test_near_limit_callers_get_no_lease(redis):
+    bucket = Bucket(capacity=3, refill=0.01)
+    key = bucket_key("chat", 1)
+    for _ in range(3):
+        await rate_limiter.acquire(redis, key, bucket)
+    with pytest.raises(RateLimited) as exc:
+        await rate_limiter.acquire(redis, key, bucket)
+    assert exc.value.scope == "chat"
+    assert exc.value.retry_after == pytest.approx(100, abs=1)
+
+
+async def test_chat_limits_and_global_llm_budget(client, redis, player_id, monkeypatch):
+    async def chat_stream(messages, **kwargs):
+        yield "嗯"
+
+    monkeypatch.setattr(chat_module.llm_service, "chat_stream", chat_stream)
+    monkeypatch.setattr(settings, "RATE_LIMIT_CHAT_BURST", 1)
+    monkeypatch.setattr(settings, "LLM_TOKENS_PER_CHAT_ESTIMATE", 1000)
+    monkeypatch.setattr(settings, "LLM_TOKEN_BUDGET_PER_MINUTE", 2000)
+
+    resp = await client.post(f"/api/chat/stream/{player_id}", json={"content": "hi"})
+    assert resp.status_code == 200
+    resp = await client.post(f"/api/chat/stream/{player_id}", json={"content": "hi"})
+    assert resp.status_code == 429 and "chat" in resp.json()["detail"]
+
+    # A second player still has chat tokens, but the shared LLM budget runs dry
+    await rate_limiter.hit_chat(redis, player_id + 1)
+    with pytest.raises(RateLimited) as exc:
+        await rate_limiter.hit_chat(redis, player_id + 2)
+    assert exc.value.scope == "llm"
+    # The turn never happened, so the player's own chat token was given back
+    await rate_limiter.hit(redis, "chat", player_id + 2)
+
+    frame = loads(error_frame(str(exc.value), retry_after=30.0))
+    assert frame == {"type": "error", "content": str(exc.value), "retry_after": 30.0}
+
+
+async def test_disabled_limiter_skips_redis(redis, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    bucket = Bucket(capacity=1, refill=0.01)
+    for _ in range(5):
+        await rate_limiter.acquire(redis, bucket_key("chat", 1), bucket)
+    assert not await redis.exists(bucket_key("chat", 1))
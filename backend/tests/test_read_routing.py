@@ -0,0 +1,25 @@
+"""Tests for read-replica routing and the read-your-writes guard."""
+
+from app.db.database import _WRITTEN_PLAYERS, _last_write_key, needs_primary
+from app.models.chat_history import ChatMessage
+from app.models.player import Player
+
+
+async def test_flush_tracks_written_players(db):
+    """Flushing a player or a child row records the player ID on the session."""
+    player = Player(name="Writer")
+    db.add(player)
+    await db.flush()
+    assert db.info[_WRITTEN_PLAYERS] == {player.id}
+
+    db.info.pop(_WRITTEN_PLAYERS)
+    db.add(ChatMessage(player_id=player.id, role="user", content="hi"))
+    await db.flush()
+    assert db.info[_WRITTEN_PLAYERS] == {player.id}
+
+
+async def test_needs_primary_after_recent_write(redis):
+    assert await needs_primary(redis, 1) is False
+    await redis.set(_last_write_key(1), 0, ex=5)
+    assert await needs_primary(redis, 1) is True
+    assert await needs_primary(redis, 2) is False
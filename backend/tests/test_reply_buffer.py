@@ -0,0 +1,66 @@
+"""Tests for buffering chat replies in Redis Streams and resuming them."""
+
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services import chat_service as chat_module
+from app.services.chat_service import ChatService
+from app.services.reply_buffer import ReplyBuffer, ReplyUnavailable, read_reply, reply_key
+
+
+async def _collect(redis, player_id, reply_id, offset):
+    return [chunk async for chunk in read_reply(redis, player_id, reply_id, offset)]
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    async def chat_stream(messages, **kwargs):
+        for chunk in ("你", "好", "呀"):
+            yield chunk
+
+    monkeypatch.setattr(chat_module.llm_service, "chat_stream", chat_stream)
+
+
+async def test_stream_reply_buffers_chunks(redis, fake_llm):
+    chunks = [c async for c in ChatService(redis).stream_reply(1, "hi", "", reply_id="r1")]
+    assert chunks == ["你", "好", "呀"]
+    assert await redis.ttl(reply_key(1, "r1")) == settings.CHAT_REPLY_BUFFER_TTL
+
+    # A client that saw one chunk gets the rest, and nothing from another player's key
+    assert await _collect(redis, 1, "r1", 1) == ["好", "呀"]
+    assert await _collect(redis, 1, "r1", 3) == []
+    with pytest.raises(ReplyUnavailable):
+        await _collect(redis, 2, "r1", 0)
+
+
+async def test_resume_tails_reply_in_progress(redis):
+    buffer = ReplyBuffer(redis, 1, "live")
+    await buffer.append("a")
+
+    async def finish_later():
+        await asyncio.sleep(0.05)
+        await buffer.append("b")
+        await buffer.finish()
+
+    task = asyncio.create_task(finish_later())
+    assert await _collect(redis, 1, "live", 0) == ["a", "b"]
+    await task
+
+
+async def test_failed_and_abandoned_replies(redis, monkeypatch):
+    failed = ReplyBuffer(redis, 1, "failed")
+    await failed.append("a")
+    await failed.finish(failed=True)
+    with pytest.raises(ReplyUnavailable):
+        await _collect(redis, 1, "failed", 0)
+
+    monkeypatch.setattr(settings, "CHAT_REPLY_RESUME_IDLE_TIMEOUT", 0.05)
+    abandoned = ReplyBuffer(redis, 1, "abandoned")
+    await abandoned.append("a")
+    received = []
+    with pytest.raises(ReplyUnavailable):
+        async for chunk in read_reply(redis, 1, "abandoned", 0):
+            received.append(chunk)
+    assert received == ["a"]
@@ -0,0 +1,126 @@
+"""Tests for the retention service - dry runs, batched purges and resume."""
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.clock import utcnow
+from app.models.affinity import AffinityRecord
+from app.models.job_checkpoint import JobCheckpoint
+from app.models.player import Player
+from app.services import retention_service as retention_module
+from app.services.retention_service import retention_service
+
+
+@pytest.fixture
+async def ledger(db, monkeypatch):
+    """Five affinity records 100 days old and two fresh ones; 30-day policy."""
+    monkeypatch.setattr(retention_module.settings, "RETENTION_AFFINITY_RECORDS_DAYS", 30)
+    player = Player(name="Ledger")
+    db.add(player)
+    await db.flush()
+    old = utcnow() - timedelta(days=100)
+    for i in range(5):
+        db.add(AffinityRecord(player_id=player.id, delta=1, source="chat",
+                              created_at=old + timedelta(seconds=i)))
+    for _ in range(2):
+        db.add(AffinityRecord(player_id=player.id, delta=1, source="chat", created_at=utcnow()))
+    await db.commit()
+
+
+async def _count(session_factory, model) -> int:
+    async with session_factory() as db:
+        return await db.scalar(select(func.count()).select_from(model))
+
+
+async def test_dry_run_counts_without_deleting(ledger, session_factory):
+    results = await retention_service.run(session_factory, dry_run=True)
+    assert [(r["table"], r["would_delete"]) for r in results] == [("affinity_records", 5)]
+    assert await _count(session_factory, AffinityRecord) == 7
+
+
+async def test_purge_in_batches(ledger, session_factory):
+    results = await retention_service.run(session_factory, batch_size=2, pause=0)
+    assert results == [{"table": "affinity_records", "deleted": 5, "complete": True}]
+    assert await _count(session_factory, AffinityRecord) == 2
+    assert await _count(session_factory, JobCheckpoint) == 0
+
+
+async def test_purge_resumes_from_checkpoint(ledger, session_factory):
+    policy = next(p for p in retention_module.retention_policies()
+                  if p.table == "affinity_records")
+    first = await retention_service.purge(
+        session_factory, policy, batch_size=2, pause=0, max_batches=1
+    )
+    assert first == {"table": "affinity_records", "deleted": 2, "complete": False}
+    assert await _count(session_factory, JobCheckpoint) == 1
+
+    second = await retention_service.purge(session_factory, policy, batch_size=2, pause=0)
+    assert second == {"table": "affinity_records", "deleted": 5, "complete": True}
+    assert await _count(session_factory, AffinityRecord) == 2
+
+
+async def test_chat_purge_prunes_embedding_index(db, session_factory, monkeypatch):
+    from app.models.chat_history import ChatMessage
+    from app.services.embedding_service import embedding_service
+
+    monkeypatch.setattr(retention_module.settings, "RETENTION_CHAT_MESSAGES_DAYS", 30)
+    player = Player(name="Chatter")
+    db.add(player)
+    await db.flush()
+    for created_at in (utcnow() - timedelta(days=100), utcnow()):
+        pair = [
+            ChatMessage(player_id=player.id, role=role, content="你好", created_at=created_at)
+            for role in ("user", "assistant")
+        ]
+        db.add_all(pair)
+        await db.flush()
+        await embedding_service.index_exchange(db, player.id, *pair)
+    await db.commit()
+
+    [result] = await retention_service.run(session_factory, tables=["chat_messages"], pause=0)
+    assert result == {
+        "table": "chat_messages", "deleted": 2, "complete": True, "embeddings_pruned": 1
+    }
+
+
+async def test_lengthened_policy_lowers_checkpoint_cutoff(ledger, session_factory, monkeypatch):
+    policy = next(p for p in retention_module.retention_policies()
+                  if p.table == "affinity_records")
+    await retention_service.purge(session_factory, policy, batch_size=2, pause=0, max_batches=1)
+
+    # Retention raised to a year mid-run: the remaining 100-day-old rows must stay
+    monkeypatch.setattr(retention_module.settings, "RETENTION_AFFINITY_RECORDS_DAYS", 365)
+    policy = next(p for p in retention_module.retention_policies()
+                  if p.table == "affinity_records")
+    result = await retention_service.purge(session_factory, policy, batch_size=2, pause=0)
+    assert result == {"table": "affinity_records", "deleted": 2, "complete": True}
+    assert await _count(session_factory, AffinityRecord) == 5
+
+
+async def test_archives_and_episodes_expire_by_end_time(db, session_factory, monkeypatch):
+    from app.models.chat_archive import ChatArchive, ChatEpisode
+
+    monkeypatch.setattr(retention_module.settings, "RETENTION_CHAT_ARCHIVES_DAYS", 30)
+    monkeypatch.setattr(retention_module.settings, "RETENTION_CHAT_EPISODES_DAYS", 30)
+    player = Player(name="Archivist")
+    db.add(player)
+    await db.flush()
+    for ended_at in (utcnow() - timedelta(days=100), utcnow()):
+        episode = ChatEpisode(
+            player_id=player.id, started_at=ended_at, ended_at=ended_at,
+            first_message_id=1, last_message_id=2, message_count=2, summary="你好",
+        )
+        db.add(episode)
+        await db.flush()
+        db.add(ChatArchive(player_id=player.id, episode_id=episode.id, started_at=ended_at,
+                           ended_at=ended_at, message_count=2, payload=b""))
+    await db.commit()
+
+    results = await retention_service.run(session_factory, pause=0)
+    assert [(r["table"], r["deleted"]) for r in results] == [
+        ("chat_archives", 1), ("chat_episodes", 1)
+    ]
+    assert await _count(session_factory, ChatArchive) == 1
+    assert await _count(session_factory, ChatEpisode) == 1
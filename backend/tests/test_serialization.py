@@ -0,0 +1,46 @@
+"""Tests for the JSON backends and the precompiled chat frames."""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from app.core import serialization
+from app.core.serialization import END_FRAME, chunk_frame, error_frame
+
+
+@pytest.fixture(params=["stdlib", "orjson"])
+def backend(request):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    _, dumps, loads = serialization._select(request.param)
+    return dumps, loads
+
+
+def test_backends_agree(backend):
+    dumps, loads = backend
+    value = {"text": "你好 \"quoted\"\n", "n": 3, "nested": [1.5, None, True]}
+    encoded = dumps(value)
+    assert isinstance(encoded, bytes)
+    assert loads(encoded) == value
+    assert loads(encoded.decode()) == json.loads(encoded)
+    assert "你好".encode() in encoded  # not \u-escaped
+
+
+def test_backends_encode_datetimes_and_int_keys(backend):
+    dumps, loads = backend
+    ts = datetime(2026, 1, 2, 3, 4, 5, 600000)
+    assert loads(dumps({"at": ts})) == {"at": ts.isoformat()}
+    assert loads(dumps({1: "a"})) == {"1": "a"}
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        serialization._select("ujson")
+
+
+def test_frames_match_generic_encoding():
+    content = 'line "one"\n二'
+    assert json.loads(chunk_frame(content)) == {"type": "chunk", "content": content}
+    assert json.loads(error_frame(content)) == {"type": "error", "content": content}
+    assert json.loads(END_FRAME) == {"type": "end"}
@@ -0,0 +1,135 @@
+"""Tests for shard routing and the offline rebalancer (two SQLite databases as shards)."""
+
+from collections import Counter
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base
+from app.db.sharding import PlayerMovingError, ShardRouter, jump_hash
+from app.jobs.rebalance import misplaced_players, move_player
+from app.models.affinity import AffinityRecord
+from app.models.chat_archive import ChatArchive, ChatEpisode
+from app.models.chat_embedding import ChatEmbeddingIndex
+from app.models.chat_history import ChatMessage
+from app.models.player import Player
+from app.services.embedding_service import embedding_service
+from tests.conftest import test_engine
+
+
+def test_jump_hash_is_balanced_and_stable():
+    placements = {key: jump_hash(key, 4) for key in range(1, 4001)}
+    counts = Counter(placements.values())
+    assert set(counts) == {0, 1, 2, 3}
+    assert min(counts.values()) > 800
+
+    # Growing to five shards only moves keys onto the new shard
+    moved = [key for key, shard in placements.items() if jump_hash(key, 5) != shard]
+    assert all(jump_hash(key, 5) == 4 for key in moved)
+    assert len(moved) < 1200
+
+
+async def test_unsharded_router_skips_directory():
+    router = ShardRouter([test_engine])
+    assert await router.shard_for(12345) == 0
+    assert await router.allocate_player() == (None, 0)
+
+
+@pytest.fixture
+async def router():
+    shard1 = create_async_engine(
+        "sqlite+aiosqlite:///file:shard1?mode=memory&cache=shared&uri=true", poolclass=StaticPool
+    )
+    async with shard1.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield ShardRouter([test_engine, shard1], cache_ttl=60)
+    async with shard1.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await shard1.dispose()
+
+
+async def test_directory_routes_and_blocks_moving_players(router):
+    assert await router.shard_for(7) == 0  # no entry: pre-sharding player on shard 0
+
+    await router.set_route(7, 1)
+    assert await router.shard_for(7) == 1
+
+    await router.set_route(7, 1, moving=True)
+    with pytest.raises(PlayerMovingError):
+        await router.shard_for(7)
+
+
+async def test_move_player_copies_and_removes_rows(router):
+    async with router.sessions[0]() as db:
+        player = Player(name="Mover", memory_facts={"pet_name": "小白"})
+        db.add(player)
+        await db.flush()
+        pid = player.id
+        db.add(AffinityRecord(player_id=pid, delta=3, source="chat"))
+        messages = [
+            ChatMessage(player_id=pid, role="user", content="你好"),
+            ChatMessage(player_id=pid, role="assistant", content="你好呀"),
+        ]
+        db.add_all(messages)
+        await db.flush()
+        episode = ChatEpisode(
+            player_id=pid, started_at=func.now(), ended_at=func.now(),
+            first_message_id=messages[0].id, last_message_id=messages[1].id,
+            message_count=2, summary="打招呼",
+        )
+        db.add(episode)
+        await db.flush()
+        db.add(ChatArchive(
+            player_id=pid, episode_id=episode.id, started_at=func.now(),
+            ended_at=func.now(), message_count=0, payload=b"",
+        ))
+        await embedding_service.rebuild_index(db, pid)
+        await db.commit()
+
+    # Occupy the target's ID space so copied child rows must be renumbered
+    async with router.sessions[1]() as db:
+        other = Player(id=pid + 1000, name="Resident")
+        db.add(other)
+        await db.flush()
+        db.add(ChatMessage(player_id=other.id, role="user", content="occupied"))
+        await db.commit()
+
+    result = await move_player(router, pid, 1, settle=0)
+    assert result["moved"] is True
+    assert result["chat_messages"] == 2
+    assert await router.shard_for(pid) == 1
+
+    async with router.sessions[1]() as db:
+        moved = await db.get(Player, pid)
+        assert moved.memory_facts == {"pet_name": "小白"}
+        copied = (await db.scalars(
+            select(ChatMessage).where(ChatMessage.player_id == pid).order_by(ChatMessage.id)
+        )).all()
+        assert [m.content for m in copied] == ["你好", "你好呀"]
+        ep = await db.scalar(select(ChatEpisode).where(ChatEpisode.player_id == pid))
+        assert (ep.first_message_id, ep.last_message_id) == (copied[0].id, copied[1].id)
+        archive = await db.scalar(select(ChatArchive).where(ChatArchive.player_id == pid))
+        assert archive.episode_id == ep.id
+        assert await db.get(ChatEmbeddingIndex, pid) is not None
+
+    async with router.sessions[0]() as db:
+        assert await db.get(Player, pid) is None
+        assert await db.scalar(
+            select(func.count()).select_from(ChatMessage).where(ChatMessage.player_id == pid)
+        ) == 0
+
+    # Already in place: nothing to do
+    assert (await move_player(router, pid, 1, settle=0))["moved"] is False
+
+
+async def test_misplaced_players_follow_the_hash(router):
+    async with router.sessions[0]() as db:
+        db.add_all([Player(id=i, name=f"P{i}") for i in range(1, 21)])
+        await db.commit()
+
+    plan = await misplaced_players(router, limit=100)
+    assert plan
+    assert all(jump_hash(pid, 2) == target == 1 for pid, source, target in plan)
+    assert {pid for pid, _, _ in plan} == {i for i in range(1, 21) if jump_hash(i, 2) == 1}